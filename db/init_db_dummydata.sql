@@ -133,6 +133,40 @@ CREATE TABLE steps (
   last_update DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
+DROP TABLE IF EXISTS tcvitals;
+CREATE TABLE tcvitals (
+  id int PRIMARY KEY AUTO_INCREMENT,
+  org varchar(4) NOT NULL,
+  system_id varchar(3) NOT NULL,
+  nhc_id varchar(10),
+  storm_name varchar(9),
+  datetime_utc datetime NOT NULL,
+  latitude float NOT NULL,
+  longitude float NOT NULL,
+  storm_direction_degrees int,
+  storm_speed_dms int,
+  mslp_mb float,
+  env_press_mb float,
+  roci_km int,
+  vmax_ms float,
+  rmw_km int,
+  r34_ne_km int,
+  r34_se_km int,
+  r34_sw_km int,
+  r34_nw_km int,
+  storm_depth varchar(1),
+  r50_ne_km int,
+  r50_se_km int,
+  r50_sw_km int,
+  r50_nw_km int,
+  r64_ne_km int,
+  r64_se_km int,
+  r64_sw_km int,
+  r64_nw_km int,
+  run_id varchar(255) NOT NULL,
+  last_update DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
 ALTER TABLE storms ADD FOREIGN KEY (region_id) REFERENCES regions(id);
 
 ALTER TABLE observations ADD FOREIGN KEY (storm_id) REFERENCES storms(id);
@@ -150,6 +184,10 @@ CREATE UNIQUE INDEX storms_index ON storms(start_date, nhc_id);
 
 CREATE UNIQUE INDEX observations_index ON observations(storm_id, datetime_utc);
 
+CREATE UNIQUE INDEX tcvitals_index ON tcvitals(org, system_id, datetime_utc);
+
+CREATE INDEX tcvitals_nhc_id ON tcvitals(nhc_id, datetime_utc);
+
 CREATE UNIQUE INDEX forecasts_index ON forecasts(region_id, data_source_id, model_id, datetime_utc);
 
 CREATE UNIQUE INDEX tracks_index ON tracks(forecast_id, storm_id, ensemble_number);
@@ -0,0 +1,45 @@
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from tcdb.etl import atcf
+
+
+def rowwiseDecode(df, numeric_columns):
+    """Original per-row decoding used by parse_aDeck/parse_bDeck. Kept here as the reference
+    implementation the vectorized `atcf.decodeColumns` is checked and timed against"""
+    df["LAT"] = df.LAT.apply(lambda x: float(x[:-1]) / 10 if x.endswith("N") else -float(x[:-1]) / 10)
+    df["LON"] = df.LON.apply(lambda x: -float(x[:-1]) / 10 if x.endswith("W") else float(x[:-1]) / 10)
+    for var in numeric_columns:
+        if df[var].dtype == object:
+            df[var] = df[var].str.strip().apply(lambda x: np.nan if x == "" else x).astype(float)
+        else:
+            df[var] = df[var].astype(float)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].str.strip()
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row-wise and vectorized decoding of an ATCF adeck file")
+    parser.add_argument("path", type=str, help="Path to an adeck file (.dat or .dat.gz)")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Number of timing repetitions")
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    numeric_columns = ["VMAX", "MSLP", "NE", "SE", "SW", "NW"]
+    raw = atcf.read_deck(path, atcf.ADECK_COLUMNS, usecols=range(0, len(atcf.ADECK_COLUMNS)))
+    print(f"{path.name}: {len(raw)} rows")
+
+    expected = rowwiseDecode(raw.copy(), numeric_columns)
+    pd.testing.assert_frame_equal(expected, atcf.decodeColumns(raw.copy(), numeric_columns))
+    print("Decoded DataFrames are identical")
+
+    rowwise = min(timeit.repeat(lambda: rowwiseDecode(raw.copy(), numeric_columns), number=1, repeat=args.repeat))
+    vectorized = min(timeit.repeat(lambda: atcf.decodeColumns(raw.copy(), numeric_columns), number=1, repeat=args.repeat))
+    print(f"row-wise:   {rowwise:0.4f} s")
+    print(f"vectorized: {vectorized:0.4f} s")
+    print(f"speedup:    {rowwise / vectorized:0.1f}x")
@@ -1,32 +1,13 @@
 #!/bin/bash
 
-output_dir='/Work_Data/tcdb/data/lake/atcf/tcvitals'
-date_time=`date +%Y%m%dT%H%M`
-year=`date +%Y`
-output_file="${output_dir}/tcvitals_${date_time}"
+# download the tcvitals file, keep it in the data lake if it changed and load the new records into the DB
+# TCDB_HOME defaults to the checkout this script is in and TCDB_PYTHON to the python of the active environment
+script_dir=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
+project_dir=${TCDB_HOME:-$(dirname "${script_dir}")}
+python=${TCDB_PYTHON:-$(command -v python)}
 
-echo "Downloading tcvitals file to check for updates"
+cd "${project_dir}/tcdb/pipeline" || exit 1
 
-wget https://ftp.nhc.noaa.gov/atcf/com/tcvitals -q -O ${output_file} 
+"${python}" tcvitals.py
 
-for file in ${output_dir}/tcvitals_${year}*; do
-    if [[ $file -ef  $output_file ]]; then
-        continue
-    else
-        # compare file contents
-        /usr/bin/cmp $file $output_file
-        if [[ $? -eq 0 ]]; then
-            echo "${output_file##*/} is the same as ${file##*/}"
-            rm -v $output_file
-            break
-        fi
-    fi
-done
-
-if [[ -e $output_file ]]; then
-    echo "Saving updated tcvitals file to ${output_file}"
-else
-    echo "No updates for tcvitals file"
-fi
-
-echo "========================================================================"
\ No newline at end of file
+echo "========================================================================"
@@ -1 +1,2 @@
-from tcdb.datasets.storm_dataset import StormDataset
\ No newline at end of file
+from tcdb.datasets.storm_dataset import StormDataset
+from tcdb.datasets.ensemble_store import EnsembleStore
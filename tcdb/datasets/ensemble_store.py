@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+from loguru import logger
+from pathlib import Path
+
+from tcdb.config import settings
+
+# variables of `EnsembleTracks.to_xarray` kept in the store
+STORE_VARIABLES = ["hour", "lat", "lon", "wind", "mslp"]
+
+# number of inits per chunk. Every chunk holds all of the members and steps of its inits
+INIT_CHUNK = 28
+
+# encoding of the init coordinate
+INIT_UNITS = "hours since 1970-01-01"
+
+
+class EnsembleStore:
+    """Persistent store of the ensemble forecasts of each (model, track type, storm). Every storm is a Zarr store with
+    (init, ensemble, step) variables that grows along `init` as new runs are added, so months of forecasts can be
+    opened lazily and only the slices that are used are read from disk. Chunks hold `INIT_CHUNK` inits and are
+    compressed with the default Zarr compressor.
+
+    The valid time of a step is `init + step` hours, so it isn't stored.
+
+    Args:
+        root (pathlib.Path, optional): Directory of the store. Defaults to `ensembles` in the data lake.
+    """
+
+    def __init__(self, root=None):
+        if root is None:
+            root = Path(settings.paths.data_lake).joinpath("ensembles")
+        self.root = Path(root)
+
+    def __repr__(self):
+        return f"<tcdb.datasets.EnsembleStore {self.root.as_posix()}>"
+
+    def path(self, model, storm, track_type="raw"):
+        """Location of the Zarr store of a storm (`<root>/<model>/<track_type>/<storm>.zarr`)
+
+        Args:
+            model (str): "ECMWF" or "NCEP"
+            storm (str): Storm identifier, e.g. the nhc_id (AL092022)
+            track_type (str, optional): Defaults to "raw".
+
+        Returns:
+            pathlib.Path
+        """
+        return self.root.joinpath(model.lower(), track_type.lower(), f"{storm.upper()}.zarr")
+
+    def storms(self, model, track_type="raw"):
+        """Storms that have forecasts from `model` in the store
+
+        Returns:
+            list[str]
+        """
+        return sorted(path.stem for path in self.path(model, "", track_type).parent.glob("*.zarr"))
+
+    def append(self, ensemble, storm):
+        """Add a model run to the store. A run that is already in the store is overwritten in place.
+
+        Args:
+            ensemble (tcdb.etl.syntracks.EnsembleTracks): Every member of the run
+            storm (str): Storm identifier, e.g. the nhc_id (AL092022)
+
+        Returns:
+            pathlib.Path: Location of the Zarr store
+        """
+        path = self.path(ensemble.model, storm, ensemble.track_type)
+        init = np.datetime64(pd.Timestamp(ensemble.init), "ns")
+        ds = ensemble.to_xarray()[STORE_VARIABLES].drop_vars(["valid_time", "ensemble_name"])
+        ds = ds.expand_dims(init=[init])
+        ds["annual_id"] = ("init", [np.nan if ensemble.annual_id is None else float(ensemble.annual_id)])
+        ds.attrs = dict(Model=ensemble.model, TrackType=ensemble.track_type, Storm=storm.upper())
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            chunks = dict(init=INIT_CHUNK, ensemble=ds.sizes["ensemble"], step=ds.sizes["step"])
+            encoding = {
+                name: dict(chunks=tuple(chunks[dim] for dim in ds[name].dims)) for name in ds.data_vars
+            }
+            # otherwise the units are picked from the first init and later inits may not fit them
+            encoding["init"] = dict(units=INIT_UNITS, dtype="int64")
+            logger.debug(f"Creating {path.as_posix()}")
+            ds.to_zarr(path, mode="w-", encoding=encoding)
+            return path
+
+        with xr.open_zarr(path, chunks=None) as stored:
+            inits = stored.init.values
+            if stored.sizes["ensemble"] != ds.sizes["ensemble"] or not np.array_equal(stored.step.values, ds.step.values):
+                raise ValueError(f"{ensemble.model} run {init} doesn't have the same members and steps as {path.name}")
+        existing = np.flatnonzero(inits == init)
+        if len(existing) > 0:
+            logger.debug(f"Replacing {init} in {path.as_posix()}")
+            index = int(existing[0])
+            # region writes can only hold variables that are along the region
+            ds.drop_vars(["ensemble", "step"]).to_zarr(path, region=dict(init=slice(index, index + 1)))
+        else:
+            logger.debug(f"Appending {init} to {path.as_posix()}")
+            ds.to_zarr(path, append_dim="init")
+        return path
+
+    def open(self, model, storm, track_type="raw", chunks=None):
+        """Open the forecasts of a storm lazily, sorted by init. Nothing is read until values are used.
+
+        Args:
+            model (str): "ECMWF" or "NCEP"
+            storm (str): Storm identifier, e.g. the nhc_id (AL092022)
+            track_type (str, optional): Defaults to "raw".
+            chunks (dict, optional): Passed to `xarray.open_zarr`. The default of None opens the variables as lazily
+                indexed arrays, use {} to get dask arrays with the chunks of the store.
+
+        Returns:
+            xarray.Dataset: (init, ensemble, step) variables
+        """
+        path = self.path(model, storm, track_type)
+        if not path.exists():
+            raise FileNotFoundError(f"No {model} forecasts for {storm} in {self.root.as_posix()}")
+        ds = xr.open_zarr(path, chunks=chunks)
+        if not ds.indexes["init"].is_monotonic_increasing:
+            # runs that were added out of order
+            ds = ds.sortby("init")
+        return ds
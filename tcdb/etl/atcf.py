@@ -1,12 +1,20 @@
 import gzip
+import hashlib
+import json
+import mmap
+import os
 import pathlib
+from collections import namedtuple
 import pandas as pd
 import numpy as np
 from loguru import logger
 from pathlib import Path
 from io import BytesIO, StringIO
+from contextlib import contextmanager
+from types import MappingProxyType
 from datetime import timezone, datetime, timedelta
 
+from tcdb.config import settings
 from tcdb.utils import get_storm_type 
 import tcdb.validation as val
 import warnings
@@ -15,155 +23,280 @@ warnings.filterwarnings("ignore")
 
 UTC = timezone.utc
 
-
-def parse_aDeck(path):
+# https://www.nrlmry.navy.mil/atcf_web/docs/database/new/abdeck.txt
+ADECK_COLUMNS = [
+    "BASIN",
+    "SNUM",
+    "DATETIME",
+    "TECHNUM/MIN",
+    "TECH",
+    "TAU",
+    "LAT",
+    "LON",
+    "VMAX",
+    "MSLP",
+    "TY",
+    "RAD",
+    "WINDCODE",
+    "NE",
+    "SE",
+    "SW",
+    "NW",
+]
+BDECK_COLUMNS = ADECK_COLUMNS + [
+    "POUTER",
+    "ROCI",
+    "RMW",
+    "GUSTS",
+    "EYE",
+    "SUBREGION",
+    "MAXSEAS",
+    "INITIALS",
+    "DIR",
+    "SPEED",
+    "STORMNAME",
+    "DEPTH",
+    "SEAS",
+    "SEASCODE",
+    "SEAS1",
+    "SEAS2",
+    "SEAS3",
+    "SEAS4",
+    "USERDEFINED",
+    "userdata",
+]
+NA_VALUES = ["", " ", " " * 2]
+# types used by the arrow engine (see `read_deck_arrow`)
+ATCF_SCHEMA = {
+    "BASIN": "dictionary",
+    "SNUM": "int64",
+    "DATETIME": "datetime",
+    "TECHNUM/MIN": "string",
+    "TECH": "dictionary",
+    "TAU": "int64",
+    "LAT": "latitude",
+    "LON": "longitude",
+    "VMAX": "float64",
+    "MSLP": "float64",
+    "TY": "dictionary",
+    "RAD": "int64",
+    "WINDCODE": "dictionary",
+    "NE": "float64",
+    "SE": "float64",
+    "SW": "float64",
+    "NW": "float64",
+    "POUTER": "float64",
+    "ROCI": "float64",
+    "RMW": "float64",
+    "GUSTS": "int64",
+    "EYE": "int64",
+    "SUBREGION": "dictionary",
+    "MAXSEAS": "int64",
+    "INITIALS": "string",
+    "DIR": "int64",
+    "SPEED": "int64",
+    "STORMNAME": "string",
+    "DEPTH": "dictionary",
+    "SEAS": "int64",
+    "SEASCODE": "dictionary",
+    "SEAS1": "int64",
+    "SEAS2": "int64",
+    "SEAS3": "int64",
+    "SEAS4": "int64",
+    "USERDEFINED": "string",
+    "userdata": "string",
+}
+# bump whenever the output of `parse_aDeck` or `parse_bDeck` changes so stale cache entries are never used
+PARSER_VERSION = 1
+
+# A single forecast from an ADeck: initialization datetime, model short-name (TECH) and the ADeck rows for that forecast
+AdeckForecast = namedtuple("AdeckForecast", ["datetime", "tech", "rows"])
+
+
+def parse_aDeck(path, models=None, since=None, until=None, max_tau=None, engine="c"):
     """Parse NHC ADeck file
 
+    The filters are applied to the raw lines, so lines that don't pass them are never converted.
+
     Args:
         path (pathlib.Path): Path to the ADeck file
-
+        models (list[str], optional): Only keep these TECHs. Defaults to None.
+        since (datetime.datetime, optional): Only keep forecasts initialized on or after `since`. Defaults to None.
+        until (datetime.datetime, optional): Only keep forecasts initialized on or before `until`. Defaults to None.
+        max_tau (int, optional): Only keep forecast hours (TAU) less than or equal to `max_tau`. Defaults to None.
+        engine (str, optional): "c" to parse with the pandas tokenizer or "arrow" to parse with pyarrow using
+            `ATCF_SCHEMA` (see `read_deck_arrow`). Defaults to "c".
 
     Returns:
         pandas.DataFrame
     """
-
-    # https://www.nrlmry.navy.mil/atcf_web/docs/database/new/abdeck.txt
-    header_names = [
-        "BASIN",
-        "SNUM",
-        "DATETIME",
-        "TECHNUM/MIN",
-        "TECH",
-        "TAU",
-        "LAT",
-        "LON",
-        "VMAX",
-        "MSLP",
-        "TY",
-        "RAD",
-        "WINDCODE",
-        "NE",
-        "SE",
-        "SW",
-        "NW",
-    ]
-
-    # with open(file_name, 'rb') as file_handle:
+    predicates = aDeckPredicates(models=models, since=since, until=until, max_tau=max_tau)
+    if engine == "arrow":
+        min_fields = 18 if path.name.endswith('.gz') else None
+        return arrowToFrame(read_deck_arrow(path, ADECK_COLUMNS, min_fields=min_fields, predicates=predicates))
     if path.name.endswith('.gz'):
-        string_buffer = compressed_atcf_to_strio(path)
-        df = pd.read_csv(
-            string_buffer,
-            names=header_names,
-            index_col=False,
-            na_values=["", " ", " " * 2],
-            usecols=range(0, len(header_names)),
-        )
+        # changed this from 20 to 18 to make sure all adeck forecast were being captured
+        df = read_deck(path, ADECK_COLUMNS, usecols=range(0, len(ADECK_COLUMNS)), min_fields=18, predicates=predicates)
     else:
-        df = pd.read_csv(
-            path,
-            names=header_names,
-            index_col=False,
-            na_values=["", " ", " " * 2],
-            usecols=range(0, len(header_names)),
+        df = read_deck(path, ADECK_COLUMNS, usecols=range(0, len(ADECK_COLUMNS)), predicates=predicates)
+
+    df["DATETIME"] = pd.to_datetime(df.DATETIME, format="%Y%m%d%H")
+    # df["DATETIME"] = df["DATETIME"].dt.tz_localize(UTC)
+    return decodeColumns(df, ["VMAX", "MSLP", "NE", "SE", "SW", "NW"])
+
+
+def aDeckPredicates(models=None, since=None, until=None, max_tau=None):
+    """Build the line predicates used by `read_deck` to filter ADeck lines before they are parsed
+
+    Returns:
+        dict[int, callable]: Maps ADeck column index to a predicate on the stripped field
+    """
+    predicates = dict()
+    if models is not None:
+        models = set(models)
+        predicates[ADECK_COLUMNS.index("TECH")] = lambda tech: tech in models
+    if since is not None or until is not None:
+        # YYYYMMDDHH strings sort the same as the datetimes they represent
+        since_str = since.strftime("%Y%m%d%H") if since is not None else None
+        until_str = until.strftime("%Y%m%d%H") if until is not None else None
+        predicates[ADECK_COLUMNS.index("DATETIME")] = lambda date_str: (
+            (since_str is None or date_str >= since_str) and (until_str is None or date_str <= until_str)
         )
+    if max_tau is not None:
+        predicates[ADECK_COLUMNS.index("TAU")] = lambda tau: tau.lstrip("-").isdigit() and int(tau) <= max_tau
+    return predicates
 
 
+def iter_aDeck_forecasts(path, models=None, since=None, until=None, max_tau=None, keys=None, buffer_lines=10000, use_index=False):
+    """Stream an ADeck file and yield one forecast (a single initialization datetime and TECH) at a time.
+
+    The lines of an ATCF forecast are written together, so the file is read line by line and only
+    about `buffer_lines` lines (rounded up to whole forecasts) are held in memory and parsed at once.
+    Lines are filtered (see `parse_aDeck`) before anything is parsed.
+
+    Args:
+        path (pathlib.Path): Path to the ADeck file (.dat or .dat.gz)
+        models (list[str], optional): Only yield forecasts for these TECHs. If None, all TECHs are yielded. Defaults to None.
+        since (datetime.datetime, optional): Only yield forecasts initialized on or after `since`. Defaults to None.
+        until (datetime.datetime, optional): Only yield forecasts initialized on or before `until`. Defaults to None.
+        max_tau (int, optional): Only keep forecast hours (TAU) less than or equal to `max_tau`. Defaults to None.
+        keys (set[tuple[str, str]], optional): Only yield these (YYYYMMDDHH, TECH) forecasts, e.g. the forecasts
+            that changed since the previous version of the deck (see `changed_keys`). Defaults to None.
+        buffer_lines (int, optional): Number of lines to collect before they are parsed. Use 0 to parse every
+            forecast on its own. Defaults to 10000.
+        use_index (bool, optional): Use the deck index (see `deck_index`) to seek straight to the forecasts
+            that pass the TECH and DATETIME filters instead of reading the whole file. Defaults to False.
+
+    Yields:
+        AdeckForecast: (datetime, tech, rows) where `rows` is a DataFrame in the same format `parse_aDeck` returns
+    """
+    if not isinstance(path, Path):
+        path = Path(path)
+    predicates = aDeckPredicates(models=models, since=since, until=until, max_tau=max_tau)
+    ranges = None
+    if use_index:
+        ranges = deckRanges(
+            deck_index(path),
+            dates=predicates.get(ADECK_COLUMNS.index("DATETIME")),
+            techs=predicates.get(ADECK_COLUMNS.index("TECH")),
+            keys=keys,
+        )
+
+    num_columns = len(ADECK_COLUMNS)
+    # drop the same short lines `parse_aDeck` drops, and any line without a position
+    min_fields = 18 if path.name.endswith(".gz") else ADECK_COLUMNS.index("LON") + 1
+    lat_col, lon_col = ADECK_COLUMNS.index("LAT"), ADECK_COLUMNS.index("LON")
+    key = None
+    lines = list()
+    for line in iterDeckLines(path, ranges):
+        fields = line.rstrip("\r\n").split(",")
+        if len(fields) < min_fields or not fields[lat_col].strip() or not fields[lon_col].strip():
+            continue
+        if not all(predicate(fields[col].strip()) for col, predicate in predicates.items()):
+            continue
+        if keys is not None and (fields[2].strip(), fields[4].strip()) not in keys:
+            continue
+        # only parse the buffer between forecasts so a forecast is never split up
+        if (fields[2], fields[4]) != key:
+            if len(lines) > buffer_lines:
+                yield from aDeckForecastsFromLines(lines)
+                lines = list()
+            key = (fields[2], fields[4])
+        # pad/trim every line to the ADeck columns
+        fields.extend([""] * (num_columns - len(fields)))
+        lines.append(",".join(fields[:num_columns]))
+    if lines:
+        yield from aDeckForecastsFromLines(lines)
+
+
+def aDeckForecastsFromLines(lines):
+    """Parse ADeck lines and split them into forecasts
+
+    Args:
+        lines (list[str]): ADeck lines with exactly `len(ADECK_COLUMNS)` fields
+
+    Yields:
+        AdeckForecast: forecasts in the order they appear in `lines`
+    """
+    df = pd.read_csv(StringIO("\n".join(lines)), names=ADECK_COLUMNS, index_col=False, na_values=NA_VALUES)
     df["DATETIME"] = pd.to_datetime(df.DATETIME, format="%Y%m%d%H")
-    # df["DATETIME"] = df["DATETIME"].dt.tz_localize(UTC)
-    # We only need current and past dates
-    df["LAT"] = df.LAT.apply(lambda x: float(x[:-1]) / 10 if x.endswith("N") else -float(x[:-1]) / 10)
-    df["LON"] = df.LON.apply(lambda x: -float(x[:-1]) / 10 if x.endswith("W") else float(x[:-1]) / 10)
-    for var in ["VMAX", "MSLP", "NE", "SE", "SW", "NW"]:
-        # deal with empty strings
-        if df[var].dtype == object:
-            # remove spaces -> convert empty string to nan -> convert to float
-            df[var] = df[var].str.strip().apply(lambda x: np.nan if x == "" else x).astype(float)
-        else:
-            df[var] = df[var].astype(float)
-    # clean up strings
-    for col in df.columns:
-        if df[col].dtype == object:
-            df[col] = df[col].str.strip()
+    df = decodeColumns(df, ["VMAX", "MSLP", "NE", "SE", "SW", "NW"])
+    for (date_time, tech), rows in df.groupby(["DATETIME", "TECH"], sort=False):
+        yield AdeckForecast(date_time, tech, rows.reset_index(drop=True))
 
-    return df
 
+def iterDeckLines(path, ranges=None):
+    """Iterate over the lines of an ADeck/BDeck file. Gzipped decks are decompressed as they are read
 
-def parse_bDeck(path):
+    Args:
+        path (pathlib.Path)
+        ranges (list[tuple[int, int]], optional): Only read these (start, end) byte ranges (see `deck_index`). Defaults to None.
+
+    Yields:
+        str: lines of the file
+    """
+    if ranges is None:
+        with (gzip.open(path, "rt") if path.name.endswith(".gz") else open(path, "r")) as deck:
+            yield from deck
+        return
+    # seeking in a gzip stream decompresses everything before the offset, so gzipped decks are decompressed once
+    # (see `deckBuffer`) and sliced instead
+    with deckBuffer(path) as buffer:
+        for start, end in ranges:
+            yield from buffer[start:end].decode().splitlines()
+
+
+def parse_bDeck(path, date_time=None, engine="c"):
     """Parse NHC BDeck file
 
     Args:
         path (pathlib.Path): Path to the BDeck file
+        date_time (datetime.datetime | list[datetime.datetime], optional): Only parse the observations for `date_time`.
+            The lines are located with the deck index (see `deck_index`) so the rest of the file is never read. Defaults to None.
+        engine (str, optional): "c" to parse with the pandas tokenizer or "arrow" to parse with pyarrow using
+            `ATCF_SCHEMA` (see `read_deck_arrow`). Defaults to "c".
 
     Returns:
         pandas.DataFrame
     """
-    # https://www.nrlmry.navy.mil/atcf_web/docs/database/new/abdeck.txt
-    header_names = [
-        "BASIN",
-        "SNUM",
-        "DATETIME",
-        "TECHNUM/MIN",
-        "TECH",
-        "TAU",
-        "LAT",
-        "LON",
-        "VMAX",
-        "MSLP",
-        "TY",
-        "RAD",
-        "WINDCODE",
-        "NE",
-        "SE",
-        "SW",
-        "NW",
-        "POUTER",
-        "ROCI",
-        "RMW",
-        "GUSTS",
-        "EYE",
-        "SUBREGION",
-        "MAXSEAS",
-        "INITIALS",
-        "DIR",
-        "SPEED",
-        "STORMNAME",
-        "DEPTH",
-        "SEAS",
-        "SEASCODE",
-        "SEAS1",
-        "SEAS2",
-        "SEAS3",
-        "SEAS4",
-        "USERDEFINED",
-        "userdata",
-    ]
-
-    if path.name.endswith(".gz"):
-        string_buffer = compressed_atcf_to_strio(path)
+    path = Path(path)
+    ranges = None
+    if date_time is not None:
+        date_times = date_time if isinstance(date_time, (list, tuple, set)) else [date_time]
+        date_strs = {dt.strftime("%Y%m%d%H") for dt in date_times}
+        ranges = deckRanges(deck_index(path), dates=lambda d: d in date_strs)
+    if engine == "arrow":
+        df = arrowToFrame(read_deck_arrow(path, BDECK_COLUMNS, min_fields=18, ranges=ranges))
     else:
-        string_buffer = raw_atcf_to_strio(path)
-
-    df = pd.read_csv(string_buffer, names=header_names, index_col=False, na_values=["", " ", " " * 2])
+        df = read_deck(path, BDECK_COLUMNS, min_fields=18, ranges=ranges)
     if df.empty:
         logger.warning(f"Unable to parse the file: {path.name}")
         return df
 
-    df["DATETIME"] = pd.to_datetime(df.DATETIME, format="%Y%m%d%H")
-    # df["DATETIME"] = df["DATETIME"].dt.tz_localize(UTC)
-    # We only need current and past dates
-    df["LAT"] = df.LAT.apply(lambda x: float(x[:-1]) / 10 if x.endswith("N") else -float(x[:-1]) / 10)
-    df["LON"] = df.LON.apply(lambda x: -float(x[:-1]) / 10 if x.endswith("W") else float(x[:-1]) / 10)
-    for var in ["VMAX", "MSLP", "NE", "SE", "SW", "NW", "POUTER", "ROCI", "RMW"]:
-        # deal with empty strings
-        if df[var].dtype == object:
-            # remove spaces -> convert empty string to nan -> convert to float
-            df[var] = df[var].str.strip().apply(lambda x: np.nan if x == "" else x).astype(float)
-        else:
-            df[var] = df[var].astype(float)
-    # clean up strings
-    for col in df.columns:
-        if df[col].dtype == object:
-            df[col] = df[col].str.strip()
+    if engine != "arrow":
+        df["DATETIME"] = pd.to_datetime(df.DATETIME, format="%Y%m%d%H")
+        # df["DATETIME"] = df["DATETIME"].dt.tz_localize(UTC)
+        df = decodeColumns(df, ["VMAX", "MSLP", "NE", "SE", "SW", "NW", "POUTER", "ROCI", "RMW"])
 
     if not isinstance(df.STORMNAME.values[-1], str):
         df.STORMNAME = df.STORMNAME.mode().values[0]
@@ -171,94 +304,526 @@ def parse_bDeck(path):
     return df
 
 
-def compressed_atcf_to_strio(path):
-    """Open and convert a compressed gzip file to text that is then converted to
-    StringIO buffer can be processed by pandas
+def mapUnique(col, func):
+    """Apply a whole-column decoding function to the unique values of `col` only and broadcast
+    the result back with integer codes. ATCF columns repeat the same handful of values
+    (basins, techs, hemisphere coordinates, radii) so this is much cheaper than decoding every row.
+    Missing values stay NaN.
 
     Args:
-        path (pathlib.Path)
+        col (pandas.Series)
+        func (callable): Takes and returns a pandas.Series
 
     Returns:
-        io.StringIO: String buffer that can be read by pandas
+        pandas.Series
     """
-    with open(path, "rb") as bi:
-        sio_buffer = BytesIO(bi.read())
-        gzf = gzip.GzipFile(fileobj=sio_buffer)
-        data = gzf.read()
-        content = data.splitlines()
-        content = [line.decode("utf-8") for line in content]
-    return parse_uneven_rows("\n".join(content))
+    codes, uniques = pd.factorize(col)
+    # code -1 (missing value) picks up the NaN appended at the end
+    decoded = np.append(func(pd.Series(uniques, dtype=col.dtype)).to_numpy(), np.nan)
+    return pd.Series(decoded[codes], index=col.index, name=col.name)
 
 
-def compressed_atcf_to_text(path):
-    """Open and convert a compressed gzip file to text that is then converted to
-    StringIO buffer
+def decodeCoordinate(col, positive="N", negative="S"):
+    """Convert ATCF tenths-of-degree strings with a hemisphere suffix (e.g. '133N', '718W')
+    to signed decimal degrees
 
     Args:
-        path (pathlib.Path)
+        col (pandas.Series): LAT or LON column as parsed from the deck
+        positive (str, optional): Suffix of the positive hemisphere. Defaults to "N".
+        negative (str, optional): Suffix of the negative hemisphere. Only used when `positive` is None. Defaults to "S".
+
+    Returns:
+        pandas.Series: float column in decimal degrees
+    """
+    def decode(uniques):
+        value = uniques.str[:-1].astype(float) / 10
+        suffix = uniques.str[-1]
+        if positive is None:
+            return value.where(suffix != negative, -value)
+        return value.where(suffix == positive, -value)
+
+    return mapUnique(col.astype(str), decode)
+
+
+def decodeNumeric(col):
+    """Convert a numeric ATCF column to float. Columns that pandas left as strings
+    (because of space padded blank fields) are stripped and blanks become NaN
+
+    Args:
+        col (pandas.Series)
+
+    Returns:
+        pandas.Series: float column
+    """
+    if col.dtype == object:
+        # remove spaces -> convert empty string to nan -> convert to float
+        return mapUnique(col, lambda uniques: uniques.str.strip().replace("", np.nan).astype(float))
+    return col.astype(float)
+
+
+def decodeColumns(df, numeric_columns):
+    """Decode the raw ADeck/BDeck fields using whole-column operations: LAT/LON hemisphere
+    suffixes and tenths-of-degree scaling, blank-to-NaN conversion of `numeric_columns` and
+    whitespace trimming of the remaining string columns
+
+    Args:
+        df (pandas.DataFrame): DataFrame returned by `pandas.read_csv` for a deck file
+        numeric_columns (list[str]): Columns that should be converted to float
 
     Returns:
-        string
+        pandas.DataFrame
     """
-    with open(path, "rb") as bi:
-        sio_buffer = BytesIO(bi.read())
-        gzf = gzip.GzipFile(fileobj=sio_buffer)
-        data = gzf.read()
-        content = data.splitlines()
-        content = [line.decode("utf-8") for line in content]
-    return "\n".join(content)
+    df["LAT"] = decodeCoordinate(df.LAT, positive="N")
+    df["LON"] = decodeCoordinate(df.LON, positive=None, negative="W")
+    for var in numeric_columns:
+        df[var] = decodeNumeric(df[var])
+    # clean up strings
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = mapUnique(df[col], lambda uniques: uniques.str.strip())
+    return df
 
 
-def raw_atcf_to_strio(path):
-    """Simple wrapper for 'parse_uneven_rows' to keep function names consistent.
-    Can be processed by pandas
+@contextmanager
+def deckBuffer(path):
+    """Expose the raw bytes of an ADeck/BDeck file without copying them into Python strings.
+    Uncompressed decks are memory mapped and gzipped decks are decompressed once into a single bytes object.
 
     Args:
         path (pathlib.Path)
 
+    Yields:
+        mmap.mmap | bytes: buffer holding the contents of the file
+    """
+    path = Path(path)
+    if path.name.endswith(".gz"):
+        with gzip.open(path, "rb") as gz:
+            yield gz.read()
+    else:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files can't be memory mapped
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+
+# One block of whole lines from a deck buffer. `offset` is the byte offset of the block in the buffer, `first_line`
+# the line number of its first line. Line starts/ends, comma positions and the index of the first comma of every line
+# are relative to the block.
+DeckBlock = namedtuple(
+    "DeckBlock", ["offset", "first_line", "data", "line_starts", "line_ends", "commas", "first_comma", "num_commas"]
+)
+
+
+def deckBlocks(buffer, block_size=1 << 22):
+    """Split the bytes of a deck into blocks of whole lines and locate the lines and commas in each
+    block with NumPy, without creating any per-line Python strings
+
+    Args:
+        buffer (bytes-like): contents of a deck file
+        block_size (int, optional): number of bytes to scan at a time. Defaults to 4 MB.
+
+    Yields:
+        DeckBlock
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    first_line = 0
+    start = 0
+    while start < data.size:
+        end = min(start + block_size, data.size)
+        block = data[start:end]
+        newlines = np.flatnonzero(block == ord("\n"))
+        if end < data.size:
+            if newlines.size == 0:
+                # a single line longer than the block, scan a bigger block
+                block_size *= 2
+                continue
+            # only keep whole lines in the block
+            block = block[: newlines[-1] + 1]
+            line_ends = newlines
+        elif newlines.size and newlines[-1] == block.size - 1:
+            line_ends = newlines
+        else:
+            # last line without a trailing newline
+            line_ends = np.append(newlines, block.size)
+        line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+        commas = np.flatnonzero(block == ord(","))
+        first_comma = np.searchsorted(commas, line_starts)
+        num_commas = np.searchsorted(commas, line_ends) - first_comma
+        yield DeckBlock(start, first_line, block, line_starts, line_ends, commas, first_comma, num_commas)
+        first_line += line_ends.size
+        start += block.size
+
+
+def fieldValues(block, col):
+    """Find the unique values of column `col` in a block of deck lines
+
+    Returns:
+        tuple: (lines, uniques, inverse) where `lines` are the block line numbers that have the column, `uniques`
+            the stripped unique values (list[str]) and `inverse` the index into `uniques` for each of `lines`
+    """
+    lines = np.flatnonzero(block.num_commas >= col)
+    if lines.size == 0:
+        return lines, list(), np.zeros(0, dtype=int)
+    first_comma = block.first_comma[lines]
+    starts = block.line_starts[lines] if col == 0 else block.commas[first_comma + col - 1] + 1
+    last = block.num_commas[lines] == col
+    ends = np.where(last, block.line_ends[lines], block.commas[np.minimum(first_comma + col, block.commas.size - 1)])
+    width = int((ends - starts).max())
+    if width == 0:
+        return lines, [""], np.zeros(lines.size, dtype=int)
+    # right aligned copy of the field padded with spaces so every unique value can be found at once
+    index = ends[:, None] - width + np.arange(width)
+    window = np.where(index >= starts[:, None], block.data[np.maximum(index, 0)], ord(" ")).astype(np.uint8)
+    uniques, inverse = np.unique(window.view(f"V{width}").ravel(), return_inverse=True)
+    uniques = [bytes(u).decode(errors="replace").strip() for u in uniques]
+    return lines, uniques, inverse.ravel()
+
+
+def keptLines(block, min_fields=None, predicates=None):
+    """Boolean mask of the lines in a `DeckBlock` that have at least `min_fields` fields and pass every predicate (see `scanLines`)"""
+    keep = np.ones(block.line_ends.size, dtype=bool)
+    if min_fields:
+        keep &= block.num_commas + 1 >= min_fields
+    for col, predicate in (predicates or dict()).items():
+        lines, uniques, inverse = fieldValues(block, col)
+        matches = np.zeros(keep.size, dtype=bool)
+        passed = np.array([bool(predicate(value)) for value in uniques], dtype=bool)
+        matches[lines] = passed[inverse]
+        keep &= matches
+    return keep
+
+
+def scanLines(buffer, min_fields=None, predicates=None):
+    """Find the lines of a deck that should not be parsed: lines with fewer than `min_fields` comma
+    separated fields and lines where a field does not pass its predicate.
+
+    The lines are scanned with NumPy directly on the bytes (see `deckBlocks`) and each predicate
+    is only called once per unique field value.
+
+    Args:
+        buffer (bytes-like): contents of a deck file
+        min_fields (int, optional): minimum number of fields a line needs to be kept. Defaults to None.
+        predicates (dict[int, callable], optional): Maps a 0-indexed column to a function that takes the stripped
+            field (str) and returns True if the line should be kept. Lines without the column are skipped. Defaults to None.
+
     Returns:
-        io.StringIO: String buffer that can be read by pandas
+        tuple: (numpy.ndarray of the 0-indexed line numbers to skip, maximum number of fields of the kept lines)
     """
-    with open(path, "r") as txt:
-        text = txt.read()
-    return parse_uneven_rows(text)
+    skipped = list()
+    max_fields = 0
+    for block in deckBlocks(buffer):
+        keep = keptLines(block, min_fields, predicates)
+        skipped.append(np.flatnonzero(~keep) + block.first_line)
+        if keep.any():
+            max_fields = max(max_fields, int(block.num_commas[keep].max()) + 1)
+    return (np.concatenate(skipped) if skipped else np.zeros(0, dtype=int)), max_fields
 
 
-def parse_uneven_rows(text):
-    """Parse NHC ADeck/BDeck text data and ensuree all rows
-    are the same length.
+def read_deck(path, names, usecols=None, min_fields=None, predicates=None, ranges=None, dtype=None):
+    """Read an ADeck/BDeck file with the pandas tokenizer straight from the file bytes (see `deckBuffer`).
+    Rows with fewer fields than the longest row are padded with NaN by the tokenizer and fields past `names` are dropped.
 
     Args:
-        text (str): raw text in string format
+        path (pathlib.Path): Path to the deck file (.dat or .dat.gz)
+        names (list[str]): Column names
+        usecols (list[int], optional): Columns to keep. Defaults to all of `names`.
+        min_fields (int, optional): Drop lines with fewer than `min_fields` fields. Defaults to None.
+        predicates (dict[int, callable], optional): Only parse lines that pass these field predicates (see `scanLines`). Defaults to None.
+        ranges (list[tuple[int, int]], optional): Only read these (start, end) byte ranges of the file (see `deck_index`). Defaults to None.
+        dtype (type | dict, optional): Passed on to `pandas.read_csv`. Defaults to None.
 
     Returns:
-        io.StringIO: String buffer that can be read by pandas
+        pandas.DataFrame: raw (not yet decoded) deck columns
     """
+    with deckBuffer(path) as buffer:
+        if ranges is not None:
+            buffer = b"".join(buffer[start:end] for start, end in ranges)
+        skipped, max_fields = scanLines(buffer, min_fields, predicates)
+        # give the tokenizer a name for every field so ragged rows line up no matter which row comes first
+        all_names = list(names) + [f"_{i}" for i in range(len(names), max_fields)]
+        if isinstance(buffer, bytes):
+            # BytesIO shares the memory of an immutable bytes object instead of copying it
+            buffer = BytesIO(buffer)
+        if usecols is None:
+            usecols = range(0, len(names))
+        # the tokenizer can't select columns past the longest kept line, so those are padded with NaN and selected after
+        short = max_fields < len(names)
+        df = pd.read_csv(
+            buffer,
+            names=all_names,
+            index_col=False,
+            na_values=NA_VALUES,
+            usecols=None if short else usecols,
+            skiprows=set(skipped.tolist()) if skipped.size else None,
+            dtype=dtype,
+        )
+    return df.iloc[:, list(usecols)] if short else df
 
-    length = 0
-    for line in text.split("\n"):
-        length = max(len(line.split(",")), length)
 
-    lines = list()
-    for line in text.split("\n"):
-        parsed_line = line.split(",")
-        if len(parsed_line) < 18:  # changed this from 20 to 18 to make sure all adeck forecast were being captured
+def fixedFieldLines(buffer, num_fields, min_fields=None, predicates=None):
+    """Rewrite the kept lines of a deck so every line has exactly `num_fields` fields. Longer lines are cut at the
+    `num_fields`-th comma and shorter lines are padded with empty fields. Blank lines are dropped.
+    Everything is done with NumPy index arithmetic so no per-line Python strings are created.
+
+    Args:
+        buffer (bytes-like): contents of a deck file
+        num_fields (int): number of fields every line should have
+        min_fields (int, optional): Drop lines with fewer than `min_fields` fields. Defaults to None.
+        predicates (dict[int, callable], optional): Only keep lines that pass these field predicates (see `scanLines`). Defaults to None.
+
+    Returns:
+        numpy.ndarray: uint8 array with the rewritten lines
+    """
+    out = list()
+    for block in deckBlocks(buffer):
+        keep = keptLines(block, min_fields, predicates)
+        starts = block.line_starts[keep]
+        ends = block.line_ends[keep]
+        num_commas = block.num_commas[keep]
+        long = num_commas >= num_fields
+        # cut long lines at the comma that ends the last field
+        ends = np.where(long, block.commas[np.minimum(block.first_comma[keep] + num_fields - 1, block.commas.size - 1)], ends)
+        # drop the carriage return of CRLF lines
+        crlf = ~long & (ends > starts)
+        crlf[crlf] = block.data[ends[crlf] - 1] == ord("\r")
+        ends = ends - crlf
+        nonblank = ends > starts
+        starts, ends = starts[nonblank], ends[nonblank]
+        pad = np.where(long[nonblank], 0, num_fields - 1 - num_commas[nonblank])
+        newlines = block.line_ends[keep][nonblank]
+        # keep the bytes of every [start, end) range plus the newline that ends the line
+        # (ranges never overlap or touch, so the running sum is always 0 or 1)
+        edges = np.zeros(block.data.size + 1, dtype=np.int8)
+        edges[starts] = 1
+        edges[ends] = -1
+        mask = np.cumsum(edges[:-1], dtype=np.int8).view(bool)
+        mask[newlines[newlines < block.data.size]] = True
+        lines = block.data[mask]
+        if newlines.size and newlines[-1] == block.data.size:
+            # last line of the file without a trailing newline
+            lines = np.append(lines, np.uint8(ord("\n")))
+        if pad.any():
+            # pad short lines with empty fields in front of their newline
+            out_newlines = np.cumsum(ends - starts + 1) - 1
+            lines = np.insert(lines, np.repeat(out_newlines, pad), np.uint8(ord(",")))
+        out.append(lines)
+    return np.concatenate(out) if out else np.zeros(0, dtype=np.uint8)
+
+
+def read_deck_arrow(path, names, min_fields=None, predicates=None, ranges=None):
+    """Read an ADeck/BDeck file with the multithreaded pyarrow CSV reader and decode it with the types in
+    `ATCF_SCHEMA`: integers and floats, LAT/LON in signed decimal degrees, DATETIME as a timestamp and the short
+    code columns (BASIN, TECH, ...) dictionary encoded. Blank fields are null.
+
+    Args:
+        path (pathlib.Path): Path to the deck file (.dat or .dat.gz)
+        names (list[str]): Column names. Fields past `names` are dropped.
+        min_fields (int, optional): Drop lines with fewer than `min_fields` fields. Defaults to None.
+        predicates (dict[int, callable], optional): Only parse lines that pass these field predicates (see `scanLines`). Defaults to None.
+        ranges (list[tuple[int, int]], optional): Only read these (start, end) byte ranges of the file (see `deck_index`). Defaults to None.
+
+    Returns:
+        pyarrow.Table
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pv
+    except ImportError as e:
+        raise ImportError("pyarrow is required to parse decks with engine='arrow'") from e
+
+    with deckBuffer(path) as buffer:
+        if ranges is not None:
+            buffer = b"".join(buffer[start:end] for start, end in ranges)
+        # the arrow reader needs every row to have the same number of fields
+        lines = fixedFieldLines(buffer, len(names), min_fields, predicates)
+    if lines.size == 0:
+        return pa.table({name: pa.array([], type=arrowType(ATCF_SCHEMA.get(name, "string"))) for name in names})
+    table = pv.read_csv(
+        pa.py_buffer(lines),
+        read_options=pv.ReadOptions(column_names=names, use_threads=True),
+        parse_options=pv.ParseOptions(quote_char=False),
+        convert_options=pv.ConvertOptions(column_types={name: pa.string() for name in names}, strings_can_be_null=False),
+    )
+    return pa.table([decodeArrow(table[name], ATCF_SCHEMA.get(name, "string")) for name in names], names=names)
+
+
+def arrowType(kind):
+    import pyarrow as pa
+
+    return {
+        "dictionary": pa.dictionary(pa.int32(), pa.string()),
+        "datetime": pa.timestamp("ns"),
+        "latitude": pa.float64(),
+        "longitude": pa.float64(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+    }[kind]
+
+
+def decodeArrow(col, kind):
+    """Decode a raw (string) ATCF column read by `read_deck_arrow` to the type named by `kind` (see `ATCF_SCHEMA`).
+    Integer columns include free-form fields (GUSTS, EYE, DIR, SEAS, ...) that some decks fill with text, so values
+    that aren't integers become null instead of failing the whole parse (the "c" engine keeps those columns as strings).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    col = pc.utf8_trim_whitespace(col)
+    col = pc.if_else(pc.equal(col, ""), pa.scalar(None, pa.string()), col)
+    if kind in ["latitude", "longitude"]:
+        value = pc.divide(pc.cast(pc.utf8_slice_codeunits(col, 0, -1), pa.float64()), 10)
+        suffix = pc.utf8_slice_codeunits(col, -1)
+        negative = pc.not_equal(suffix, "N") if kind == "latitude" else pc.equal(suffix, "W")
+        return pc.if_else(negative, pc.negate(value), value)
+    if kind == "datetime":
+        return pc.strptime(col, format="%Y%m%d%H", unit="ns")
+    if kind == "dictionary":
+        return pc.dictionary_encode(col)
+    if kind == "int64":
+        col = pc.if_else(pc.match_substring_regex(col, r"^[+-]?[0-9]+$"), col, pa.scalar(None, pa.string()))
+    return pc.cast(col, arrowType(kind))
+
+
+def arrowToFrame(table):
+    """Convert a table from `read_deck_arrow` to pandas. Numeric columns without nulls are handed over without
+    copying and dictionary columns become categoricals, so the string data isn't copied either."""
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def deckIndexPath(path):
+    """Path of the index sidecar for a deck file (`<deck file name>.idx.json` in the same directory)"""
+    return path.with_name(f"{path.name}.idx.json")
+
+
+def build_deck_index(buffer):
+    """Build a byte-offset index for the contents of an ADeck/BDeck file. Every run of consecutive lines with
+    the same DATETIME and TECH becomes one (start, end) byte range. Offsets of gzipped decks refer to
+    the decompressed bytes.
+
+    Args:
+        buffer (bytes-like): contents of a deck file
+
+    Returns:
+        pandas.DataFrame: DATETIME (YYYYMMDDHH str), TECH, START and END columns in file order
+    """
+    columns = ["DATETIME", "TECH", "START", "END"]
+    runs = list()
+    for block in deckBlocks(buffer):
+        num_lines = block.line_ends.size
+        date_lines, dates, date_inverse = fieldValues(block, ADECK_COLUMNS.index("DATETIME"))
+        tech_lines, techs, tech_inverse = fieldValues(block, ADECK_COLUMNS.index("TECH"))
+        if tech_lines.size == 0:
             continue
-        while len(parsed_line) < length:
-            parsed_line.extend([""])
-        lines.append(",".join(parsed_line))
-    return StringIO("\n".join(lines))
+        date_codes = np.full(num_lines, -1)
+        date_codes[date_lines] = date_inverse
+        tech_codes = np.full(num_lines, -1)
+        tech_codes[tech_lines] = tech_inverse
+        # only lines with a TECH field are indexed (they all have a DATETIME too)
+        lines = tech_lines
+        key = date_codes[lines] * len(techs) + tech_codes[lines]
+        new_run = np.ones(lines.size, dtype=bool)
+        new_run[1:] = (key[1:] != key[:-1]) | (lines[1:] != lines[:-1] + 1)
+        run_first = lines[new_run]
+        run_last = lines[np.append(np.flatnonzero(new_run)[1:], lines.size) - 1]
+        runs.append(
+            pd.DataFrame(
+                {
+                    "DATETIME": np.array(dates, dtype=object)[date_codes[run_first]],
+                    "TECH": np.array(techs, dtype=object)[tech_codes[run_first]],
+                    "START": block.offset + block.line_starts[run_first],
+                    # include the newline
+                    "END": block.offset + np.minimum(block.line_ends[run_last] + 1, block.data.size),
+                }
+            )
+        )
+    if len(runs) == 0:
+        return pd.DataFrame(columns=columns)
+    index = pd.concat(runs, ignore_index=True)
+    # join runs that were split up between blocks
+    new_run = (
+        (index.DATETIME != index.DATETIME.shift())
+        | (index.TECH != index.TECH.shift())
+        | (index.START != index.END.shift())
+    )
+    index = index.groupby(new_run.cumsum()).agg(DATETIME=("DATETIME", "first"), TECH=("TECH", "first"), START=("START", "min"), END=("END", "max"))
+    return index.reset_index(drop=True)[columns]
+
+
+def deck_index(path, save=False):
+    """Get the byte-offset index (see `build_deck_index`) of a deck file. The index is read from the sidecar
+    next to the file if there is one for the current version (size and modification time) of the file,
+    otherwise it is built from the file.
+
+    Offsets of gzipped decks refer to the decompressed bytes, so reading their ranges still decompresses the whole
+    file. The index only saves I/O for plain decks; for gzipped decks it only saves the line scan.
+
+    Args:
+        path (pathlib.Path): Path to the ADeck/BDeck file
+        save (bool, optional): Save a newly built index to the sidecar file. Defaults to False.
 
+    Returns:
+        pandas.DataFrame
+    """
+    if not isinstance(path, Path):
+        path = Path(path)
+    stat = path.stat()
+    index_path = deckIndexPath(path)
+    if index_path.exists():
+        try:
+            with open(index_path, "r") as j:
+                sidecar = json.load(j)
+            if sidecar.get("size") == stat.st_size and sidecar.get("mtime_ns") == stat.st_mtime_ns:
+                return pd.DataFrame(sidecar["ranges"], columns=["DATETIME", "TECH", "START", "END"])
+            logger.debug(f"{index_path.name} is out of date. Rebuilding")
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Unable to read {index_path.as_posix()}: {e}")
+
+    with deckBuffer(path) as buffer:
+        index = build_deck_index(buffer)
+    if save:
+        sidecar = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns, ranges=index.values.tolist())
+        try:
+            with open(index_path, "w") as j:
+                json.dump(sidecar, j)
+        except OSError as e:
+            logger.warning(f"Unable to save {index_path.as_posix()}: {e}")
+    return index
+
+
+def deckRanges(index, dates=None, techs=None, keys=None):
+    """Select byte ranges from a deck index
 
-def contains_date(file_path, date_time, date_col=2, sep=","):
-    """Parse an ATCF bdeck or adeck file to see if the provided date_time is
-    in it.
+    Args:
+        index (pandas.DataFrame): index from `deck_index`
+        dates (callable, optional): Keep ranges where `dates(DATETIME)` is True. Defaults to None.
+        techs (callable, optional): Keep ranges where `techs(TECH)` is True. Defaults to None.
+        keys (set[tuple[str, str]], optional): Keep ranges where (DATETIME, TECH) is in `keys`. Defaults to None.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) byte ranges in file order
+    """
+    keep = pd.Series(True, index=index.index)
+    if dates is not None:
+        keep &= index.DATETIME.map(dates).astype(bool)
+    if techs is not None:
+        keep &= index.TECH.map(techs).astype(bool)
+    if keys is not None:
+        keep &= pd.Series([key in keys for key in zip(index.DATETIME, index.TECH)], index=index.index, dtype=bool)
+    selected = index.loc[keep].sort_values("START")
+    return list(zip(selected.START.astype(int), selected.END.astype(int)))
+
+
+def contains_date(file_path, date_time):
+    """Check the index of an ATCF bdeck or adeck file (see `deck_index`) to see if the provided
+    date_time is in it.
 
     Args:
         file_path (str, pathlib.Path): path to the adeck or bdeck file
         date_time (str, datetime): date_time to check for
-        date_col (int, optional): Column where the date_times are. Defaults to 2.
-        sep (str, optional): Seperator used in the file. Defaults to ','.
 
     Returns:
         bool : True if date_time is in the file. False otherwise
@@ -268,62 +833,359 @@ def contains_date(file_path, date_time, date_col=2, sep=","):
     else:
         date_str = date_time
 
-    if not isinstance(file_path, Path):
-        file_path = Path(file_path)
+    # keep the index so the next lookup (and the parsers) can reuse it
+    index = deck_index(file_path, save=True)
+    return bool((index.DATETIME == date_str).any())
 
-    if file_path.name.endswith(".gz"):
-        text = compressed_atcf_to_text(file_path)
-    else:
-        with open(file_path, "r") as t:
-            text = t.read()
-
-    text = text.strip()
-    lines = text.split("\n")
-    dates = {line.split(sep)[date_col].strip() for line in lines}
-    if date_str in dates:
-        return True
-    else:
-        return False
 
+def changed_keys(path, previous_path):
+    """Compare a deck with the previous version of the same deck and find the forecasts/observations that were
+    added or changed. The lines of each (DATETIME, TECH) are compared byte for byte using the deck indices
+    (see `deck_index`), so appended lines and lines that were rewritten anywhere in the file are both picked up.
+
+    Args:
+        path (pathlib.Path): Path to the new version of the deck
+        previous_path (pathlib.Path): Path to the previous version of the deck
+
+    Returns:
+        set[tuple[str, str]]: (YYYYMMDDHH, TECH) keys that are new or whose lines changed
+    """
+    index = deck_index(path)
+    previous_index = deck_index(previous_path)
+    changed = set()
+    with deckBuffer(path) as new, deckBuffer(previous_path) as old:
+        previous_lines = dict()
+        for date_str, tech, start, end in previous_index.itertuples(index=False):
+            previous_lines[(date_str, tech)] = previous_lines.get((date_str, tech), b"") + old[int(start):int(end)]
+        lines = dict()
+        for date_str, tech, start, end in index.itertuples(index=False):
+            lines[(date_str, tech)] = lines.get((date_str, tech), b"") + new[int(start):int(end)]
+        for key, value in lines.items():
+            # ignore a missing newline at the end of the file
+            if previous_lines.get(key, b"").rstrip(b"\r\n") != value.rstrip(b"\r\n"):
+                changed.add(key)
+    return changed
+
+
+def deckHash(path):
+    """Hash the contents of a deck file. Compressed files are hashed after decompression so `.dat` and `.dat.gz`
+    versions of the same deck share a key.
+
+    Args:
+        path (pathlib.Path): Path to the deck file
+
+    Returns:
+        str: hex digest of the contents
+    """
+    with deckBuffer(path) as buffer:
+        return hashlib.blake2b(buffer, digest_size=20).hexdigest()
+
+
+def deckCachePath(path, parser, cache_dir=None):
+    """Location of the cached output of `parser` for the deck at `path`
+
+    Args:
+        path (pathlib.Path): Path to the deck file
+        parser (callable): `parse_aDeck` or `parse_bDeck`
+        cache_dir (pathlib.Path, optional): Cache directory. Defaults to `atcf.cache.dir` in `settings.yml`.
+
+    Returns:
+        pathlib.Path: Path to the parquet file, which may not exist yet
+    """
+    if cache_dir is None:
+        cache_dir = settings.atcf.cache.dir
+    return Path(cache_dir).joinpath(f"{deckHash(path)}_{parser.__name__}_v{PARSER_VERSION}.parquet")
+
+
+def cached_parse(parser, path, cache_dir=None, max_size=None):
+    """Parse a deck file using a persistent parquet cache. Entries are keyed by the contents of the file and the
+    parser version, so a file that hasn't changed (e.g. when reprocessing with `--force`) is read back from the cache
+    instead of being parsed again. Files that can't be parsed aren't cached. The cache is only an optimization: if it
+    can't be read or written (e.g. pyarrow is missing or the cache directory isn't writable) the file is parsed and the
+    parsed DataFrame is returned.
+
+    Args:
+        parser (callable): `parse_aDeck` or `parse_bDeck`
+        path (pathlib.Path): Path to the deck file
+        cache_dir (pathlib.Path, optional): Cache directory. Defaults to `atcf.cache.dir` in `settings.yml`.
+        max_size (float, optional): Maximum size of the cache in MB. The least recently used entries are evicted
+            once it is exceeded. Defaults to `atcf.cache.max_size` in `settings.yml`.
 
-def toStormDict(path):
+    Returns:
+        pandas.DataFrame: The output of `parser(path)`
+    """
+    if not isinstance(path, pathlib.Path):
+        path = Path(path)
+    # the cache is only an optimization, so any problem with it falls back to parsing the file
+    try:
+        cache_path = deckCachePath(path, parser, cache_dir=cache_dir)
+    except Exception as e:
+        logger.warning(f"Unable to use the deck cache for {path.name}: {e}")
+        return parser(path)
+    if cache_path.exists():
+        try:
+            logger.trace(f"Reading {path.name} from {cache_path.as_posix()}")
+            # touch the entry so eviction is least recently used rather than least recently written
+            os.utime(cache_path)
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            logger.warning(f"Unable to read {path.name} from {cache_path.as_posix()}: {e}")
+
+    df = parser(path)
+    if df is None or df.empty:
+        return df
+    # write to a temporary file first so a partially written entry is never read
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(cache_path)
+        logger.trace(f"Cached {path.name} as {cache_path.as_posix()}")
+
+        if max_size is None:
+            max_size = settings.atcf.cache.max_size
+        evictDeckCache(cache_path.parent, max_size)
+    except Exception as e:
+        logger.warning(f"Unable to cache {path.name} as {cache_path.as_posix()}: {e}")
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+    return df
+
+
+def evictDeckCache(cache_dir, max_size):
+    """Remove the least recently used entries from the deck cache until it is no larger than `max_size`
+
+    Args:
+        cache_dir (pathlib.Path): Cache directory
+        max_size (float): Maximum size of the cache in MB
+
+    Returns:
+        int: Number of entries removed
+    """
+    entries = list()
+    for entry in Path(cache_dir).glob("*.parquet"):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:  # removed by another process
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, entry))
+    total = sum(size for _, size, _ in entries)
+    max_bytes = max_size * 1024**2
+    removed = 0
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        logger.debug(f"Evicting {entry.name} from the deck cache")
+        entry.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+class BDeckRecords:
+    """Compact, fixed dtype representation of a parsed BDeck.
+
+    Only the fields used to build storm and observation records are kept. They are stored in a single NumPy
+    structured array (~70 bytes per line). BASIN, TECH, SUBREGION and STORMNAME are stored as integer codes into
+    `categories`, where -1 means the value is missing.
+
+    Attributes:
+        data (numpy.ndarray): structured array with dtype `BDeckRecords.DTYPE`
+        categories (dict[str, numpy.ndarray]): unique values for each categorical field
+    """
+
+    __slots__ = ("data", "categories")
+
+    DTYPE = np.dtype(
+        [
+            ("BASIN", "i1"),
+            ("SNUM", "i2"),
+            ("DATETIME", "M8[ns]"),
+            ("TECH", "i1"),
+            ("LAT", "f8"),
+            ("LON", "f8"),
+            ("VMAX", "f4"),
+            ("MSLP", "f4"),
+            ("RAD", "f4"),
+            ("NE", "f4"),
+            ("SE", "f4"),
+            ("SW", "f4"),
+            ("NW", "f4"),
+            ("POUTER", "f4"),
+            ("ROCI", "f4"),
+            ("RMW", "f4"),
+            ("SUBREGION", "i1"),
+            ("STORMNAME", "i2"),
+        ]
+    )
+    CATEGORICAL = ("BASIN", "TECH", "SUBREGION", "STORMNAME")
+
+    def __init__(self, data, categories):
+        self.data = data
+        self.categories = categories
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the records from the output of `parse_bDeck`
+
+        Args:
+            df (pandas.DataFrame): parsed BDeck
+
+        Returns:
+            BDeckRecords
+
+        Raises:
+            ValueError: If an integer field (SNUM) is missing or isn't a whole number
+        """
+        data = np.empty(len(df), dtype=cls.DTYPE)
+        categories = dict()
+        for name in cls.DTYPE.names:
+            if name in cls.CATEGORICAL:
+                codes, uniques = pd.factorize(df[name])
+                if len(uniques) > np.iinfo(cls.DTYPE[name]).max:
+                    raise ValueError(f"Too many unique values ({len(uniques)}) for {name}")
+                data[name] = codes
+                categories[name] = np.asarray(uniques, dtype=object)
+            elif cls.DTYPE[name].kind == "i":
+                values = df[name].to_numpy()
+                if values.dtype.kind == "f" and not np.isfinite(values).all():
+                    raise ValueError(f"{name} has missing values")
+                if (values != np.round(values)).any():
+                    raise ValueError(f"{name} has values that aren't integers")
+                data[name] = values
+            else:
+                data[name] = df[name].to_numpy()
+        return cls(data, categories)
+
+    @classmethod
+    def from_deck(cls, path, cache=False):
+        """Parse a BDeck file straight into records. The intermediate DataFrame is discarded.
+
+        Args:
+            path (pathlib.Path): Path to the BDeck file
+            cache (bool, optional): Read/write the parsed deck from the deck cache (see `cached_parse`). Defaults to False.
+
+        Returns:
+            BDeckRecords
+        """
+        df = cached_parse(parse_bDeck, path) if cache else parse_bDeck(path)
+        return cls.from_frame(df)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return BDeckRecords(np.atleast_1d(self.data[key]), self.categories)
+
+    @property
+    def empty(self):
+        return len(self.data) == 0
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + sum(values.nbytes for values in self.categories.values())
+
+    def column(self, name):
+        """Values of a single field. Categorical fields are decoded to an object array of strings."""
+        values = self.data[name]
+        if name in self.categories:
+            # code -1 (missing) picks up the trailing None
+            return np.append(self.categories[name], None)[values]
+        return values
+
+    def value(self, name, index=0):
+        """A single value as a Python scalar (`str`, `int`, `float`, `pandas.Timestamp` or None)"""
+        value = self.data[name][index]
+        if name in self.categories:
+            return None if value < 0 else self.categories[name][value]
+        if name == "DATETIME":
+            return pd.Timestamp(value)
+        return value.item()
+
+    def at(self, date_times):
+        """Rows observed at any of `date_times`. Matched on the deck's YYYYMMDDHH wall clock, like `parse_bDeck`.
+
+        Args:
+            date_times (list[datetime.datetime])
+
+        Returns:
+            BDeckRecords
+        """
+        times = np.array([dt.strftime("%Y-%m-%dT%H") for dt in date_times], dtype="M8[ns]")
+        return self[np.flatnonzero(np.isin(self.data["DATETIME"], times))]
+
+    def observations(self):
+        """Split the records into one set per observation datetime, in chronological order
+
+        Yields:
+            BDeckRecords: the rows (one per wind radii threshold) of a single observation
+        """
+        times = self.data["DATETIME"]
+        order = np.argsort(times, kind="stable")
+        bounds = np.flatnonzero(np.diff(times[order].view("i8"))) + 1
+        for rows in np.split(order, bounds):
+            if len(rows) > 0:
+                yield self[rows]
+
+    def radialValues(self, rad):
+        """Same as `getRadialValues` for the rows of a single observation"""
+        assert len(self) <= 3, f"Observation has {len(self)} rows. Can't have more than 3"
+
+        quads = ["NE", "SE", "SW", "NW"]
+        rows = np.flatnonzero(self.data["RAD"] == rad)
+        if len(rows) == 0:
+            return {quad: None for quad in quads}
+        else:
+            return {quad: int(val.validate_distance(self.value(quad, rows[0]))) for quad in quads}
+
+
+def toStormDict(path, cache=False, records=None):
     if not isinstance(path, pathlib.Path):
         path = Path(path)
 
 
     basin = path.name[1:3]
-    season = int(path.stem.split('_')[0][5:])
+    # handles both lake (bal092022_20220901T0000.csv) and raw/archive (bal092022.dat[.gz]) file names
+    season = int(path.name.split('.')[0].split('_')[0][5:])
     # determine whic organization the data is coming from (to be used in the name for invests)
     if basin.lower() in ['al', 'ep', 'cp']:
         org = 'NHC'
     else:
         org = 'JTWC'
 
-    df = parse_bDeck(path)
-    if df.empty:
+    if records is None:
+        records = BDeckRecords.from_deck(path, cache=cache)
+    if records.empty:
         return None
 
     # determine the "strongest" storm type the storm has experienced so we can use
     # that in the storm name
-    storm_type = get_storm_type(df.VMAX.max(), df.BASIN.values[0]) 
-
-    name = df.STORMNAME.values[-1].title()
-    nhc_number = df.SNUM.values[-1]
-    subregion = df.SUBREGION.values[-1]
+    vmax = records.data["VMAX"]
+    if np.isnan(vmax).all():
+        raise ValueError(f"{path.name} has no VMAX values")
+    storm_type = get_storm_type(np.nanmax(vmax), records.value("BASIN", 0))
+
+    name = records.value("STORMNAME", -1).title()
+    nhc_number = records.value("SNUM", -1)
+    subregion = records.value("SUBREGION", -1)
     if nhc_number >= 70:
         name = f"{org.upper()}-{nhc_number:02d}{subregion}"
     else:
         name = f"{storm_type}-{name}"
 
-    start_date = df.DATETIME.min()
-    end_date = df.DATETIME.max()
+    start_date = pd.Timestamp(records.data["DATETIME"].min())
+    end_date = pd.Timestamp(records.data["DATETIME"].max())
     #seasot = start_date.year
     nhc_number = nhc_number
-    region = df.BASIN.values[0]
+    region = records.value("BASIN", 0)
     nhc_id = f"{region}{nhc_number:02d}{season}".upper()
     name = name
-    start_lat = val.validate_latitude(df.LAT.values[0], raise_on_fail=True)
-    start_lon = val.validate_longitude(df.LON.values[0], raise_on_fail=True)
+    start_lat = val.validate_latitude(records.value("LAT", 0), raise_on_fail=True)
+    start_lon = val.validate_longitude(records.value("LON", 0), raise_on_fail=True)
     storm_dict = dict(
         nhc_number=int(nhc_number),
         nhc_id=nhc_id,
@@ -337,6 +1199,48 @@ def toStormDict(path):
     return storm_dict
 
 
+ParsedBDeck = namedtuple("ParsedBDeck", ["path", "storm", "records"])
+
+
+def load_bDeck(path, cache=False):
+    """Parse a BDeck once into everything the storm and observation loaders need. The result is read-only so it
+    can be handed to both `processStorms` and `processObservations` without either one affecting the other.
+
+    Args:
+        path (pathlib.Path): Path to the BDeck file
+        cache (bool, optional): Read/write the parsed deck from the deck cache (see `cached_parse`). Defaults to False.
+
+    Returns:
+        ParsedBDeck: `storm` is a read-only view of the `toStormDict` output (None if the deck is empty) and
+            `records` holds every observation in the deck
+    """
+    path = Path(path)
+    records = BDeckRecords.from_deck(path, cache=cache)
+    records.data.flags.writeable = False
+    storm_dict = toStormDict(path, records=records)
+    storm = None if storm_dict is None else MappingProxyType(storm_dict)
+    return ParsedBDeck(path, storm, records)
+
+
+def load_bDecks(paths, cache=False):
+    """Parse each BDeck in `paths` once (see `load_bDeck`). Files that can't be parsed are logged and skipped.
+
+    Args:
+        paths (iterable[pathlib.Path])
+        cache (bool, optional): Read/write the parsed decks from the deck cache. Defaults to False.
+
+    Returns:
+        dict[str, ParsedBDeck]: keyed by file name, in file name order
+    """
+    decks = dict()
+    for path in sorted(Path(p) for p in paths):
+        try:
+            decks[path.name] = load_bDeck(path, cache=cache)
+        except Exception:
+            logger.error(f"Unable to parse {path.as_posix()}")
+    return decks
+
+
 def observationDictFromDataFrame(ob, storm_id=None):
     """Create a new Observation instance from a BDeck observation set
 
@@ -347,24 +1251,35 @@ def observationDictFromDataFrame(ob, storm_id=None):
     Returns:
             tables.Observation
     """
-    if len(ob.DATETIME.unique()) != 1:
+    return observationDictFromRecords(BDeckRecords.from_frame(ob), storm_id)
+
+
+def observationDictFromRecords(ob, storm_id=None):
+    """Create a new Observation instance from a BDeck observation set
+
+    Args:
+            ob (BDeckRecords): The records of a single BDeck observation (see `BDeckRecords.observations`)
+            storm_id (int): Storm id that the observation belongs to
+
+    Returns:
+            tables.Observation
+    """
+    if len(np.unique(ob.data["DATETIME"])) != 1:
         raise ValueError(
-            "Observation rows may only contain a single unique datetime. Received {len(ob.DATETIME.unique())} unique datetimes"
+            f"Observation rows may only contain a single unique datetime. Received {len(np.unique(ob.data['DATETIME']))} unique datetimes"
         )
 
-    date_time = ob.DATETIME.unique()[0]
-
-    r34 = getRadialValues(ob, 34)
-    r50 = getRadialValues(ob, 50)
-    r64 = getRadialValues(ob, 64)
+    r34 = ob.radialValues(34)
+    r50 = ob.radialValues(50)
+    r64 = ob.radialValues(64)
 
     observation = dict(
         storm_id=storm_id,
-        datetime_utc=pd.Timestamp(date_time),
-        latitude=val.validate_latitude(ob.LAT.values[0], raise_on_fail=True),
-        longitude=val.validate_longitude(ob.LON.values[0], raise_on_fail=True),
-        intensity_kts=val.validate_velocity(ob.VMAX.values[0], raise_on_fail=True),
-        mslp_mb=val.validate_pressure(ob.MSLP.values[0]),
+        datetime_utc=ob.value("DATETIME", 0),
+        latitude=val.validate_latitude(ob.value("LAT", 0), raise_on_fail=True),
+        longitude=val.validate_longitude(ob.value("LON", 0), raise_on_fail=True),
+        intensity_kts=val.validate_velocity(ob.value("VMAX", 0), raise_on_fail=True),
+        mslp_mb=val.validate_pressure(ob.value("MSLP", 0)),
         r34_ne=r34.get("NE"),
         r34_se=r34.get("SE"),
         r34_sw=r34.get("SW"),
@@ -377,14 +1292,94 @@ def observationDictFromDataFrame(ob, storm_id=None):
         r64_se=r64.get("SE"),
         r64_sw=r64.get("SW"),
         r64_nw=r64.get("NW"),
-        pouter_mb=val.validate_pressure(ob.POUTER.values[0]),
-        router_nmi=val.validate_distance(ob.ROCI.values[0]),
-        rmw_nmi=val.validate_distance(ob.RMW.values[0]),
+        pouter_mb=val.validate_pressure(ob.value("POUTER", 0)),
+        router_nmi=val.validate_distance(ob.value("ROCI", 0)),
+        rmw_nmi=val.validate_distance(ob.value("RMW", 0)),
     )
 
     return observation
 
 
+def observationBatch(records):
+    """Pivot BDeck records (one row per wind radii threshold) into one wide row per observation datetime and
+    validate every field at once. Validation follows `observationDictFromRecords`: unrealistic positions, intensities
+    and wind radii raise a ValueError, unrealistic pressures are replaced with 1000 and unrealistic distances with NaN.
+
+    Args:
+        records (BDeckRecords | pandas.DataFrame): records for a single storm
+
+    Returns:
+        dict[str, numpy.ndarray]: columns keyed by the Observation field names (without `storm_id`). Wind radii
+            are NaN when the threshold wasn't reported.
+    """
+    if isinstance(records, pd.DataFrame):
+        records = BDeckRecords.from_frame(records)
+    data = records.data[np.argsort(records.data["DATETIME"], kind="stable")]
+    times, first, counts = np.unique(data["DATETIME"], return_index=True, return_counts=True)
+    assert (counts <= 3).all(), f"Observation has {counts.max()} rows. Can't have more than 3"
+    obs = data[first]
+
+    batch = dict(
+        datetime_utc=times,
+        latitude=val.validate_latitude_array(obs["LAT"], raise_on_fail=True).values,
+        longitude=val.validate_longitude_array(obs["LON"], raise_on_fail=True).values,
+        intensity_kts=val.validate_velocity_array(obs["VMAX"], raise_on_fail=True).values,
+        mslp_mb=val.validate_pressure_array(obs["MSLP"]).values,
+    )
+
+    for rad in [34, 50, 64]:
+        rows = np.flatnonzero(data["RAD"] == rad)
+        # only the first row for each datetime is used
+        positions, keep = np.unique(np.searchsorted(times, data["DATETIME"][rows]), return_index=True)
+        rows = rows[keep]
+        for quad in ["NE", "SE", "SW", "NW"]:
+            # a reported threshold must have all 4 radii
+            values = val.validate_distance_array(data[quad][rows], raise_on_fail=True, required=True).values
+            column = np.full(len(times), np.nan)
+            column[positions] = values
+            batch[f"r{rad}_{quad.lower()}"] = column
+
+    batch["pouter_mb"] = val.validate_pressure_array(obs["POUTER"]).values
+    batch["router_nmi"] = val.validate_distance_array(obs["ROCI"]).values
+    batch["rmw_nmi"] = val.validate_distance_array(obs["RMW"]).values
+    return batch
+
+
+def observationDictsFromRecords(records, storm_id=None):
+    """Build the Observation dicts for every observation datetime of a storm in one pass (see `observationBatch`)
+
+    Args:
+        records (BDeckRecords | pandas.DataFrame): records for a single storm
+        storm_id (int): Storm id that the observations belong to
+
+    Returns:
+        list[dict]: one dict per datetime, in chronological order, matching `observationDictFromRecords`
+    """
+    return observationDictsFromBatch(observationBatch(records), storm_id)
+
+
+def observationDictsFromBatch(batch, storm_id=None):
+    """Convert the columns returned by `observationBatch` to Observation dicts
+
+    Args:
+        batch (dict[str, numpy.ndarray]): output of `observationBatch`
+        storm_id (int): Storm id that the observations belong to
+
+    Returns:
+        list[dict]: one dict per datetime
+    """
+    columns = dict()
+    for name, values in batch.items():
+        if name == "datetime_utc":
+            columns[name] = [pd.Timestamp(t) for t in values]
+        elif name.startswith("r") and name[1:3].isdigit():
+            columns[name] = [None if np.isnan(x) else int(x) for x in values.tolist()]
+        else:
+            columns[name] = [None if np.isnan(x) else x for x in values.tolist()]
+    names = list(columns)
+    return [dict(storm_id=storm_id, **dict(zip(names, row))) for row in zip(*columns.values())]
+
+
 def stepFromDataFrame(df, hour, track_id):
 
     r34 = getRadialValues(df, 34)
@@ -415,6 +1410,67 @@ def stepFromDataFrame(df, hour, track_id):
     return step
 
 
+def stepBatch(df):
+    """Collapse a single ADeck forecast (one model and initialization datetime) into one row per forecast hour and
+    validate every field at once. The first row of each hour is used, so the extra rows for the 50 and 64 kt wind radii
+    are dropped. Validation follows `stepFromDataFrame`: unrealistic positions and intensities raise a ValueError,
+    unrealistic pressures are replaced with 1000 and negative forecast hours with NaN.
+
+    Args:
+        df (pandas.DataFrame): rows of a single forecast, as returned by `parse_aDeck` or `iter_aDeck_forecasts`
+
+    Returns:
+        dict[str, numpy.ndarray]: columns keyed by the Step field names (without `track_id`), sorted by hour
+    """
+    tau = df.TAU.to_numpy()
+    order = np.argsort(tau, kind="stable")
+    hours, first = np.unique(tau[order], return_index=True)
+    rows = order[first]
+
+    batch = dict(
+        hour=val.validate_forecast_step_array(hours).values,
+        latitude=val.validate_latitude_array(df.LAT.to_numpy(dtype=float)[rows], raise_on_fail=True).values,
+        longitude=val.validate_longitude_array(df.LON.to_numpy(dtype=float)[rows], raise_on_fail=True).values,
+        intensity_kts=val.validate_velocity_array(df.VMAX.to_numpy(dtype=float)[rows], raise_on_fail=True).values,
+        mslp_mb=val.validate_pressure_array(df.MSLP.to_numpy(dtype=float)[rows]).values,
+    )
+    return batch
+
+
+def stepDictsFromDataFrame(df, track_id):
+    """Build the Step dicts for every forecast hour of a single forecast in one pass (see `stepBatch`)
+
+    Args:
+        df (pandas.DataFrame): rows of a single forecast
+        track_id (int): Track id that the steps belong to
+
+    Returns:
+        list[dict]: one dict per forecast hour, in order, matching `stepFromDataFrame`
+    """
+    return stepDictsFromBatch(stepBatch(df), track_id)
+
+
+def stepDictsFromBatch(batch, track_id=None):
+    """Convert the columns returned by `stepBatch` to Step dicts
+
+    Args:
+        batch (dict[str, numpy.ndarray]): output of `stepBatch`. May also hold a `track_id` column when the
+            steps of several tracks are converted at once.
+        track_id (int, optional): Track id that the steps belong to. Defaults to None.
+
+    Returns:
+        list[dict]: one dict per forecast hour
+    """
+    columns = dict() if track_id is None else dict(track_id=[track_id] * len(batch["hour"]))
+    for name, values in batch.items():
+        if name == "hour":
+            columns[name] = [None if np.isnan(x) else int(x) for x in values.tolist()]
+        else:
+            columns[name] = values.tolist()
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
 def getRadialValues(df, rad):
 
     assert len(df) <= 3, f"DataFrame has {len(df)} rows. Can't have more than 3"
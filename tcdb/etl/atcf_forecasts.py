@@ -22,12 +22,15 @@ RUN_ID = f"ATCF__{DATE_TIME.isoformat()}"
 
 
 
-def process_adecks(file_list, remove=True):
+def process_adecks(file_list, remove=True, storm_id=None):
     """Load ATCF track data from a csv and save the data to the database
 
     Args:
-        file_list (list[pathlib.Path]): list of paths to ATCF track files
+        file_list (list[pathlib.Path] | iterable[atcf.AdeckForecast]): list of paths to ATCF track files written
+            by `processAdeck`, or forecast records streamed by `atcf.iter_aDeck_forecasts`
         remove (bool, optional): Remove the track file after processing. Default 
+        storm_id (int, optional): Storm the forecast records belong to. Required when `file_list` contains
+            `atcf.AdeckForecast` records, otherwise the storm id is parsed from the file name. Defaults to None.
     """
     paths = settings.get("paths")
     # variables to keep track of additions and changes to the DB 
@@ -46,17 +49,27 @@ def process_adecks(file_list, remove=True):
     Session = sessionmaker(engine)
     with Session() as session:
         for ind, file in enumerate(file_list):
-            logger.trace(f"Processing {file.name}")
-            # https://docs.sqlalchemy.org/en/14/orm/session_basics.html#framing-out-a-begin-commit-rollback-block
-            with session.begin():
+            if isinstance(file, atcf.AdeckForecast):
+                # forecast records already hold the parsed adeck rows
+                logger.trace(f"Processing {file.tech} [{file.datetime.isoformat()}]")
+                date_time = file.datetime.to_pydatetime()
+                model_str = file.tech
+                df = file.rows
+            else:
+                logger.trace(f"Processing {file.name}")
                 # get storm information 
                 storm_id = int(file.name.split('-')[1])
+                date_time = datetime.strptime(file.stem.split('_')[-1], '%Y%m%d%H')
+                model_str = file.name.split('_')[1]
+                # parse the adeck file
+                df = pd.read_csv(file) 
+
+            # https://docs.sqlalchemy.org/en/14/orm/session_basics.html#framing-out-a-begin-commit-rollback-block
+            with session.begin():
                 storm = session.query(Storm).where(Storm.id == storm_id).one()
                 if ind == 0:
                     logger.info(f"Loading track files for {storm.name} into database")
 
-                date_time = datetime.strptime(file.stem.split('_')[-1], '%Y%m%d%H')
-
                 # get data source information
                 region = storm._region
                 if region.short_name.lower() in ['al', 'ep', 'cp']:
@@ -65,12 +78,8 @@ def process_adecks(file_list, remove=True):
                     data_source = session.query(DataSource).where(DataSource.short_name == "JTWC").one()
                     
                 # get model information            
-                model_str = file.name.split('_')[1]
                 model = session.query(Model).where(Model.short_name == model_str).one()
 
-                # parse the adeck file
-                df = pd.read_csv(file) 
-
                 # see if forecast record already exists
                 forecast = (
                     session.query(Forecast)
@@ -115,23 +124,26 @@ def process_adecks(file_list, remove=True):
                     session.flush()
                     tracks_added += 1
 
-                # iterate through forecast steps and add to DB
-                for hour, rows in sorted(df.groupby("TAU")):
-                    step = session.query(Step).where(Step.track_id == track.id).where(Step.hour == hour).one_or_none()
+                # build every forecast step at once and compare against the existing steps for the track
+                existing_steps = {step.hour: step for step in session.query(Step).where(Step.track_id == track.id)}
+                new_steps = list()
+                for step_dict in atcf.stepDictsFromDataFrame(df, track.id):
+                    step = existing_steps.get(step_dict.get("hour"))
                     if step is None:
-                        step = Step.from_dict(atcf.stepFromDataFrame(rows, hour, track.id))
+                        step = Step.from_dict(step_dict)
                         step.run_id = RUN_ID
-                        session.add(step)
-                        steps_added += 1
+                        new_steps.append(step)
                     else:
                         # see if anything needs to be updated
-                        tmp_dict = atcf.stepFromDataFrame(rows, hour, track.id)
-                        updated_keys = step.updateFromDict(tmp_dict, check_only=False)
+                        updated_keys = step.updateFromDict(step_dict, check_only=False)
                         if len(updated_keys) > 0:
                             steps_updated +=1
+                # insert the new steps in bulk
+                session.bulk_save_objects(new_steps)
+                steps_added += len(new_steps)
                 # flush after adding all the steps
                 session.flush()
-                if remove:
+                if remove and not isinstance(file, atcf.AdeckForecast):
                     file.unlink()
             session.commit()
         logger.info(f"Summary for storm {storm.id} [{storm.name}]")
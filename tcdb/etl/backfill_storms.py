@@ -0,0 +1,415 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from loguru import logger
+from pathlib import Path
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from datetime import datetime, timezone
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from tcdb.etl import atcf
+from tcdb.config import settings
+from tcdb.models import Region, Storm, Observation, Forecast, Track, Step, DataSource, Model
+
+DATE_TIME = datetime.now(tz=timezone.utc)
+DATE_STR = DATE_TIME.isoformat().split(".")[0]
+RUN_ID = f"BACKFILL__{DATE_TIME.isoformat()}"
+
+# number of rows sent to the DB per INSERT/SELECT
+CHUNK_SIZE = 5000
+
+ArchiveStorm = namedtuple("ArchiveStorm", ["bdeck", "storm", "observations", "forecasts", "steps"])
+
+
+def parseArchiveStorm(bdeck_path, adeck_path=None, models=None):
+    """Parse the BDeck and ADeck of a single archived storm into typed batches. Runs in the worker processes.
+
+    Args:
+        bdeck_path (pathlib.Path): Path to the BDeck file
+        adeck_path (pathlib.Path, optional): Path to the matching ADeck file. Defaults to None.
+        models (list[str], optional): Models to keep from the ADeck. Defaults to all models.
+
+    Returns:
+        ArchiveStorm: `storm` is the dict from `atcf.toStormDict`, `observations` the columns from `atcf.observationBatch`,
+            `forecasts` a list of (datetime, tech) and `steps` the concatenated `atcf.stepBatch` columns with an extra
+            `forecast` column holding the index of the forecast each step belongs to. None if the BDeck can't be parsed.
+    """
+    try:
+        records = atcf.BDeckRecords.from_deck(bdeck_path)
+        storm_dict = atcf.toStormDict(bdeck_path, records=records)
+        if storm_dict is None:
+            return None
+        observations = atcf.observationBatch(records)
+    except Exception as e:
+        logger.error(f"Unable to parse {bdeck_path.as_posix()}: {e}")
+        return None
+
+    forecasts = list()
+    batches = list()
+    if adeck_path is not None and adeck_path.exists():
+        try:
+            for DATETIME, TECH, rows in atcf.iter_aDeck_forecasts(adeck_path, models=models):
+                try:
+                    batch = atcf.stepBatch(rows)
+                except ValueError as e:
+                    logger.debug(f"Skipping {TECH} [{DATETIME.isoformat()}] from {adeck_path.name}: {e}")
+                    continue
+                batch["forecast"] = np.full(len(batch["hour"]), len(forecasts), dtype=np.int32)
+                forecasts.append((DATETIME.to_pydatetime(), TECH))
+                batches.append(batch)
+        except Exception as e:
+            # the storm and its observations are still loaded
+            logger.error(f"Unable to parse {adeck_path.as_posix()}: {e}")
+            forecasts = list()
+            batches = list()
+    if len(batches) > 0:
+        steps = {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+    else:
+        steps = dict(forecast=np.empty(0, dtype=np.int32))
+    return ArchiveStorm(bdeck_path.name, storm_dict, observations, forecasts, steps)
+
+
+def chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def loadStorm(session, region, archive_storm, next_annual_id):
+    """Insert or update the storm record and insert any observations that aren't in the DB yet
+
+    Returns:
+        tuple[tcdb.models.Storm, int]: the storm record and the number of observations added
+    """
+    storm_dict = dict(archive_storm.storm, region_id=region.id, status="Archive", run_id=RUN_ID)
+    storm = (
+        session.query(Storm)
+        .where(Storm.nhc_id == storm_dict.get("nhc_id"))
+        .where(Storm.start_date == storm_dict.get("start_date"))
+        .one_or_none()
+    )
+    if storm is None:
+        storm = Storm.from_dict(storm_dict)
+        storm.annual_id = next_annual_id
+        logger.info(f"Adding storm {storm.nhc_id} [{storm.name}] with annual_id {storm.annual_id}")
+        session.add(storm)
+    else:
+        storm_dict.pop("run_id")
+        if len(storm.updateFromDict(storm_dict)) > 0:
+            storm.run_id = RUN_ID
+    # flush so the storm id is populated
+    session.flush()
+
+    existing = {dt for (dt,) in session.query(Observation.datetime_utc).where(Observation.storm_id == storm.id)}
+    observations = [
+        dict(ob_dict, run_id=RUN_ID)
+        for ob_dict in atcf.observationDictsFromBatch(archive_storm.observations, storm.id)
+        if ob_dict.get("datetime_utc") not in existing
+    ]
+    for chunk in chunks(observations):
+        session.bulk_insert_mappings(Observation, chunk)
+    return storm, len(observations)
+
+
+def loadForecasts(session, keys):
+    """Insert the forecasts in `keys` that aren't in the DB yet
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        keys (set[tuple[int, int, int, datetime.datetime]]): (region_id, data_source_id, model_id, datetime_utc)
+
+    Returns:
+        tuple[dict, int]: forecast ids keyed by `keys` and the number of forecasts added
+    """
+    def existingForecasts():
+        forecast_ids = dict()
+        for region_id, data_source_id in {key[:2] for key in keys}:
+            dates = [key[3] for key in keys if key[:2] == (region_id, data_source_id)]
+            query = (
+                session.query(Forecast.id, Forecast.model_id, Forecast.datetime_utc)
+                .where(Forecast.region_id == region_id)
+                .where(Forecast.data_source_id == data_source_id)
+                .where(Forecast.datetime_utc >= min(dates))
+                .where(Forecast.datetime_utc <= max(dates))
+            )
+            for forecast_id, model_id, datetime_utc in query:
+                forecast_ids[(region_id, data_source_id, model_id, datetime_utc)] = forecast_id
+        return forecast_ids
+
+    forecast_ids = existingForecasts()
+    new_forecasts = [
+        dict(region_id=key[0], data_source_id=key[1], model_id=key[2], datetime_utc=key[3], run_id=RUN_ID)
+        for key in sorted(keys)
+        if key not in forecast_ids
+    ]
+    for chunk in chunks(new_forecasts):
+        session.bulk_insert_mappings(Forecast, chunk)
+    if len(new_forecasts) > 0:
+        forecast_ids = existingForecasts()
+    return forecast_ids, len(new_forecasts)
+
+
+def loadTracks(session, keys):
+    """Insert the tracks in `keys` that aren't in the DB yet
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        keys (set[tuple[int, int]]): (storm_id, forecast_id). All ATCF forecasts have ensemble_number == 1
+
+    Returns:
+        tuple[dict, int]: track ids keyed by `keys` and the number of tracks added
+    """
+    storm_ids = sorted({storm_id for storm_id, _ in keys})
+
+    def existingTracks():
+        query = (
+            session.query(Track.id, Track.storm_id, Track.forecast_id)
+            .where(Track.storm_id.in_(storm_ids))
+            .where(Track.ensemble_number == 1)
+        )
+        return {(storm_id, forecast_id): track_id for track_id, storm_id, forecast_id in query}
+
+    track_ids = existingTracks()
+    new_tracks = [
+        dict(storm_id=storm_id, forecast_id=forecast_id, ensemble_number=1, run_id=RUN_ID)
+        for storm_id, forecast_id in sorted(keys)
+        if (storm_id, forecast_id) not in track_ids
+    ]
+    for chunk in chunks(new_tracks):
+        session.bulk_insert_mappings(Track, chunk)
+    if len(new_tracks) > 0:
+        track_ids = existingTracks()
+    return track_ids, len(new_tracks)
+
+
+def loadArchiveSeason(session, archive_storms):
+    """Bulk load parsed storms of a single season. Existing records are matched on their unique keys so the
+    same storms can be loaded more than once without creating duplicates. Existing steps are not updated.
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        archive_storms (list[ArchiveStorm]): output of `parseArchiveStorm`
+
+    Returns:
+        collections.Counter: number of records added for each table
+    """
+    counts = Counter()
+    regions = {region.short_name: region for region in session.query(Region)}
+    data_sources = {data_source.short_name: data_source.id for data_source in session.query(DataSource)}
+    models = {model.short_name: model.id for model in session.query(Model)}
+    missing_models = set()
+
+    annual_ids = dict()
+    storm_forecasts = list()
+    # load storms in the order they formed so annual ids are assigned in order
+    for archive_storm in sorted(archive_storms, key=lambda s: s.storm.get("start_date")):
+        region = regions[archive_storm.storm.get("nhc_id")[:2]]
+        season = archive_storm.storm.get("season")
+        if (season, region.id) not in annual_ids:
+            last_annual_id = (
+                session.query(func.max(Storm.annual_id))
+                .where(Storm.season == season)
+                .where(Storm.region_id == region.id)
+                .scalar()
+            )
+            annual_ids[(season, region.id)] = last_annual_id or 0
+        storm, observations_added = loadStorm(session, region, archive_storm, annual_ids[(season, region.id)] + 1)
+        if storm.annual_id > annual_ids[(season, region.id)]:
+            annual_ids[(season, region.id)] = storm.annual_id
+        counts["observations"] += observations_added
+
+        data_source_id = data_sources["NHC" if region.short_name.lower() in ["al", "ep", "cp"] else "JTWC"]
+        forecast_keys = list()
+        for date_time, tech in archive_storm.forecasts:
+            if tech not in models:
+                missing_models.add(tech)
+                forecast_keys.append(None)
+                continue
+            forecast_keys.append((region.id, data_source_id, models[tech], date_time))
+        storm_forecasts.append((storm.id, forecast_keys, archive_storm.steps))
+
+    if len(missing_models) > 0:
+        logger.warning(f"Skipping forecasts for models that aren't in the models table: {sorted(missing_models)}")
+
+    keys = {key for _, forecast_keys, _ in storm_forecasts for key in forecast_keys if key is not None}
+    if len(keys) == 0:
+        return counts
+    forecast_ids, counts["forecasts"] = loadForecasts(session, keys)
+    track_keys = {
+        (storm_id, forecast_ids[key]) for storm_id, forecast_keys, _ in storm_forecasts for key in forecast_keys if key is not None
+    }
+    track_ids, counts["tracks"] = loadTracks(session, track_keys)
+
+    # map every step to its track, skipping forecasts for unknown models
+    batches = list()
+    for storm_id, forecast_keys, steps in storm_forecasts:
+        forecast_track_ids = np.array(
+            [-1 if key is None else track_ids[(storm_id, forecast_ids[key])] for key in forecast_keys],
+            dtype=np.int64,
+        )
+        step_track_ids = forecast_track_ids[steps["forecast"]]
+        keep = step_track_ids >= 0
+        if "hour" in steps:
+            # negative forecast hours are rejected by Step.from_dict as well
+            keep &= ~np.isnan(steps["hour"])
+        if not keep.any():
+            continue
+        batch = {name: values[keep] for name, values in steps.items() if name != "forecast"}
+        batch["track_id"] = step_track_ids[keep]
+        batches.append(batch)
+    if len(batches) == 0:
+        return counts
+    steps = {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+    existing = set()
+    for chunk in chunks(np.unique(steps["track_id"]).tolist()):
+        query = session.query(Step.track_id, Step.hour).where(Step.track_id.in_(chunk))
+        existing.update((track_id, hour) for track_id, hour in query)
+    new_steps = [
+        dict(step_dict, run_id=RUN_ID)
+        for step_dict in atcf.stepDictsFromBatch(steps)
+        if (step_dict.get("track_id"), step_dict.get("hour")) not in existing
+    ]
+    for chunk in chunks(new_steps):
+        session.bulk_insert_mappings(Step, chunk)
+    counts["steps"] = len(new_steps)
+    return counts
+
+
+def saveState(state_path, completed):
+    """Record the BDecks that have been loaded. The file is replaced in one step so an interrupted write never
+    loses the previous state."""
+    tmp_path = state_path.with_name(f".{state_path.name}.{os.getpid()}")
+    tmp_path.write_text(json.dumps(dict(completed=sorted(completed), last_update=DATE_STR), indent=2))
+    tmp_path.replace(state_path)
+
+
+def process_archive_data(archive_dir, regions=None, models=None, workers=None, state_path=None, force=False):
+    """Backfill a season from the ATCF archive (e.g. https://ftp.nhc.noaa.gov/atcf/archive/2005/).
+
+    Every BDeck in `archive_dir` is parsed, along with the ADeck of the same storm, in a pool of worker processes.
+    The parsed storms are then bulk loaded into the storms, observations, forecasts, tracks and steps tables with one
+    transaction per storm. Progress is recorded in `state_path` as each storm is committed, so running it again
+    skips the files that were already loaded unless `force` is True.
+
+    Args:
+        archive_dir (pathlib.Path): Directory holding the BDeck (b*.dat[.gz]) and ADeck (a*.dat[.gz]) files of a season
+        regions (list[str], optional): Only load these regions (e.g. ["al", "ep"]). Defaults to all regions.
+        models (list[str], optional): Models to load from the ADecks. Defaults to the definition in `settings.yml`.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        state_path (pathlib.Path, optional): File used to record which BDecks have been loaded.
+            Defaults to `.backfill_state.json` in `archive_dir`.
+        force (bool, optional): Reload files that have already been loaded. Defaults to False.
+
+    Returns:
+        collections.Counter: number of records added for each table
+    """
+    archive_dir = Path(archive_dir)
+    if models is None:
+        models = settings.atcf.adeck.models
+    if state_path is None:
+        state_path = archive_dir.joinpath(".backfill_state.json")
+    state_path = Path(state_path)
+    completed = set()
+    if state_path.exists() and not force:
+        completed = set(json.loads(state_path.read_text()).get("completed", list()))
+
+    bdecks = list()
+    for bdeck_path in sorted(archive_dir.glob("b*.dat*")):
+        if regions is not None and bdeck_path.name[1:3].lower() not in [region.lower() for region in regions]:
+            continue
+        if bdeck_path.name in completed:
+            logger.debug(f"{bdeck_path.name} has already been loaded. Skipping")
+            continue
+        bdecks.append(bdeck_path)
+    if len(bdecks) == 0:
+        logger.info(f"Nothing to load from {archive_dir.as_posix()}")
+        return Counter()
+
+    adecks = list()
+    for bdeck_path in bdecks:
+        matches = sorted(archive_dir.glob(f"a{bdeck_path.name.split('.')[0][1:]}.dat*"))
+        adecks.append(matches[0] if len(matches) > 0 else None)
+
+    logger.info(f"Parsing {len(bdecks)} storms from {archive_dir.as_posix()} with {workers or os.cpu_count()} workers")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        archive_storms = [
+            archive_storm
+            for archive_storm in executor.map(parseArchiveStorm, bdecks, adecks, repeat(models))
+            if archive_storm is not None
+        ]
+
+    engine = create_engine(
+        f"mysql+mysqlconnector://{settings.db.get('USER')}:{settings.db.get('PASS')}@{settings.db.get('HOST')}:{settings.db.get('PORT')}/{settings.db.get('SCHEMA')}"
+    )
+    Session = sessionmaker(engine)
+    counts = Counter()
+    with Session() as session:
+        # one transaction per storm, in the order they formed so annual ids are assigned in order. Each committed
+        # storm is recorded right away so an interrupted backfill picks up where it stopped.
+        for archive_storm in sorted(archive_storms, key=lambda s: s.storm.get("start_date")):
+            try:
+                with session.begin():
+                    counts += loadArchiveSeason(session, [archive_storm])
+            except Exception as e:
+                logger.error(f"Unable to load {archive_storm.bdeck}: {e}")
+                continue
+            completed.add(archive_storm.bdeck)
+            saveState(state_path, completed)
+
+    logger.info(f"Summary for {archive_dir.as_posix()}")
+    for table in ["observations", "forecasts", "tracks", "steps"]:
+        logger.info(f"\t Added {counts.get(table, 0)} new {table}")
+    return counts
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Backfill storms, observations and forecasts from the ATCF archive")
+    parser.add_argument("archive_dirs", type=str, nargs="+", help="Archive directories (one per season) to load")
+    parser.add_argument(
+        "-r",
+        "--regions",
+        type=str,
+        default=None,
+        help="NHC regions to load. If option is omitted all regions will be used. Multiple regions should be separated with a comma `,`",
+    )
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("-f", "--force", action="store_true", help="Reload files that have already been loaded")
+    parser.add_argument(
+        "-l",
+        "--loglevel",
+        type=str,
+        default="INFO",
+        choices=["INFO", "DEBUG", "TRACE"],
+        help="Level to set the logger to.",
+    )
+
+    args = parser.parse_args()
+
+    config = {
+        "handlers": [
+            {
+                "sink": sys.stdout,
+                "format": "<g>{time:YYYY-MM-DD HH:mm:ss}</> | <lvl>{level: <10}</> | <c>{name}</>:<c>{function}</>:<c>{line}</> | <lvl>{message}</>",
+                "backtrace": "True",
+                "catch": "True",
+                "level": args.loglevel,
+                "enqueue": "True",
+            }
+        ]
+    }
+    logger.configure(**config)
+
+    regions = None if args.regions is None else args.regions.split(",")
+    for archive_dir in args.archive_dirs:
+        process_archive_data(Path(archive_dir), regions=regions, workers=args.workers, force=args.force)
@@ -23,7 +23,21 @@ DATE_STR = DATE_TIME.isoformat().split(".")[0]
 RUN_ID = f"OBS__{DATE_TIME.isoformat()}"
 
 
-def processObservations(region, date_time=None, staging_dir=None):
+def processObservations(region, date_time=None, staging_dir=None, changed_dates=None, decks=None):
+    """Insert or update the observations found in the bdeck files in the staging directory
+
+    Args:
+        region (str): NHC region to process
+        date_time (datetime.datetime, optional): Only process the observations for `date_time`. Defaults to None.
+        staging_dir (str | pathlib.Path, optional): Directory where the bdeck files can be found. Defaults to the
+            staging directory defined in `settings.yml`.
+        changed_dates (dict[str, list[datetime.datetime]], optional): Observation datetimes that were added or changed,
+            keyed by the name of the file in `staging_dir` (see `atcf.changed_keys`). Only those observations are loaded
+            for the files listed; files that aren't listed, or are mapped to None, are processed in full. Each deck is
+            still decoded in full once, because matching it with its storm needs every observation. Defaults to None.
+        decks (dict[str, atcf.ParsedBDeck], optional): Decks that were already parsed with `atcf.load_bDecks`.
+            When provided the files in `staging_dir` aren't parsed again. Defaults to None.
+    """
     paths = settings.get("paths")
 
     if not staging_dir:
@@ -39,18 +53,25 @@ def processObservations(region, date_time=None, staging_dir=None):
     Session = sessionmaker(engine)
     with Session() as session:
 
-        for file_path in sorted(staging_dir.glob(f"b{region.lower()}*.csv")):
-            # if a date_time was provided, we only want to process files that have that datetime in them
+        if decks is None:
+            file_paths = sorted(staging_dir.glob(f"b{region.lower()}*.csv"))
             if date_time:
-                if not atcf.contains_date(file_path, date_time):
-                    logger.trace(f"{date_time} not in {file_path.as_posix()}")
-                    continue
-            logger.info(f"Processing {file_path.as_posix()}")
-            try:
-                storm_dict = atcf.toStormDict(file_path)
-            except:
-                logger.error(f"Unable to parse {file_path.as_posix()}")
+                # if a date_time was provided, we only want to parse files that have that datetime in them
+                file_paths = [file_path for file_path in file_paths if atcf.contains_date(file_path, date_time)]
+            decks = atcf.load_bDecks(file_paths, cache=True)
+
+        for file_name, deck in sorted(decks.items()):
+            if not file_name.startswith(f"b{region.lower()}"):
+                continue
+            # if a date_time was provided, we only want to process files that have that datetime in them
+            if date_time and deck.records.at([date_time]).empty:
+                logger.trace(f"{date_time} not in {deck.path.as_posix()}")
+                continue
+            if deck.storm is None:
+                logger.warning(f"No observations in {file_name}")
                 continue
+            logger.info(f"Processing {deck.path.as_posix()}")
+            storm_dict = deck.storm
             # get the matching storm record
             storm = (
                 session.query(Storm)
@@ -61,14 +82,24 @@ def processObservations(region, date_time=None, staging_dir=None):
 
             # dont process observations if we can't associate them with an existing storm
             if storm is None:
-                logger.warning(f"No storm in DB matching {storm_dict.get('nhc_id')}. Skipping {file_path.name}")
+                logger.warning(f"No storm in DB matching {storm_dict.get('nhc_id')}. Skipping {file_name}")
                 continue
 
-            df = atcf.parse_bDeck(file_path)
-            if date_time:
-                df = df.loc[df.DATETIME == date_time]
-            for _, obs in df.groupby("DATETIME"):
-                ob_dict = atcf.observationDictFromDataFrame(obs, storm.id)
+            # only load the observations for `date_time` if one was provided
+            dates = None if date_time is None else [date_time]
+            if changed_dates is not None and changed_dates.get(file_name) is not None:
+                # only load the observations that changed since the previous version of the file
+                dates = changed_dates[file_name]
+                if date_time:
+                    dates = [d for d in dates if d == date_time]
+                if len(dates) == 0:
+                    logger.debug(f"No new or updated observations in {file_name}")
+                    continue
+            # the storm match above already needs the whole deck (start date, strongest intensity), so the changed
+            # observations are selected from the records in memory instead of decoding them again through the
+            # deck index
+            records = deck.records if dates is None else deck.records.at(dates)
+            for ob_dict in atcf.observationDictsFromRecords(records, storm.id):
                 observation = (
                     session.query(Observation)
                     .where(Observation.storm_id == ob_dict.get("storm_id"))
@@ -1,5 +1,6 @@
 import argparse
 import sys
+import numpy as np
 from loguru import logger
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
@@ -13,7 +14,7 @@ from sqlalchemy.orm import sessionmaker
 from tcdb.etl import atcf
 from tcdb.models import Region, Storm
 from tcdb.config import settings
-from tcdb.utils import greatCircleDistance
+from tcdb import geo
 
 
 DATE_TIME = datetime.now(tz=timezone.utc)
@@ -40,20 +41,18 @@ def getClosestStorm(matched_storms, storm_dict):
         )
     else:  # multiple storms found with same start_date
         # use starting location to determine the correct storm
-        distance_dict = dict()
-        for stm in matched_storms:
-            distance = greatCircleDistance(
-                storm_dict.get("start_lat"),
-                storm_dict.get("start_lon"),
-                stm.start_lat,
-                stm.start_lon
-            )
-            distance_dict[distance] = stm
+        distances = geo.distance(
+            storm_dict.get("start_lat"),
+            storm_dict.get("start_lon"),
+            [stm.start_lat for stm in matched_storms],
+            [stm.start_lon for stm in matched_storms],
+        )
+        for stm, distance in zip(matched_storms, distances):
             logger.debug(f"{stm.id:02d}.{stm.name} started {distance:0.2f} nm from {storm_dict.get('name')}")
         # named storm with the shortest distance from the invest starting location
-        min_distance = min(distance_dict.keys())
-        if min_distance <= 100:  # closest storm must be within 100 nm to be considered a match
-            matched_storm = distance_dict.get(min_distance)
+        closest = int(np.argmin(distances))
+        if distances[closest] <= 100:  # closest storm must be within 100 nm to be considered a match
+            matched_storm = matched_storms[closest]
         else:
             logger.warning(f"Matching storms do not start within 100 nm")
             matched_storm = None
@@ -168,7 +167,7 @@ def namedStormSearch(session, storm_dict):
     return matched_storm
 
 
-def processStorms(region, date_time, staging_dir=None):
+def processStorms(region, date_time, staging_dir=None, decks=None):
     """This script does multiple things:
     1) loop through bdeck files and match with existing storms in db
     2) if match is found check to see if any fields need to be updated
@@ -177,6 +176,8 @@ def processStorms(region, date_time, staging_dir=None):
 
     Args:
         region ([type]): [description]
+        decks (dict[str, atcf.ParsedBDeck], optional): Decks that were already parsed with `atcf.load_bDecks`.
+            When provided the files in `staging_dir` aren't parsed again. Defaults to None.
     """
     paths = settings.get("paths")
 
@@ -193,14 +194,17 @@ def processStorms(region, date_time, staging_dir=None):
     Session = sessionmaker(engine)
     with Session() as session:
         region_record = session.query(Region).where(Region.short_name == region).one()
+        if decks is None:
+            decks = atcf.load_bDecks(staging_dir.glob(f"b{region.lower()}*.csv"), cache=True)
         # using sorted ensures we process any invest files after named storms
-        for file in sorted(staging_dir.glob(f"b{region.lower()}*.csv")):
-            # build storm object from bdeck information
-            try:
-                storm_dict = atcf.toStormDict(file)
-            except:
-                logger.error(f"Unable to parse {file.as_posix()}")
+        for file_name, deck in sorted(decks.items()):
+            if not file_name.startswith(f"b{region.lower()}"):
                 continue
+            if deck.storm is None:
+                logger.warning(f"No observations in {file_name}")
+                continue
+            # build storm object from bdeck information
+            storm_dict = dict(deck.storm)
             storm_dict["region_id"] = region_record.id
             if date_time - storm_dict.get("end_date") <= timedelta(hours=16):
                 storm_dict["status"] = "Active"
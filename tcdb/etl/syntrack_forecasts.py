@@ -0,0 +1,331 @@
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from loguru import logger
+from pathlib import Path
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from tcdb.config import settings
+from tcdb.etl import syntracks
+from tcdb.datasets import EnsembleStore
+from tcdb.models import Forecast, Track, Step, DataSource, Model, Region, Storm, Observation
+
+DATE_TIME = datetime.now(tz=timezone.utc)
+DATE_STR = DATE_TIME.isoformat().split(".")[0]
+RUN_ID = f"SYNTRACKS__{DATE_TIME.isoformat()}"
+
+# number of rows sent to the DB per INSERT/SELECT
+CHUNK_SIZE = 5000
+
+# track type -> suffix of the CFAN model short names in the models table (e.g. ECMWFR, NCEPC)
+MODEL_SUFFIXES = {
+    "raw": "R",
+    "calibrated": "C",
+}
+
+STEP_COLUMNS = ["latitude", "longitude", "intensity_kts", "mslp_mb"]
+
+# The parts of an invest that `syntracks.parseInvestTracks` uses, plus the id of the storm
+SyntrackInvest = namedtuple("SyntrackInvest", ["storm_id", "nhc_id", "name", "annual_id", "valid", "lat", "lon"])
+
+
+def chunks(values, size=CHUNK_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def investsAt(session, region_id, date_time):
+    """Storms in a region with an observation at `date_time`
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        region_id (int)
+        date_time (datetime.datetime)
+
+    Returns:
+        list[SyntrackInvest]: ordered by annual_id
+    """
+    query = (
+        session.query(Storm.id, Storm.nhc_id, Storm.name, Storm.annual_id, Observation.latitude, Observation.longitude)
+        .join(Observation, Observation.storm_id == Storm.id)
+        .where(Storm.region_id == region_id)
+        .where(Observation.datetime_utc == date_time)
+        .order_by(Storm.annual_id)
+    )
+    return [
+        SyntrackInvest(
+            storm_id=storm_id, nhc_id=nhc_id, name=name, annual_id=annual_id, valid=date_time, lat=lat, lon=lon
+        )
+        for storm_id, nhc_id, name, annual_id, lat, lon in query
+    ]
+
+
+def loadForecast(session, region_id, data_source_id, model_id, date_time):
+    """Get the id of a forecast, inserting it if it isn't in the DB yet
+
+    Returns:
+        tuple[int, int]: forecast id and the number of forecasts added
+    """
+    forecast = (
+        session.query(Forecast)
+        .where(Forecast.data_source_id == data_source_id)
+        .where(Forecast.model_id == model_id)
+        .where(Forecast.region_id == region_id)
+        .where(Forecast.datetime_utc == date_time)
+        .one_or_none()
+    )
+    if forecast is not None:
+        return forecast.id, 0
+    forecast = Forecast.from_dict(
+        dict(
+            data_source_id=data_source_id,
+            model_id=model_id,
+            region_id=region_id,
+            datetime_utc=date_time,
+            run_id=RUN_ID,
+        )
+    )
+    logger.trace(f"Adding forecast:\n{forecast!r}")
+    session.add(forecast)
+    # flush so the id is populated
+    session.flush()
+    return forecast.id, 1
+
+
+def loadTracks(session, forecast_id, keys):
+    """Insert the tracks in `keys` that aren't in the DB yet
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        forecast_id (int)
+        keys (set[tuple[int, int]]): (storm_id, ensemble_number)
+
+    Returns:
+        tuple[dict, int]: track ids keyed by `keys` and the number of tracks added
+    """
+
+    def existingTracks():
+        query = session.query(Track.id, Track.storm_id, Track.ensemble_number).where(Track.forecast_id == forecast_id)
+        return {(storm_id, ensemble_number): track_id for track_id, storm_id, ensemble_number in query}
+
+    track_ids = existingTracks()
+    new_tracks = [
+        dict(storm_id=storm_id, forecast_id=forecast_id, ensemble_number=ensemble_number, run_id=RUN_ID)
+        for storm_id, ensemble_number in sorted(keys)
+        if (storm_id, ensemble_number) not in track_ids
+    ]
+    for chunk in chunks(new_tracks):
+        session.bulk_insert_mappings(Track, chunk)
+    if len(new_tracks) > 0:
+        track_ids = existingTracks()
+    return track_ids, len(new_tracks)
+
+
+def loadSteps(session, steps):
+    """Make the steps of the tracks in `steps` match `steps`. New steps are inserted, steps whose values changed are
+    updated and steps that are no longer part of their track are deleted, each in a single bulk statement per chunk.
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        steps (pandas.DataFrame): track_id, hour and the `STEP_COLUMNS`
+
+    Returns:
+        collections.Counter: number of steps added, updated and removed
+    """
+    counts = Counter()
+    existing = list()
+    for chunk in chunks(np.unique(steps.track_id).tolist()):
+        query = session.query(Step.id, Step.track_id, Step.hour, *[getattr(Step, column) for column in STEP_COLUMNS])
+        existing.extend(query.where(Step.track_id.in_(chunk)))
+    existing = pd.DataFrame(existing, columns=["id", "track_id", "hour"] + STEP_COLUMNS)
+
+    merged = steps.merge(existing, on=["track_id", "hour"], how="outer", suffixes=("", "_db"), indicator=True)
+    new = merged[merged._merge == "left_only"]
+    removed = merged[merged._merge == "right_only"]
+    both = merged[merged._merge == "both"]
+    # FLOAT columns only keep ~7 significant digits so exact comparisons would update every step
+    changed = np.zeros(len(both), dtype=bool)
+    for column in STEP_COLUMNS:
+        changed |= ~np.isclose(both[column].to_numpy(float), both[f"{column}_db"].to_numpy(float), rtol=1e-6, atol=0)
+    updated = both[changed]
+
+    new_steps = [
+        dict(row, run_id=RUN_ID)
+        for row in new[["track_id", "hour"] + STEP_COLUMNS].astype(object).to_dict("records")
+    ]
+    for chunk in chunks(new_steps):
+        session.bulk_insert_mappings(Step, chunk)
+    updated_steps = [
+        dict(row, run_id=RUN_ID) for row in updated[["id"] + STEP_COLUMNS].astype(object).to_dict("records")
+    ]
+    for chunk in chunks(updated_steps):
+        session.bulk_update_mappings(Step, chunk)
+    for chunk in chunks(removed.id.astype(int).tolist()):
+        session.query(Step).where(Step.id.in_(chunk)).delete(synchronize_session=False)
+
+    counts["steps"] = len(new_steps)
+    counts["steps_updated"] = len(updated_steps)
+    counts["steps_removed"] = len(removed)
+    return counts
+
+
+def loadSyntracks(session, region, model, date_time, tracks, track_type="raw", store=None):
+    """Match the tracks of a model run with the storms that are active at `date_time` and load every member, the
+    ensemble mean included, into the forecasts, tracks and steps tables. The whole run is loaded with a handful of
+    set-based statements instead of one round trip per member and step.
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        region (str): Region short name (e.g. "AL")
+        model (str): "ECMWF" or "NCEP"
+        date_time (datetime.datetime): Initialization time of the model run
+        tracks (list[syntracks.Syntrack]): Every track of the model run (see `syntracks.load_syntracks`)
+        track_type (str, optional): Key of `MODEL_SUFFIXES`. Defaults to "raw".
+        store (tcdb.datasets.EnsembleStore, optional): Also add the members of each storm to this store. Defaults to None.
+
+    Returns:
+        collections.Counter: number of records added, updated and removed for each table
+    """
+    counts = Counter()
+    region_record = session.query(Region).where(Region.short_name == region.upper()).one()
+    data_source = session.query(DataSource).where(DataSource.short_name == "CFAN").one()
+    model_record = session.query(Model).where(Model.short_name == f"{model.upper()}{MODEL_SUFFIXES[track_type]}").one()
+
+    invests = investsAt(session, region_record.id, date_time)
+    if len(invests) == 0 or len(tracks) == 0:
+        logger.info(f"No {region.upper()} storms or {model} tracks for {date_time.isoformat()}")
+        return counts
+
+    system_tracks = syntracks.parseInvestTracks(tracks, invests)
+    batches = list()
+    for inv in invests:
+        batch = syntracks.stepBatch(system_tracks[inv.annual_id])
+        if len(batch["hour"]) == 0:
+            continue
+        logger.debug(f"{inv.name}: {len(np.unique(batch['ensemble_number']))} tracks and {len(batch['hour'])} steps")
+        batch["storm_id"] = np.full(len(batch["hour"]), inv.storm_id)
+        batches.append(pd.DataFrame(batch))
+        if store is not None:
+            num_ens = settings.get(model).get("num_ens")
+            members = {ens: track for ens, track in system_tracks[inv.annual_id].items() if ens <= num_ens}
+            store.append(syntracks.EnsembleTracks.from_syntracks(members, model=model), inv.nhc_id)
+    if len(batches) == 0:
+        return counts
+    steps = pd.concat(batches, ignore_index=True)
+
+    forecast_id, counts["forecasts"] = loadForecast(
+        session, region_record.id, data_source.id, model_record.id, date_time
+    )
+    keys = set(zip(steps.storm_id.tolist(), steps.ensemble_number.tolist()))
+    track_ids, counts["tracks"] = loadTracks(session, forecast_id, keys)
+    steps["track_id"] = [track_ids[key] for key in zip(steps.storm_id.tolist(), steps.ensemble_number.tolist())]
+    steps["hour"] = steps.hour.astype(int)
+    counts.update(loadSteps(session, steps[["track_id", "hour"] + STEP_COLUMNS]))
+    return counts
+
+
+def process_syntracks(path, region, model, date_time, track_type="raw", variable=None, store=False):
+    """Load the tracks in a tracker output file into the DB (see `loadSyntracks`)
+
+    Args:
+        path (pathlib.Path): Path to the tracker output (.mat) file
+        region (str): Region short name (e.g. "AL")
+        model (str): "ECMWF" or "NCEP"
+        date_time (datetime.datetime): Initialization time of the model run
+        track_type (str, optional): Key of `MODEL_SUFFIXES`. Defaults to "raw".
+        variable (str, optional): Name of the struct array in the file. Defaults to the first struct in the file.
+        store (bool, optional): Also add the members of each storm to the `EnsembleStore` in the data lake.
+            Defaults to False.
+
+    Returns:
+        collections.Counter: number of records added, updated and removed for each table
+    """
+    tracks = syntracks.load_syntracks(path, date_time, model, track_type, variable=variable)
+    logger.info(f"Read {len(tracks)} {model} tracks from {Path(path).name}")
+
+    engine = create_engine(
+        f"mysql+mysqlconnector://{settings.db.get('USER')}:{settings.db.get('PASS')}@{settings.db.get('HOST')}:{settings.db.get('PORT')}/{settings.db.get('SCHEMA')}"
+    )
+    Session = sessionmaker(engine)
+    with Session() as session:
+        with session.begin():
+            counts = loadSyntracks(
+                session,
+                region,
+                model,
+                date_time,
+                tracks,
+                track_type=track_type,
+                store=EnsembleStore() if store else None,
+            )
+    logger.info(f"Summary for {model} {region.upper()} [{date_time.isoformat()}]")
+    logger.info(f"\t Added {counts['forecasts']} new forecasts")
+    logger.info(f"\t Added {counts['tracks']} new tracks")
+    logger.info(f"\t Added {counts['steps']} new steps")
+    logger.info(f"\t Updated {counts['steps_updated']} steps")
+    logger.info(f"\t Removed {counts['steps_removed']} steps")
+    return counts
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Load the ensemble tracks of a model run into the DB")
+    parser.add_argument("path", type=str, help="Path to the tracker output (.mat) file")
+    parser.add_argument("region", type=str, help="Region short name (e.g. AL)")
+    parser.add_argument("model", type=str, choices=["ECMWF", "NCEP"], help="Model of the tracks")
+    parser.add_argument("date_time", type=str, help="Initialization time of the model run (YYYYMMDDHH)")
+    parser.add_argument(
+        "-t",
+        "--track_type",
+        type=str,
+        default="raw",
+        choices=list(MODEL_SUFFIXES),
+        help="Type of the tracks in the file.",
+    )
+    parser.add_argument(
+        "-s",
+        "--store",
+        action="store_true",
+        help="Also add the tracks to the ensemble store in the data lake.",
+    )
+    parser.add_argument(
+        "-l",
+        "--loglevel",
+        type=str,
+        default="INFO",
+        choices=["INFO", "DEBUG", "TRACE"],
+        help="Level to set the logger to.",
+    )
+
+    args = parser.parse_args()
+
+    config = {
+        "handlers": [
+            {
+                "sink": sys.stdout,
+                "format": "<g>{time:YYYY-MM-DD HH:mm:ss}</> | <lvl>{level: <10}</> | <c>{name}</>:<c>{function}</>:<c>{line}</> | <lvl>{message}</>",
+                "backtrace": "True",
+                "catch": "True",
+                "level": args.loglevel,
+                "enqueue": "True",
+            }
+        ]
+    }
+    logger.configure(**config)
+
+    process_syntracks(
+        Path(args.path),
+        args.region,
+        args.model,
+        datetime.strptime(args.date_time, "%Y%m%d%H"),
+        track_type=args.track_type,
+        store=args.store,
+    )
@@ -1,4 +1,4 @@
-from scipy.io import loadmat, matlab
+from scipy.io import loadmat, matlab, whosmat
 import xarray as xr
 import pandas as pd
 import numpy as np
@@ -7,11 +7,15 @@ from IPython.core.debugger import set_trace
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from pathlib import Path
 from xarray.core.formatting import format_array_flat, format_timestamp, pretty_print
 
-from collections import Counter
+import hashlib
+import os
+import warnings
+from collections import Counter, OrderedDict, namedtuple
 from tcdb.config import settings
-from tcdb.utils import greatCircleDistance
+from tcdb import geo
 import tcdb.validation as val
 
 
@@ -88,105 +92,580 @@ class Syntrack:
             return True
 
 
-def to_xarray(tracks, periods=None):
+class EnsembleTracks:
+    """All the members of an ensemble forecast for a single system, stored as (member x step) arrays on the step grid
+    of the model instead of one `Syntrack` per member. Row `i` holds ensemble member `i + 1` (the deterministic run is
+    the last member, see `toSyntrackObjects`). Steps that a member doesn't have are NaN.
+
+    The validity masks and the consensus metadata (the most common storm name and annual id of the members that have
+    a track) are computed once when the instance is created.
+
+    Attributes:
+        model (str): model name, as used in `settings.yml`
+        init (datetime.datetime): forecast initialization datetime
+        track_type (str)
+        step (numpy.ndarray): forecast hour of each step
+        valid_time (numpy.ndarray): datetime64 valid time of each step
+        hour, lat, lon, wind, mslp (numpy.ndarray): float64 arrays with shape (member, step)
+        ens_name, member_storm_name (numpy.ndarray): object arrays with one value per member
+        member_annual_id (numpy.ndarray): float64 array with one value per member (NaN if unknown)
+        valid_step (numpy.ndarray): bool (member, step) array, True where the member has a position
+        valid_steps (numpy.ndarray): number of valid steps of each member
+        empty (numpy.ndarray): bool array, True for members without a single valid step
+        storm_name (str): most common storm name of the non-empty members
+        annual_id (int): most common annual id of the non-empty members
+    """
+
+    __slots__ = (
+        "model",
+        "init",
+        "track_type",
+        "step",
+        "valid_time",
+        "hour",
+        "lat",
+        "lon",
+        "wind",
+        "mslp",
+        "ens_name",
+        "member_storm_name",
+        "member_annual_id",
+        "valid_step",
+        "valid_steps",
+        "empty",
+        "storm_name",
+        "annual_id",
+    )
+
+    def __init__(
+        self, model, init, track_type, step, hour, lat, lon, wind, mslp, ens_name, member_storm_name, member_annual_id
+    ):
+        self.model = model
+        self.init = init
+        self.track_type = track_type
+        self.step = np.asarray(step)
+        self.valid_time = (pd.Timestamp(init) + pd.to_timedelta(self.step, unit="h")).values
+        self.hour = hour
+        self.lat = lat
+        self.lon = lon
+        self.wind = wind
+        self.mslp = mslp
+        self.ens_name = ens_name
+        self.member_storm_name = member_storm_name
+        self.member_annual_id = member_annual_id
+
+        self.valid_step = ~np.isnan(lat)
+        self.valid_steps = np.count_nonzero(self.valid_step, axis=1)
+        self.empty = self.valid_steps == 0
+        # try to get storm name and number. Assume the most common is correct
+        members = np.flatnonzero(~self.empty)
+        self.storm_name = _mostCommon(member_storm_name[members])
+        annual_id = _mostCommon(member_annual_id[members])
+        self.annual_id = annual_id if annual_id is None or np.isnan(annual_id) else int(annual_id)
+
+    def __len__(self):
+        return len(self.lat)
+
+    @property
+    def num_ens(self):
+        return len(self.lat)
+
+    @classmethod
+    def from_syntracks(cls, tracks, model=None, periods=None):
+        """Place `Syntrack` objects on the step grid of their model. Steps are matched on the forecast hour, steps
+        that fall outside of the grid are dropped.
+
+        Args:
+            tracks (dict[int, Syntrack] | list[Syntrack]): one track per ensemble member
+            model (str, optional): Model of the tracks. Defaults to the most common model of the non-empty tracks.
+            periods (int, optional): Number of steps. Defaults to the number of steps up to `max_step` in `settings.yml`.
+
+        Returns:
+            EnsembleTracks
+        """
+        if isinstance(tracks, dict):
+            tracks = list(tracks.values())
+        valid_tracks = [track for track in tracks if not track.empty()]
+        if model is None:
+            if len(valid_tracks) == 0:
+                raise ValueError("Unable to determine the model of an ensemble without any valid tracks")
+            model = _mostCommon([track.model for track in valid_tracks])
+        init = _mostCommon([track.init for track in valid_tracks])
+        track_type = _mostCommon([track.track_type for track in valid_tracks])
+
+        model_settings = settings.get(model)
+        model_res = model_settings.get("temporal_resolution", 6)
+        num_ens = model_settings.get("num_ens")
+        if not periods:
+            periods = int(model_settings.get("max_step") / model_res) + 1
+
+        step = np.arange(0, model_res * periods, model_res)
+        ens_name = np.full(num_ens, "", dtype=object)
+        member_storm_name = np.full(num_ens, None, dtype=object)
+        member_annual_id = np.full(num_ens, np.nan)
+        for track in tracks:
+            row = track.ens_num - 1
+            ens_name[row] = track.ens_name
+            member_storm_name[row] = track.storm_name
+            member_annual_id[row] = track.annual_id
+
+        # flatten the steps of every member so they can be scattered onto the grid with a single assignment.
+        # Each step goes to the slot given by its forecast hour, so gaps in a track stay gaps
+        rows = np.concatenate([np.full(len(track.hour), track.ens_num - 1) for track in valid_tracks] or [[]]).astype(int)
+        values = np.concatenate(
+            [
+                np.stack([track.hour, track.lat, track.lon, track.wind, track.mslp]).astype(float)
+                for track in valid_tracks
+            ] or [np.empty((5, 0))],
+            axis=1,
+        )
+        columns, remainder = np.divmod(values[0], model_res)
+        on_grid = (remainder == 0) & (columns >= 0) & (columns < periods)
+        if not on_grid.all():
+            logger.warning(f"Dropping {np.count_nonzero(~on_grid)} {model} steps that aren't on the {model_res} hour grid")
+
+        grid = np.full((5, num_ens, periods), np.nan)
+        grid[:, rows[on_grid], columns[on_grid].astype(int)] = values[:, on_grid]
+        hour, lat, lon, wind, mslp = grid
+        return cls(
+            model, init, track_type, step, hour, lat, lon, wind, mslp, ens_name, member_storm_name, member_annual_id
+        )
+
+    @classmethod
+    def from_xarray(cls, ds):
+        """Inverse of `to_xarray`. The Dataset only holds the storm name and annual id of the ensemble, so every member
+        gets those.
+
+        Args:
+            ds (xarray.Dataset)
+
+        Returns:
+            EnsembleTracks
+        """
+        num_ens = ds.sizes["ensemble"]
+        annual_id = ds.attrs.get("AnnualId")
+        return cls(
+            ds.attrs.get("Model"),
+            ds.attrs.get("ForecastInitDatetime"),
+            ds.attrs.get("TrackType"),
+            ds.step.values,
+            ds.hour.values,
+            ds.lat.values,
+            ds.lon.values,
+            ds.wind.values,
+            ds.mslp.values,
+            np.array(ds.ensemble_name.values, dtype=object),
+            np.full(num_ens, ds.attrs.get("StormName"), dtype=object),
+            np.full(num_ens, np.nan if annual_id is None else annual_id, dtype=float),
+        )
 
-    valid_tracks = [ens_num for ens_num, track in tracks.items() if not track.empty()]
-    if len(valid_tracks) == 0:
-        logger.warning(f"Cannot convert to xarray because there are no valid tracks")
+    def member(self, ens_num):
+        """Convert a single member back to a `Syntrack` holding only the steps the member has
+
+        Args:
+            ens_num (int): ensemble number of the member (1 based)
+
+        Returns:
+            Syntrack
+        """
+        row = ens_num - 1
+        steps = ~np.isnan(self.hour[row])
+        if not steps.any():
+            return Syntrack(ens_num=ens_num, ens_name=self.ens_name[row])
+        annual_id = self.member_annual_id[row]
+        return Syntrack(
+            storm_name=self.member_storm_name[row],
+            init=self.init,
+            annual_id=annual_id if np.isnan(annual_id) else int(annual_id),
+            ens_num=ens_num,
+            ens_name=self.ens_name[row],
+            hour=self.hour[row, steps],
+            valid=self.valid_time[steps],
+            lat=self.lat[row, steps],
+            lon=self.lon[row, steps],
+            mslp=self.mslp[row, steps],
+            wind=self.wind[row, steps],
+            model=self.model.upper(),
+            track_type=self.track_type,
+        )
+
+    def to_syntracks(self):
+        """Convert every member back to a `Syntrack` (see `member`)
+
+        Returns:
+            dict[int, Syntrack]: keyed by ensemble number
+        """
+        return {ens_num: self.member(ens_num) for ens_num in range(1, self.num_ens + 1)}
+
+    def to_xarray(self):
+        """Same Dataset as `to_xarray`"""
+        return xr.Dataset(
+            data_vars=dict(
+                hour=(["ensemble", "step"], self.hour),
+                lat=(["ensemble", "step"], self.lat),
+                lon=(["ensemble", "step"], self.lon),
+                wind=(["ensemble", "step"], self.wind),
+                mslp=(["ensemble", "step"], self.mslp),
+            ),
+            coords=dict(
+                ensemble=np.arange(1, self.num_ens + 1),
+                step=self.step,
+                ensemble_name=(["ensemble"], list(self.ens_name)),
+                valid_time=(["step"], self.valid_time),
+            ),
+            attrs=dict(
+                Model=self.model,
+                ForecastInitDatetime=self.init,
+                TrackType=self.track_type,
+                StormName=self.storm_name,
+                AnnualId=self.annual_id,
+            ),
+        )
+
+
+def _mostCommon(values):
+    """Most common value (the first one seen wins a tie), None if `values` is empty"""
+    field_counter = Counter(values)
+    if len(field_counter) == 0:
         return None
+    return field_counter.most_common()[0][0]
 
-    model = most_common(tracks, "model")
-    model_settings = settings.get(model)
-    model_res = model_settings.get("temporal_resolution", 6)
-    num_ens = model_settings.get("num_ens")
-    forecast_init = most_common(tracks, "init")
-
-    names = [""] * num_ens
-    for t in tracks.values():
-        names[t.ens_num - 1] = t.ens_name
-    if not periods:
-        periods = int(model_settings.get("max_step") / model_res) + 1
-
-    step = range(0, (model_res * periods), model_res)
-    valid = pd.date_range(forecast_init, periods=periods, freq=f"{model_res}H")
-    hour = np.ones((num_ens, len(valid))) * np.nan
-    lat = hour.copy()
-    lon = hour.copy()
-    wind = hour.copy()
-    mslp = hour.copy()
-
-    for ens, track in tracks.items():
-        if track.empty():
-            continue
-        # get the indices where the valid times match up
-        inds = np.where((valid >= track.valid.min()) & (valid <= track.valid.max()))
-        hour[ens - 1, inds] = track.hour.astype(int)
-        lat[ens - 1, inds] = track.lat
-        lon[ens - 1, inds] = track.lon
-        wind[ens - 1, inds] = track.wind
-        mslp[ens - 1, inds] = track.mslp
-
-    # try to get storm name and number. Assume the most common is correct
-    storm_name = most_common(tracks, "storm_name")
-    annual_id = most_common(tracks, "annual_id")
-
-    ds = xr.Dataset(
-        data_vars=dict(
-            hour=(["ensemble", "step"], hour),
-            lat=(["ensemble", "step"], lat),
-            lon=(["ensemble", "step"], lon),
-            wind=(["ensemble", "step"], wind),
-            mslp=(["ensemble", "step"], mslp),
-        ),
+
+# Fields summarized by `ensembleStatistics`
+STAT_FIELDS = ("lat", "lon", "wind", "mslp")
+
+# Statistics of the most recently summarized ensembles, keyed by (model, init, track type, storm, member digest,
+# options). See `ensembleStatistics`
+STATS_CACHE_SIZE = 64
+_stats_cache = OrderedDict()
+
+EnsembleStatistics = namedtuple(
+    "EnsembleStatistics",
+    [
+        "step",
+        "valid_time",
+        "num_members",
+        "count",
+        "hour",
+        "mean",
+        "median",
+        "std",
+        "percentiles",
+        "position_spread",
+        "exceedance",
+    ],
+)
+EnsembleStatistics.__doc__ = """Per-step statistics of an ensemble (see `ensembleStatistics`). Steps with too few
+members (`min_ensembles`) are NaN in every statistic except `count`.
+
+Attributes:
+    step (numpy.ndarray): forecast hour of each step
+    valid_time (numpy.ndarray): datetime64 valid time of each step
+    num_members (int): number of members the statistics are computed from
+    count (numpy.ndarray): number of members with a position at each step
+    hour (numpy.ndarray): `step` where at least one member has a forecast hour, NaN elsewhere
+    mean, median, std (dict[str, numpy.ndarray]): keyed by the fields in `STAT_FIELDS`
+    percentiles (dict[float, dict[str, numpy.ndarray]]): keyed by percentile, then by field
+    position_spread (numpy.ndarray): mean great circle distance (nm) of the members from the mean position
+    exceedance (dict[float, numpy.ndarray]): fraction of the members with `wind` >= each threshold
+"""
+
+
+def ensembleStatistics(
+    ensemble, members=None, min_ensembles=0.0, percentiles=(10, 25, 75, 90), thresholds=(34, 50, 64), cache=True
+):
+    """Summarize the members of an ensemble at every step. All of the statistics come from the same (field, member, step)
+    block of the member arrays so requesting them together costs little more than requesting one.
+
+    Results are cached per (model, init, track type, storm), a digest of the member arrays and options, so products
+    built from the same ensemble can each ask for the statistics they need without recomputing them.
+
+    Args:
+        ensemble (EnsembleTracks)
+        members (slice | numpy.ndarray, optional): Rows of the members to summarize. Defaults to every member except the
+            deterministic run (see `ensembleMembers`).
+        min_ensembles (float, optional): Minimum number of members with a position for a step to be summarized. Values
+            below 1 are a fraction of the members. Defaults to 0.0.
+        percentiles (tuple[float], optional): Percentiles for the envelopes. Defaults to (10, 25, 75, 90).
+        thresholds (tuple[float], optional): `wind` thresholds for the exceedance probabilities. Defaults to (34, 50, 64).
+        cache (bool, optional): Use the statistics cache. Defaults to True.
+
+    Returns:
+        EnsembleStatistics
+    """
+    if members is None:
+        members = ensembleMembers(ensemble)
+    key = (
+        _ensembleKey(ensemble),
+        _memberKey(members),
+        min_ensembles,
+        tuple(percentiles),
+        tuple(thresholds),
+    )
+    if cache and key in _stats_cache:
+        _stats_cache.move_to_end(key)
+        return _stats_cache[key]
+
+    values = np.stack([getattr(ensemble, field)[members] for field in STAT_FIELDS])
+    num_members = values.shape[1]
+    count = np.count_nonzero(~np.isnan(values[STAT_FIELDS.index("lat")]), axis=0)
+    hour = np.where((~np.isnan(ensemble.hour[members])).any(axis=0), ensemble.step, np.nan)
+
+    minimum = min_ensembles * num_members if min_ensembles < 1 else min_ensembles
+    # steps without enough members are left out of every statistic
+    values[:, :, count < max(minimum, 1)] = np.nan
+
+    with warnings.catch_warnings():
+        # all-NaN steps are expected
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        mean = np.nanmean(values, axis=1)
+        std = np.nanstd(values, axis=1)
+        lat, lon = values[STAT_FIELDS.index("lat")], values[STAT_FIELDS.index("lon")]
+        position_spread = np.nanmean(
+            geo.distance(lat, lon, mean[STAT_FIELDS.index("lat")], mean[STAT_FIELDS.index("lon")]), axis=0
+        )
+    # one sort gives the median and every percentile
+    ordered = np.sort(values, axis=1)
+    valid = np.count_nonzero(~np.isnan(ordered), axis=1)
+    median = _sortedPercentile(ordered, valid, 50)
+    envelopes = [_sortedPercentile(ordered, valid, q) for q in percentiles]
+
+    wind = values[STAT_FIELDS.index("wind")]
+    summarized = count >= max(minimum, 1)
+    exceedance = dict()
+    for threshold in thresholds:
+        probability = np.count_nonzero(wind >= threshold, axis=0) / max(num_members, 1)
+        exceedance[threshold] = np.where(summarized, probability, np.nan)
+
+    stats = EnsembleStatistics(
+        step=ensemble.step,
+        valid_time=ensemble.valid_time,
+        num_members=num_members,
+        count=count,
+        hour=hour,
+        mean=dict(zip(STAT_FIELDS, mean)),
+        median=dict(zip(STAT_FIELDS, median)),
+        std=dict(zip(STAT_FIELDS, std)),
+        percentiles={q: dict(zip(STAT_FIELDS, envelope)) for q, envelope in zip(percentiles, envelopes)},
+        position_spread=position_spread,
+        exceedance=exceedance,
+    )
+    if cache:
+        _cachePut(_stats_cache, key, stats, STATS_CACHE_SIZE)
+    return stats
+
+
+def _sortedPercentile(ordered, valid, q):
+    """`numpy.nanpercentile` (linear interpolation) along axis 1 of an array already sorted along that axis
+
+    Args:
+        ordered (numpy.ndarray): (field, member, step) values sorted along the member axis, NaN last
+        valid (numpy.ndarray): (field, step) number of values that aren't NaN
+        q (float): percentile
+
+    Returns:
+        numpy.ndarray: (field, step)
+    """
+    position = (q / 100) * np.maximum(valid - 1, 0)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(valid - 1, 0))
+    below = np.take_along_axis(ordered, lower[:, None, :], axis=1)[:, 0]
+    above = np.take_along_axis(ordered, upper[:, None, :], axis=1)[:, 0]
+    result = below + (above - below) * (position - lower)
+    result[valid == 0] = np.nan
+    return result
+
+
+def clearStatisticsCache():
+    _stats_cache.clear()
+
+
+def _ensembleKey(ensemble):
+    """Hashable identity of an ensemble for the statistics and strike probability caches: the model, init, track type
+    and storm plus a digest of the member arrays, so ensembles of another track type or re-read from changed tracker
+    output never share an entry"""
+    digest = hashlib.blake2b(digest_size=20)
+    for values in (ensemble.step, ensemble.hour, ensemble.lat, ensemble.lon, ensemble.wind, ensemble.mslp):
+        values = np.ascontiguousarray(values)
+        digest.update(str((values.dtype, values.shape)).encode())
+        digest.update(values)
+    return (
+        ensemble.model,
+        ensemble.init,
+        ensemble.track_type,
+        ensemble.storm_name,
+        ensemble.annual_id,
+        digest.hexdigest(),
+    )
+
+
+def ensembleMembers(ensemble):
+    """Rows of the ensemble members used for ensemble products: every member except the deterministic run, which
+    `toSyntrackObjects` stores as the last member (ens_num == num_ens). The control run is a member.
+
+    Args:
+        ensemble (EnsembleTracks)
+
+    Returns:
+        slice
+    """
+    return slice(0, ensemble.num_ens - 1)
+
+
+def _memberKey(members):
+    """Hashable version of a member selection (slice or index array)"""
+    if isinstance(members, slice):
+        return (members.start, members.stop, members.step)
+    return tuple(np.ravel(members).tolist())
+
+
+def _cachePut(cache, key, value, size):
+    """Add `value` to an LRU cache (OrderedDict), evicting the least recently used entries beyond `size`"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+# Strike probabilities of the most recently rasterized ensembles, keyed by (model, init, track type, storm, member
+# digest, options). See `strikeProbability`
+STRIKE_CACHE_SIZE = 16
+_strike_cache = OrderedDict()
+
+
+def strikeProbability(ensemble, lat, lon, radius=60, windows=None, members=None, spacing=None, cache=True):
+    """Strike probabilities on a lat/lon grid: the fraction of the members whose track passes within `radius` of each
+    grid point during each lead time window. Each member is densified along track (`geo.densifyTracks`), so the
+    whole swath between steps is covered, then the disc around every point is rasterized (`geo.discCoverage`).
+
+    Results are cached per (model, init, track type, storm), a digest of the member arrays and options.
+
+    Args:
+        ensemble (EnsembleTracks | xarray.Dataset): The ensemble, or the output of `to_xarray`
+        lat, lon (numpy.ndarray): Evenly spaced, increasing grid cell centers. `lon` may run past 180 (e.g. 100 to 200)
+            for grids that cross the dateline.
+        radius (float, optional): Strike radius (nm). Defaults to 60.
+        windows (list[tuple[float, float]], optional): First and last forecast hour of each lead time window.
+            Defaults to the whole forecast.
+        members (slice | numpy.ndarray, optional): Rows of the members to use. Defaults to every member except the
+            deterministic run (see `ensembleMembers`).
+        spacing (float, optional): Maximum distance (nm) between the points of the densified tracks. Defaults to
+            `radius` / 4, which keeps the edge of the swath within 1% of `radius`.
+        cache (bool, optional): Use the strike probability cache. Defaults to True.
+
+    Returns:
+        xarray.DataArray: (window, lat, lon) probabilities between 0 and 1
+    """
+    if isinstance(ensemble, xr.Dataset):
+        ensemble = EnsembleTracks.from_xarray(ensemble)
+    if members is None:
+        members = ensembleMembers(ensemble)
+    if windows is None:
+        windows = [(0, ensemble.step[-1])]
+    windows = tuple((float(first), float(last)) for first, last in windows)
+    if spacing is None:
+        spacing = radius / 4
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    key = (
+        _ensembleKey(ensemble),
+        _memberKey(members),
+        radius,
+        windows,
+        spacing,
+        (lat[0], lat[-1], len(lat), lon[0], lon[-1], len(lon)),
+    )
+    if cache and key in _strike_cache:
+        _strike_cache.move_to_end(key)
+        return _strike_cache[key]
+
+    num_members = len(np.arange(ensemble.num_ens)[members])
+    member, point_lat, point_lon, point_hour = geo.densifyTracks(
+        ensemble.lat[members], ensemble.lon[members], spacing, values=(ensemble.hour[members],)
+    )
+    probability = np.zeros((len(windows), len(lat), len(lon)))
+    for i, (first, last) in enumerate(windows):
+        points = (point_hour >= first) & (point_hour <= last)
+        coverage = geo.discCoverage(point_lat[points], point_lon[points], member[points], lat, lon, radius)
+        probability[i] = coverage / max(num_members, 1)
+
+    strike = xr.DataArray(
+        probability,
+        dims=["window", "lat", "lon"],
         coords=dict(
-            ensemble=np.arange(1, num_ens + 1),
-            step=step,
-            ensemble_name=(["ensemble"], names),
-            valid_time=(["step"], valid),
+            lat=lat,
+            lon=lon,
+            window_start=(["window"], [first for first, _ in windows]),
+            window_end=(["window"], [last for _, last in windows]),
+        ),
+        name="strike_probability",
+        attrs=dict(
+            Model=ensemble.model,
+            ForecastInitDatetime=ensemble.init,
+            StormName=ensemble.storm_name,
+            AnnualId=ensemble.annual_id,
+            Radius=radius,
+            NumMembers=num_members,
         ),
-        attrs=dict(Model=model, ForecastInitDatetime=forecast_init, StormName=storm_name, AnnualId=annual_id),
     )
-    return ds
+    if cache:
+        _cachePut(_strike_cache, key, strike, STRIKE_CACHE_SIZE)
+    return strike
+
+
+def clearStrikeCache():
+    _strike_cache.clear()
+
+
+def to_xarray(tracks, periods=None):
+
+    if not isinstance(tracks, EnsembleTracks):
+        valid_tracks = [ens_num for ens_num, track in tracks.items() if not track.empty()]
+        if len(valid_tracks) == 0:
+            logger.warning(f"Cannot convert to xarray because there are no valid tracks")
+            return None
+        tracks = EnsembleTracks.from_syntracks(tracks, periods=periods)
+    return tracks.to_xarray()
 
 
 def ensMean(tracks, return_ds=False, median=False, min_ensembles=0.0):
-    valid_tracks = [ens_num for ens_num, track in tracks.items() if not track.empty()]
-    if len(valid_tracks) == 0:
-        logger.warning(f"Cannot convert to xarray because there are no valid tracks")
-        return Syntrack(ens_name="ENS_MEAN")
-
-    ds = to_xarray(tracks)
-    # determine the model so we can get the correct number of ensembles
-    model = most_common(tracks, "model")
-    model_settings = settings.get(model)
-    num_ens = model_settings.get("num_ens")
-    # get all ensembles except deterministic
-    d = ds.sel(ensemble=range(1, num_ens - 1))
-    if median:
-        d = d.median(dim="ensemble")
+    if isinstance(tracks, EnsembleTracks):
+        ensemble = tracks
     else:
-        d = d.mean(dim="ensemble")
+        valid_tracks = [ens_num for ens_num, track in tracks.items() if not track.empty()]
+        if len(valid_tracks) == 0:
+            logger.warning(f"Cannot convert to xarray because there are no valid tracks")
+            return Syntrack(ens_name="ENS_MEAN")
+        ensemble = EnsembleTracks.from_syntracks(tracks)
+
+    num_ens = ensemble.num_ens
+    # get all ensembles except deterministic
+    stats = ensembleStatistics(ensemble, members=ensembleMembers(ensemble), min_ensembles=min_ensembles)
+    center = stats.median if median else stats.mean
 
     if return_ds:
         # Cant combine the ensemble mean back to the original DS until you add ensemble and ensemble_name
+        d = xr.Dataset(
+            data_vars=dict(hour=(["step"], stats.hour), **{field: (["step"], center[field]) for field in STAT_FIELDS}),
+            coords=dict(step=stats.step, valid_time=(["step"], stats.valid_time)),
+        )
         d = d.expand_dims({"ensemble": [num_ens + 1]})
         d = d.assign_coords({"ensemble_name": "ENS_MEAN"})
-        return xr.concat([ds, d], dim="ensemble")
+        return xr.concat([ensemble.to_xarray(), d], dim="ensemble")
     else:
         t = Syntrack(
-            storm_name=most_common(tracks, "storm_name"),
-            init=most_common(tracks, "init"),
-            annual_id=most_common(tracks, "annual_id"),
+            storm_name=ensemble.storm_name,
+            init=ensemble.init,
+            annual_id=ensemble.annual_id,
             ens_num=num_ens + 1,
             ens_name="ENS_MEAN",
-            hour=d.hour.values.astype(int),
-            valid=d.valid_time.values,
-            lat=np.round(d.lat.values, 3),
-            lon=np.round(d.lon.values, 3),
-            mslp=np.round(d.mslp.values, 3),
-            wind=np.round(d.wind.values, 3),
-            model=model,
-            track_type=most_common(tracks, "track_type"),
+            hour=stats.hour.astype(int),
+            valid=stats.valid_time,
+            lat=np.round(center["lat"], 3),
+            lon=np.round(center["lon"], 3),
+            mslp=np.round(center["mslp"], 3),
+            wind=np.round(center["wind"], 3),
+            model=ensemble.model,
+            track_type=ensemble.track_type,
         )
         return t
 
@@ -200,6 +679,15 @@ def most_common(tracks, field):
     return field_counter.most_common()[0][0]
 
 
+# fields of each track used from tracker output files. See `readTrackerOutput`
+TRACKER_FIELDS = ("ens", "annual_id", "stormName", "hour", "lat", "lon", "mslp", "wind")
+TRACK_POINTS = ("hour", "lat", "lon", "mslp", "wind")
+TrackerRecord = namedtuple("TrackerRecord", TRACKER_FIELDS)
+
+# bump whenever the output of `readTrackerOutput` changes so stale sidecars are never used
+TRACKER_CACHE_VERSION = 1
+
+
 def _check_keys(data):
     """
     checks if entries in dictionary are mat-objects. If yes
@@ -243,10 +731,7 @@ def toSyntrackObjects(struct, init_datetime, model, track_type):
         else:
             storm_name = ""
 
-        if isinstance(track.hour, np.ndarray):
-            valid = np.array([init_datetime + timedelta(hours=int(h)) for h in track.hour])
-        else:
-            valid = init_datetime + timedelta(hours=track.hour)
+        valid = validTimes(init_datetime, ensureArray(track.hour))
 
         t = Syntrack(
             storm_name=storm_name,
@@ -255,7 +740,7 @@ def toSyntrackObjects(struct, init_datetime, model, track_type):
             ens_num=ens_num,
             ens_name=ens_name,
             hour=ensureArray(track.hour),
-            valid=ensureArray(valid),
+            valid=valid,
             lat=np.round(ensureArray(track.lat), 3),
             lon=np.round(ensureArray(track.lon), 3),
             mslp=np.round(ensureArray(track.mslp), 3),
@@ -269,6 +754,117 @@ def toSyntrackObjects(struct, init_datetime, model, track_type):
     return tracks
 
 
+def validTimes(init_datetime, hour):
+    """datetime64 valid time of each forecast hour in `hour`"""
+    return np.datetime64(init_datetime, "ns") + np.asarray(hour).astype(int).astype("m8[h]")
+
+
+def trackerSidecarPath(path):
+    """Path of the cache sidecar for a tracker output file (`<file name>.npz` in the same directory)"""
+    return path.with_name(f"{path.name}.npz")
+
+
+def readTrackerOutput(path, variable=None):
+    """Read the fields in `TRACKER_FIELDS` from the struct array of tracks in a tracker output (.mat) file. Only the
+    struct variable is loaded from the file and it's never converted to nested dicts. The tracks are returned as flat
+    (concatenated) arrays, the points of track i being `offsets[i]:offsets[i + 1]`.
+
+    Args:
+        path (pathlib.Path): Path to the .mat file
+        variable (str, optional): Name of the struct array. Defaults to the first struct in the file.
+
+    Returns:
+        dict[str, numpy.ndarray]: ens, annual_id, stormName and offsets with one value per track (offsets has one
+            extra) and hour, lat, lon, mslp and wind with one value per point
+    """
+    if variable is None:
+        structs = [name for name, _, mat_class in whosmat(path) if mat_class == "struct"]
+        if len(structs) == 0:
+            raise ValueError(f"No struct array of tracks in {path.name}")
+        variable = structs[0]
+    struct = np.atleast_1d(loadmat(path, variable_names=[variable], struct_as_record=False, squeeze_me=True)[variable])
+
+    arrays = dict(
+        ens=np.array([track.ens for track in struct], dtype=int),
+        annual_id=np.array([track.annual_id for track in struct], dtype=int),
+        stormName=np.array([track.stormName if isinstance(track.stormName, str) else "" for track in struct], dtype=str),
+    )
+    points = {field: [np.atleast_1d(getattr(track, field)).astype(float) for track in struct] for field in TRACK_POINTS}
+    lengths = [len(hour) for hour in points["hour"]]
+    arrays["offsets"] = np.concatenate(([0], np.cumsum(lengths, dtype=int)))
+    for field, values in points.items():
+        arrays[field] = np.concatenate(values) if len(values) > 0 else np.empty(0)
+    return arrays
+
+
+def load_tracker_output(path, variable=None, cache=True):
+    """Get the arrays (see `readTrackerOutput`) of a tracker output file. The arrays are read from the compressed
+    sidecar next to the file if there is one for the current version (size and modification time) of the file,
+    otherwise the .mat file is read and, if `cache`, the sidecar is saved.
+
+    Args:
+        path (pathlib.Path): Path to the .mat file
+        variable (str, optional): Name of the struct array. Defaults to the first struct in the file.
+        cache (bool, optional): Use the sidecar file. Defaults to True.
+
+    Returns:
+        dict[str, numpy.ndarray]
+    """
+    if not isinstance(path, Path):
+        path = Path(path)
+    stat = path.stat()
+    version = np.array([stat.st_size, stat.st_mtime_ns, TRACKER_CACHE_VERSION])
+    sidecar_path = trackerSidecarPath(path)
+    if cache and sidecar_path.exists():
+        try:
+            with np.load(sidecar_path, allow_pickle=False) as sidecar:
+                if np.array_equal(sidecar["version"], version) and str(sidecar["variable"]) == str(variable):
+                    return {field: sidecar[field] for field in sidecar.files if field not in ("version", "variable")}
+            logger.debug(f"{sidecar_path.name} is out of date. Rereading {path.name}")
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"Unable to read {sidecar_path.as_posix()}: {e}")
+
+    arrays = readTrackerOutput(path, variable=variable)
+    if cache:
+        # write to a temporary file first so a partially written sidecar is never read
+        tmp_path = sidecar_path.with_name(f".{sidecar_path.name}.{os.getpid()}.npz")
+        try:
+            np.savez_compressed(tmp_path, version=version, variable=str(variable), **arrays)
+            tmp_path.replace(sidecar_path)
+        except OSError as e:
+            logger.warning(f"Unable to save {sidecar_path.as_posix()}: {e}")
+            tmp_path.unlink(missing_ok=True)
+    return arrays
+
+
+def load_syntracks(path, init_datetime, model, track_type, variable=None, cache=True):
+    """Read the tracks in a tracker output file as Syntrack objects (see `load_tracker_output` and `toSyntrackObjects`)
+
+    Args:
+        path (pathlib.Path): Path to the .mat file
+        init_datetime (datetime): Initialization time of the model run
+        model (str): "ECMWF" or "NCEP"
+        track_type (str)
+        variable (str, optional): Name of the struct array. Defaults to the first struct in the file.
+        cache (bool, optional): Use the sidecar file. Defaults to True.
+
+    Returns:
+        list[Syntrack]
+    """
+    arrays = load_tracker_output(path, variable=variable, cache=cache)
+    offsets = arrays["offsets"]
+    struct = [
+        TrackerRecord(
+            ens=arrays["ens"][i],
+            annual_id=arrays["annual_id"][i],
+            stormName=str(arrays["stormName"][i]),
+            **{field: arrays[field][offsets[i] : offsets[i + 1]] for field in TRACK_POINTS},
+        )
+        for i in range(len(offsets) - 1)
+    ]
+    return toSyntrackObjects(struct, init_datetime, model, track_type)
+
+
 def ensureArray(var):
     if isinstance(var, np.ndarray):
         return var
@@ -290,6 +886,23 @@ def parseSystemTracks(tracks, inv, time_threshold=1.5, ens_mean=True):
     Returns:
         [type]: [description]
     """
+    return parseInvestTracks(tracks, [inv], time_threshold=time_threshold, ens_mean=ens_mean)[inv.annual_id]
+
+
+def parseInvestTracks(tracks, invests, time_threshold=1.5, ens_mean=True):
+    """Same as calling `parseSystemTracks` for each invest in `invests` (in order) but the unassigned tracks are
+    matched with every invest at once (see `matchUnassignedTracks`)
+
+    Args:
+        tracks (list[Syntrack]): Every track for a model run
+        invests (list[Invest]): Invests active at the time of the model run
+        time_threshold (float, optional): Maximum number of days from invest.valid_time to consider matching tracks. Useful when
+            a tracks first step is something other than 0. Defaults to 1.5.
+        ens_mean (bool, optional): Add the ensemble mean as the last track of each invest. Defaults to True.
+
+    Returns:
+        dict[int, dict[int, Syntrack]]: annual_id of the invest -> ens_num -> track
+    """
 
     model_settings = settings.get(tracks[0].model)
 
@@ -297,32 +910,98 @@ def parseSystemTracks(tracks, inv, time_threshold=1.5, ens_mean=True):
     distance_threshold = np.linspace(310, 1450, len(steps))
     num_ens = model_settings.get("num_ens")
 
-    invest_tracks = {t.ens_num: t for t in tracks if t.annual_id == inv.annual_id}
-    # no need to proceed if there's not any tracks for the provided invest
-    if len(invest_tracks) == 0:
-        logger.warning(f"No tracks found for {inv.name}")
-        return {i: Syntrack(ens_num=i) for i in range(1, num_ens + 1)}
+    assigned = {inv.annual_id: {t.ens_num: t for t in tracks if t.annual_id == inv.annual_id} for inv in invests}
+    # no need to look for unassigned tracks for invests that don't have any tracks
+    matched = matchUnassignedTracks(
+        tracks, [inv for inv in invests if len(assigned[inv.annual_id]) > 0], distance_threshold[0], time_threshold
+    )
+    ens_names = {t.ens_num: t.ens_name for t in tracks}
 
-    # check to see if every ensemble has a track
-    if len(invest_tracks) < num_ens:
+    system_tracks = dict()
+    for inv in invests:
+        invest_tracks = assigned[inv.annual_id]
+        if len(invest_tracks) == 0:
+            logger.warning(f"No tracks found for {inv.name}")
+            system_tracks[inv.annual_id] = {i: Syntrack(ens_num=i) for i in range(1, num_ens + 1)}
+            continue
+
+        # put the tracks in order
+        final_tracks = dict()
         for ens in range(1, num_ens + 1):
-            if ens in invest_tracks.keys():  # matched by tracker
-                continue
-            tmp_tracks = [t for t in tracks if t.ens_num == ens]
-            # No need to see if the ensemble track belongs to the storm if there's not any tracks for the ensemble
-            if len(tmp_tracks) > 0:
-                invest_tracks[ens] = checkUnassignedTracks(tmp_tracks, inv, distance_threshold[0], time_threshold)
+            if ens in invest_tracks:  # matched by tracker
+                final_tracks[ens] = invest_tracks[ens]
+            elif ens in matched[inv.annual_id]:
+                final_tracks[ens] = matched[inv.annual_id][ens]
+            elif ens in ens_names:
+                # the ensemble has tracks but none of them belong to the invest
+                final_tracks[ens] = Syntrack(
+                    ens_name=ens_names[ens], ens_num=ens, annual_id=inv.annual_id, storm_name=inv.name
+                )
             else:
-                invest_tracks[ens] = Syntrack(ens_num=ens)
-    # put the tracks in order
-    final_tracks = dict()
-    for ens in range(1, num_ens + 1):
-        final_tracks[ens] = invest_tracks.get(ens)
-    if ens_mean:
-        # add ensemble mean
-        final_tracks[num_ens + 1] = ensMean(final_tracks)
+                final_tracks[ens] = Syntrack(ens_num=ens)
+        if ens_mean:
+            # add ensemble mean
+            final_tracks[num_ens + 1] = ensMean(final_tracks)
+        system_tracks[inv.annual_id] = final_tracks
+
+    return system_tracks
 
-    return final_tracks
+
+def matchUnassignedTracks(tracks, invests, dist_threshold, time_threshold):
+    """Match the tracks that the tracker didn't assign to a storm (annual_id of 0) with the invests. The distance from
+    the first point of every unassigned track to every invest is computed at once, then the invests take turns (in
+    order) claiming the longest passing track of each ensemble they don't already have a track for. A claimed track
+    gets the annual_id and name of the invest and can't be matched with a later invest.
+
+    Args:
+        tracks (list[Syntrack]): Every track for a model run
+        invests (list[Invest]): Invests to match
+        dist_threshold (float/int): Maximum distance (nm) that a track can start from an invest
+        time_threshold (float): Maximum number of days from invest.valid_time to consider matching tracks. Useful when
+            a track's first step is something other than 0.
+
+    Returns:
+        dict[int, dict[int, Syntrack]]: annual_id of the invest -> ens_num -> matched track
+    """
+    matches = {inv.annual_id: dict() for inv in invests}
+    candidates = [track for track in tracks if track.annual_id == 0]
+    if len(candidates) == 0 or len(invests) == 0:
+        return matches
+    # ensembles the tracker already found for each invest
+    assigned = [{t.ens_num for t in tracks if t.annual_id == inv.annual_id} for inv in invests]
+
+    ens_num = np.array([track.ens_num for track in candidates])
+    length = np.array([len(track.hour) for track in candidates])
+    # longest track of each ensemble first, ties keep the order of `tracks`
+    order = np.lexsort((np.arange(len(candidates)), -length, ens_num))
+    ens_num = ens_num[order]
+    candidates = [candidates[i] for i in order]
+
+    # make sure the first step isn't more than `time_threshold` days away from invest observation
+    first_valid = np.array([track.valid[0] for track in candidates], dtype="datetime64[ns]")
+    invest_valid = np.array([inv.valid for inv in invests], dtype="datetime64[ns]")
+    too_late = (first_valid[:, None] - invest_valid[None, :]) >= pd.Timedelta(days=time_threshold).to_timedelta64()
+    # make sure storm is within distance threshold
+    distances = geo.distanceMatrix(
+        [track.lat[0] for track in candidates],
+        [track.lon[0] for track in candidates],
+        [inv.lat for inv in invests],
+        [inv.lon for inv in invests],
+    )
+    passing = (distances <= dist_threshold) & ~too_late
+
+    claimed = np.zeros(len(candidates), dtype=bool)
+    for i, inv in enumerate(invests):
+        rows = np.flatnonzero(passing[:, i] & ~claimed & ~np.isin(ens_num, list(assigned[i])))
+        # rows are sorted so the first row of each ensemble is its longest track
+        _, first = np.unique(ens_num[rows], return_index=True)
+        for row in rows[first]:
+            track = candidates[row]
+            track.annual_id = inv.annual_id
+            track.storm_name = inv.name
+            matches[inv.annual_id][track.ens_num] = track
+        claimed[rows[first]] = True
+    return matches
 
 
 def checkUnassignedTracks(tracks, inv, dist_threshold, time_threshold):
@@ -341,19 +1020,22 @@ def checkUnassignedTracks(tracks, inv, dist_threshold, time_threshold):
         None: If no unassigned tracks were matched with the invest
     """
 
-    passing_tracks = list()
-    for track in tracks:
-        # make sure we're not using a track that's already addigned to a different storm
-        if track.annual_id != 0:
-            continue
-        # first step is more than 1.5 days away from invest observation
-        if (track.valid[0] - inv.valid) >= timedelta(days=time_threshold):
-            continue
-        # make sure storm is within distance threshold
-        # distance = greatCircleDistance(track.lat[0], track.lon[0], inv.latitude, inv.longitude) can only be used if we're not using the in-house invest files
-        distance = greatCircleDistance(track.lat[0], track.lon[0], inv.lat, inv.lon)
-        if distance <= dist_threshold:
-            passing_tracks.append((track, distance, len(track.hour)))
+    # make sure we're not using a track that's already addigned to a different storm
+    # and that the first step isn't more than 1.5 days away from invest observation
+    candidates = [
+        track for track in tracks
+        if track.annual_id == 0 and not (track.valid[0] - inv.valid) >= timedelta(days=time_threshold)
+    ]
+    # make sure storm is within distance threshold
+    # inv.latitude/inv.longitude can only be used if we're not using the in-house invest files
+    distances = geo.distance(
+        [track.lat[0] for track in candidates], [track.lon[0] for track in candidates], inv.lat, inv.lon
+    )
+    passing_tracks = [
+        (track, distance, len(track.hour))
+        for track, distance in zip(candidates, distances)
+        if distance <= dist_threshold
+    ]
 
     if len(passing_tracks) == 0:
         # final_track = None #NOTE might want to change this so that it returns an "empty" track instead
@@ -375,6 +1057,62 @@ def checkUnassignedTracks(tracks, inv, dist_threshold, time_threshold):
     return final_track
 
 
+def stepBatch(tracks):
+    """Flatten the tracks of an ensemble (e.g. one invest from `parseInvestTracks`, ensemble mean included) into
+    validated Step columns. Points without a position are dropped. Validation follows `toStepDict`, but a member with
+    an unrealistic forecast hour, position or intensity is logged and dropped instead of failing the whole ensemble.
+    Unrealistic pressures are replaced with 1000.
+
+    Args:
+        tracks (dict[int, Syntrack] | list[Syntrack])
+
+    Returns:
+        dict[str, numpy.ndarray]: columns keyed by the Step field names (without `track_id`) plus `ensemble_number`
+    """
+    if isinstance(tracks, dict):
+        tracks = list(tracks.values())
+    tracks = [track for track in tracks if not track.empty()]
+    ensemble_number = np.concatenate([np.full(len(track.hour), track.ens_num) for track in tracks] or [[]]).astype(int)
+    hour, lat, lon, wind, mslp = np.concatenate(
+        [np.stack([track.hour, track.lat, track.lon, track.wind, track.mslp]).astype(float) for track in tracks]
+        or [np.empty((5, 0))],
+        axis=1,
+    )
+    keep = ~np.isnan(lat) & ~np.isnan(lon)
+    ensemble_number, hour, lat, lon, wind, mslp = (
+        values[keep] for values in (ensemble_number, hour, lat, lon, wind, mslp)
+    )
+
+    checks = dict(
+        hour=val.validate_forecast_step_array(hour),
+        latitude=val.validate_latitude_array(lat),
+        longitude=val.validate_longitude_array(lon),
+        intensity_kts=val.validate_velocity_array(wind),
+    )
+    invalid = np.zeros(len(hour), dtype=bool)
+    for check in checks.values():
+        if check.report is not None:
+            logger.warning(f"{check.report} in members {sorted(set(ensemble_number[check.invalid].tolist()))}")
+        invalid |= check.invalid
+    # drop every step of a member with an unrealistic step
+    keep = ~np.isin(ensemble_number, ensemble_number[invalid])
+
+    batch = dict(ensemble_number=ensemble_number[keep])
+    batch.update({name: check.values[keep] for name, check in checks.items()})
+    batch["mslp_mb"] = _roundExact(val.validate_pressure_array(mslp[keep]).values, 2)
+    return batch
+
+
+def _roundExact(values, decimals):
+    """`numpy.round` that matches the built-in round (used by `toStepDict`). The built-in rounds the exact binary
+    value while `numpy.round` scales first, so they only disagree next to a tie. Those few values use the built-in."""
+    rounded = np.round(values, decimals)
+    scaled = values * 10**decimals
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    rounded[ties] = [round(x, decimals) for x in values[ties].tolist()]
+    return rounded
+
+
 def toStepDict(syn, step_index, track_id):
 
     step = dict(
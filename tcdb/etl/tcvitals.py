@@ -0,0 +1,395 @@
+import argparse
+import sys
+from collections import Counter
+import numpy as np
+import pandas as pd
+from loguru import logger
+from pathlib import Path
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, Integer, String
+from sqlalchemy.orm import sessionmaker
+
+from tcdb.etl import atcf
+from tcdb.config import settings
+from tcdb.models import TCVitals
+
+
+DATE_TIME = datetime.now(tz=timezone.utc)
+DATE_STR = DATE_TIME.isoformat().split(".")[0]
+RUN_ID = f"TCVITALS__{DATE_TIME.isoformat()}"
+
+# number of rows sent to the DB per INSERT/SELECT
+CHUNK_SIZE = 5000
+
+# https://www.emc.ncep.noaa.gov/HWRF/tcvitals-draft.html
+# TCVitals records are fixed format: every field of every record sits on the same columns, so each field is a column
+# slice of the (records x width) character grid built by `vitalsGrid`. Maps field -> (first column, last column + 1, kind).
+# The hemisphere of "latitude"/"longitude" fields is the character right after the digits.
+VITALS_FIELDS = {
+    "org": (0, 4, "string"),
+    "system_id": (5, 8, "string"),
+    "storm_name": (9, 18, "string"),
+    "date": (19, 27, "int"),
+    "time": (28, 32, "int"),
+    "latitude": (33, 36, "latitude"),
+    "longitude": (38, 42, "longitude"),
+    "storm_direction_degrees": (44, 47, "int"),
+    "storm_speed_dms": (48, 51, "int"),
+    "mslp_mb": (52, 56, "int"),
+    "env_press_mb": (57, 61, "int"),
+    "roci_km": (62, 66, "int"),
+    "vmax_ms": (67, 69, "int"),
+    "rmw_km": (70, 73, "int"),
+    "r34_ne_km": (74, 78, "int"),
+    "r34_se_km": (79, 83, "int"),
+    "r34_sw_km": (84, 88, "int"),
+    "r34_nw_km": (89, 93, "int"),
+    "storm_depth": (94, 95, "string"),
+    "r50_ne_km": (96, 100, "int"),
+    "r50_se_km": (101, 105, "int"),
+    "r50_sw_km": (106, 110, "int"),
+    "r50_nw_km": (111, 115, "int"),
+    "max_forecast_hour": (116, 118, "int"),
+    "max_forecast_lat": (119, 122, "latitude"),
+    "max_forecast_lon": (124, 128, "longitude"),
+    "r64_ne_km": (130, 134, "int"),
+    "r64_se_km": (135, 139, "int"),
+    "r64_sw_km": (140, 144, "int"),
+    "r64_nw_km": (145, 149, "int"),
+}
+VITALS_WIDTH = 149
+# older records end after the radius of maximum wind
+MIN_VITALS_WIDTH = 73
+
+# last character of the system id (e.g. 09L) -> region short name
+SYSTEM_BASINS = {
+    "L": "AL",
+    "E": "EP",
+    "C": "CP",
+    "W": "WP",
+    "A": "IO",
+    "B": "IO",
+    "S": "SH",
+    "P": "SH",
+}
+
+# columns of the tcvitals table taken straight from `readVitals`
+TABLE_COLUMNS = [
+    "org",
+    "system_id",
+    "nhc_id",
+    "storm_name",
+    "latitude",
+    "longitude",
+    "storm_direction_degrees",
+    "storm_speed_dms",
+    "mslp_mb",
+    "env_press_mb",
+    "roci_km",
+    "vmax_ms",
+    "rmw_km",
+    "r34_ne_km",
+    "r34_se_km",
+    "r34_sw_km",
+    "r34_nw_km",
+    "storm_depth",
+    "r50_ne_km",
+    "r50_se_km",
+    "r50_sw_km",
+    "r50_nw_km",
+    "r64_ne_km",
+    "r64_se_km",
+    "r64_sw_km",
+    "r64_nw_km",
+]
+
+
+def vitalsGrid(buffer, width=VITALS_WIDTH, min_width=MIN_VITALS_WIDTH):
+    """Lay the records of a TCVitals file out as a (records x `width`) byte grid. Shorter records are padded with
+    spaces and records shorter than `min_width` (blank or truncated lines) are dropped.
+
+    Args:
+        buffer (bytes | mmap.mmap): contents of the TCVitals file
+        width (int, optional): Number of columns to keep. Defaults to VITALS_WIDTH.
+        min_width (int, optional): Minimum length of a record. Defaults to MIN_VITALS_WIDTH.
+
+    Returns:
+        numpy.ndarray: uint8 array with shape (records, width)
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if len(data) == 0:
+        return np.empty((0, width), dtype=np.uint8)
+    ends = np.flatnonzero(data == ord("\n"))
+    if len(ends) == 0 or ends[-1] != len(data) - 1:
+        # last line isn't terminated
+        ends = np.append(ends, len(data))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # don't count the carriage return of CRLF line endings
+    ends = ends - ((ends > starts) & (data[ends - 1] == ord("\r")))
+    lengths = ends - starts
+
+    keep = lengths >= min_width
+    num_short = np.count_nonzero(~keep & (lengths > 0))
+    if num_short > 0:
+        logger.warning(f"Skipping {num_short} incomplete TCVitals records")
+    starts = starts[keep]
+    lengths = np.minimum(lengths[keep], width)
+
+    columns = np.arange(width)
+    inside = columns < lengths[:, None]
+    grid = np.full((len(starts), width), ord(" "), dtype=np.uint8)
+    grid[inside] = data[(starts[:, None] + columns)[inside]]
+    return grid
+
+
+def fieldStrings(grid, start, stop):
+    """Text of a fixed-width field with the padding removed. Blank fields are None.
+
+    Returns:
+        numpy.ndarray: object array of str
+    """
+    values = np.ascontiguousarray(grid[:, start:stop]).view(f"S{stop - start}").ravel()
+    # names and ids repeat for every cycle of a storm so only the unique values are decoded
+    uniques, codes = np.unique(values, return_inverse=True)
+    decoded = np.array([value.decode("ascii", errors="replace").strip() or None for value in uniques], dtype=object)
+    return decoded[codes]
+
+
+def fieldNumbers(grid, start, stop):
+    """Value of a fixed-width, zero padded integer field. TCVitals flags missing values with negative numbers
+    (-9, -99, -999) so anything that isn't made up of digits (and padding) is NaN.
+
+    Returns:
+        numpy.ndarray: float64
+    """
+    chars = grid[:, start:stop]
+    # non-digit characters wrap around to values above 9
+    digits = chars - np.uint8(ord("0"))
+    is_digit = digits <= 9
+    valid = (is_digit | (chars == ord(" "))).all(axis=1) & is_digit.any(axis=1)
+    weights = 10 ** np.arange(stop - start - 1, -1, -1)
+    values = (np.where(is_digit, digits, 0) * weights).sum(axis=1).astype(float)
+    values[~valid] = np.nan
+    return values
+
+
+def fieldCoordinates(grid, start, stop, negative):
+    """Signed decimal degrees from a tenths-of-degree field followed by its hemisphere character
+
+    Args:
+        negative (str): Hemisphere of negative values ("S" or "W")
+
+    Returns:
+        numpy.ndarray: float64
+    """
+    values = fieldNumbers(grid, start, stop) / 10
+    return np.where(grid[:, stop] == ord(negative), -values, values)
+
+
+def readVitals(buffer):
+    """Parse the contents of a TCVitals file
+
+    Args:
+        buffer (bytes | mmap.mmap): contents of the TCVitals file
+
+    Returns:
+        pandas.DataFrame: One row per record with the fields in `VITALS_FIELDS` (except date and time), `date_time`
+            and the `nhc_id` of the system.
+    """
+    grid = vitalsGrid(buffer)
+    columns = dict()
+    for name, (start, stop, kind) in VITALS_FIELDS.items():
+        if kind == "string":
+            columns[name] = fieldStrings(grid, start, stop)
+        elif kind == "latitude":
+            columns[name] = fieldCoordinates(grid, start, stop, "S")
+        elif kind == "longitude":
+            columns[name] = fieldCoordinates(grid, start, stop, "W")
+        else:
+            columns[name] = fieldNumbers(grid, start, stop)
+    df = pd.DataFrame(columns)
+
+    date = df.pop("date")
+    time = df.pop("time")
+    df["date_time"] = pd.to_datetime(
+        dict(
+            year=date // 10000,
+            month=date // 100 % 100,
+            day=date % 100,
+            hour=time // 100,
+            minute=time % 100,
+        ),
+        errors="coerce",
+    )
+    invalid = df.date_time.isna() | df.latitude.isna() | df.longitude.isna() | df.system_id.isna()
+    if invalid.any():
+        logger.warning(f"Skipping {invalid.sum()} TCVitals records without a valid system, datetime or position")
+        df = df[~invalid].reset_index(drop=True)
+
+    # systems are numbered per season, and southern hemisphere seasons start on July 1st
+    basin = df.system_id.str[-1].str.upper().map(SYSTEM_BASINS)
+    season = df.date_time.dt.year + ((basin == "SH") & (df.date_time.dt.month >= 7))
+    df["nhc_id"] = (basin + df.system_id.str[:-1] + season.astype(str)).where(basin.notna(), None)
+    return df
+
+
+def parse_tcvitals(path):
+    """Parse a TCVitals file (see `readVitals`)
+
+    Args:
+        path (pathlib.Path): Path to the TCVitals file (plain or gzipped)
+
+    Returns:
+        pandas.DataFrame
+    """
+    with atcf.deckBuffer(path) as buffer:
+        return readVitals(buffer)
+
+
+def existingVitals(session, df):
+    """Query the tcvitals rows for the cycles in `df`
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        df (pandas.DataFrame): output of `readVitals`
+
+    Returns:
+        pandas.DataFrame: id, date_time and the `TABLE_COLUMNS` of every row for those cycles
+    """
+    date_times = [d.to_pydatetime() for d in df.date_time.unique()]
+    columns = [TCVitals.id, TCVitals.datetime_utc] + [getattr(TCVitals, name) for name in TABLE_COLUMNS]
+    existing = list()
+    for i in range(0, len(date_times), CHUNK_SIZE):
+        existing.extend(session.query(*columns).where(TCVitals.datetime_utc.in_(date_times[i : i + CHUNK_SIZE])))
+    existing = pd.DataFrame(existing, columns=["id", "date_time"] + TABLE_COLUMNS)
+    existing["date_time"] = pd.to_datetime(existing.date_time)
+    return existing
+
+
+def changedVitals(df, existing):
+    """Split the records of a TCVitals file into the ones that aren't in the tcvitals table yet and the ones whose
+    values changed since they were loaded. Each download repeats the records from the previous cycles, so usually
+    only the latest cycle is left.
+
+    Args:
+        df (pandas.DataFrame): output of `readVitals`
+        existing (pandas.DataFrame): rows already in the table (see `existingVitals`)
+
+    Returns:
+        tuple[pandas.DataFrame, pandas.DataFrame]: new records, and changed records with the `id` of their row
+    """
+    keys = ["org", "system_id", "date_time"]
+    df = df.drop_duplicates(keys, keep="last")
+    merged = df.merge(existing, on=keys, how="left", suffixes=("", "_db"), indicator=True)
+    new = merged[merged._merge == "left_only"]
+    both = merged[merged._merge == "both"]
+    changed = np.zeros(len(both), dtype=bool)
+    for name in TABLE_COLUMNS:
+        if name in keys:
+            continue
+        if isinstance(TCVitals.__table__.c[name].type, String):
+            changed |= both[name].fillna("").to_numpy(str) != both[f"{name}_db"].fillna("").to_numpy(str)
+        else:
+            # FLOAT columns only keep ~7 significant digits so exact comparisons would update every row
+            values, db_values = both[name].to_numpy(float), both[f"{name}_db"].astype(float).to_numpy()
+            changed |= ~np.isclose(values, db_values, rtol=1e-6, atol=0, equal_nan=True)
+    updated = both[changed]
+    return new[df.columns], updated[["id"] + list(df.columns)].astype(dict(id=int))
+
+
+def vitalsMappings(df, run_id):
+    """Rows of the tcvitals table for the records in `df`, with NULL for missing values"""
+    integers = {name: "Int64" for name in TABLE_COLUMNS if isinstance(TCVitals.__table__.c[name].type, Integer)}
+    rows = df[TABLE_COLUMNS].astype(integers).astype(object)
+    rows = rows.where(rows.notna(), None)
+    rows["datetime_utc"] = [d.to_pydatetime() for d in df.date_time]
+    rows["run_id"] = run_id
+    if "id" in df:
+        rows["id"] = df.id.tolist()
+    return rows.to_dict("records")
+
+
+def loadVitals(session, new, updated=None, run_id=RUN_ID):
+    """Insert the new records and update the changed records of a TCVitals file (see `changedVitals`)
+
+    Args:
+        session (sqlalchemy.orm.session.Session)
+        new (pandas.DataFrame): records from `readVitals` that aren't in the table yet
+        updated (pandas.DataFrame, optional): records whose values changed, with the `id` of their row. Defaults to None.
+        run_id (str, optional): Defaults to RUN_ID.
+
+    Returns:
+        collections.Counter: number of records added and updated
+    """
+    counts = Counter()
+    mappings = vitalsMappings(new, run_id)
+    for i in range(0, len(mappings), CHUNK_SIZE):
+        session.bulk_insert_mappings(TCVitals, mappings[i : i + CHUNK_SIZE])
+    counts["added"] = len(mappings)
+    if updated is not None:
+        mappings = vitalsMappings(updated, run_id)
+        for i in range(0, len(mappings), CHUNK_SIZE):
+            session.bulk_update_mappings(TCVitals, mappings[i : i + CHUNK_SIZE])
+        counts["updated"] = len(mappings)
+    return counts
+
+
+def process_tcvitals(path):
+    """Load the records of a TCVitals file that aren't in the DB yet and update the ones that changed
+
+    Args:
+        path (pathlib.Path): Path to the TCVitals file
+
+    Returns:
+        collections.Counter: number of records added and updated
+    """
+    df = parse_tcvitals(path)
+    logger.info(f"Parsed {len(df)} records from {Path(path).name}")
+
+    engine = create_engine(
+        f"mysql+mysqlconnector://{settings.db.get('USER')}:{settings.db.get('PASS')}@{settings.db.get('HOST')}:{settings.db.get('PORT')}/{settings.db.get('SCHEMA')}"
+    )
+    Session = sessionmaker(engine)
+    with Session() as session:
+        with session.begin():
+            new, updated = changedVitals(df, existingVitals(session, df))
+            for (system_id, date_time), _ in new.groupby(["system_id", "date_time"]):
+                logger.info(f"Adding TCVitals for {system_id} [{date_time.isoformat()}]")
+            for (system_id, date_time), _ in updated.groupby(["system_id", "date_time"]):
+                logger.info(f"Updating TCVitals for {system_id} [{date_time.isoformat()}]")
+            counts = loadVitals(session, new, updated)
+    logger.info(f"Added {counts['added']} and updated {counts['updated']} TCVitals records")
+    return counts
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Load the new and changed records of a TCVitals file into the DB")
+    parser.add_argument("path", type=str, help="Path to the TCVitals file")
+    parser.add_argument(
+        "-l",
+        "--loglevel",
+        type=str,
+        default="INFO",
+        choices=["INFO", "DEBUG", "TRACE"],
+        help="Level to set the logger to.",
+    )
+
+    args = parser.parse_args()
+
+    config = {
+        "handlers": [
+            {
+                "sink": sys.stdout,
+                "format": "<g>{time:YYYY-MM-DD HH:mm:ss}</> | <lvl>{level: <10}</> | <c>{name}</>:<c>{function}</>:<c>{line}</> | <lvl>{message}</>",
+                "backtrace": "True",
+                "catch": "True",
+                "level": args.loglevel,
+                "enqueue": "True",
+            }
+        ]
+    }
+    logger.configure(**config)
+
+    process_tcvitals(Path(args.path))
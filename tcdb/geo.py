@@ -0,0 +1,277 @@
+import numpy as np
+
+
+# length of one degree of great circle arc in each of the units supported by `tcdb.utils.greatCircleDistance`
+DEGREE_LENGTH = {
+    "nm": 60.0,
+    "km": 60.0 * 1.852,
+    "mi": 60.0 * 1.15077945,
+    "degrees": 1.0,
+}
+
+# number of elements in the scratch buffer used by `distanceMatrix`
+BLOCK_SIZE = 2**18
+
+
+def _degreeLength(units):
+    try:
+        return DEGREE_LENGTH[units]
+    except KeyError:
+        raise ValueError(f"Unknown units '{units}'. Expected one of {list(DEGREE_LENGTH)}")
+
+
+def _haversine(lat1, lon1, lat2, lon2, cos_lat1, cos_lat2, out, scratch):
+    """Central angle (radians) between points given in radians, written to `out`. `scratch` is overwritten and must
+    have the same shape as `out`. Every operation is done in place so the only arrays of the output size are `out`
+    and `scratch`.
+    """
+    # sin^2(dlat / 2)
+    np.subtract(lat1, lat2, out=out)
+    out *= 0.5
+    np.sin(out, out=out)
+    np.square(out, out=out)
+    # cos(lat1) * cos(lat2) * sin^2(dlon / 2)
+    np.subtract(lon1, lon2, out=scratch)
+    scratch *= 0.5
+    np.sin(scratch, out=scratch)
+    np.square(scratch, out=scratch)
+    scratch *= cos_lat1
+    scratch *= cos_lat2
+    out += scratch
+    # rounding can push antipodal points just past 1
+    np.minimum(out, 1.0, out=out)
+    np.sqrt(out, out=out)
+    np.arcsin(out, out=out)
+    out *= 2.0
+    return out
+
+
+def distance(lat1, lon1, lat2, lon2, units="nm", out=None):
+    """Great circle distance between the points (`lat1`, `lon1`) and (`lat2`, `lon2`). Same formula as
+    `tcdb.utils.greatCircleDistance` but the inputs can be arrays of any shapes that broadcast together.
+
+    Args:
+        lat1, lon1, lat2, lon2 (float | numpy.ndarray): coordinates in decimal degrees
+        units (str, optional): "nm", "km", "mi" or "degrees". Defaults to "nm".
+        out (numpy.ndarray, optional): float64 array with the broadcast shape to write the result to. Defaults to None.
+
+    Returns:
+        numpy.ndarray: distances with the broadcast shape of the inputs
+    """
+    factor = _degreeLength(units) * 180.0 / np.pi
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    shape = np.broadcast_shapes(lat1.shape, lon1.shape, lat2.shape, lon2.shape)
+    if out is None:
+        out = np.empty(shape)
+    _haversine(lat1, lon1, lat2, lon2, np.cos(lat1), np.cos(lat2), out, np.empty(shape))
+    out *= factor
+    return out
+
+
+def distanceMatrix(lat1, lon1, lat2, lon2, units="nm", out=None, block_size=BLOCK_SIZE):
+    """Distance from every point in (`lat1`, `lon1`) to every point in (`lat2`, `lon2`). The matrix is filled a block
+    of rows at a time so the scratch space stays at `block_size` elements no matter how many points there are.
+
+    Args:
+        lat1, lon1 (numpy.ndarray): coordinates of the n "row" points in decimal degrees
+        lat2, lon2 (numpy.ndarray): coordinates of the m "column" points in decimal degrees
+        units (str, optional): "nm", "km", "mi" or "degrees". Defaults to "nm".
+        out (numpy.ndarray, optional): float64 array with shape (n, m) to write the result to. Defaults to None.
+        block_size (int, optional): Maximum number of elements in the scratch buffer. Defaults to BLOCK_SIZE.
+
+    Returns:
+        numpy.ndarray: array with shape (n, m)
+    """
+    factor = _degreeLength(units) * 180.0 / np.pi
+    lat1, lon1 = (np.radians(np.asarray(x, dtype=float)).ravel()[:, None] for x in (lat1, lon1))
+    lat2, lon2 = (np.radians(np.asarray(x, dtype=float)).ravel()[None, :] for x in (lat2, lon2))
+    cos_lat1 = np.cos(lat1)
+    cos_lat2 = np.cos(lat2)
+    n, m = len(lat1), lat2.shape[1]
+    if out is None:
+        out = np.empty((n, m))
+    rows = max(1, block_size // max(m, 1))
+    scratch = np.empty((min(rows, n), m))
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        block = slice(start, stop)
+        _haversine(
+            lat1[block], lon1[block], lat2, lon2, cos_lat1[block], cos_lat2, out[block], scratch[: stop - start]
+        )
+        out[block] *= factor
+    return out
+
+
+def initialBearing(lat1, lon1, lat2, lon2):
+    """Initial bearing (forward azimuth) of the great circle from (`lat1`, `lon1`) to (`lat2`, `lon2`). Inputs broadcast.
+
+    Args:
+        lat1, lon1, lat2, lon2 (float | numpy.ndarray): coordinates in decimal degrees
+
+    Returns:
+        numpy.ndarray: bearing in degrees clockwise from north, in [0, 360)
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    bearing = np.degrees(np.arctan2(y, x))
+    bearing %= 360.0
+    return bearing
+
+
+def destinationPoint(lat, lon, bearing, dist, units="nm"):
+    """Point reached by travelling `dist` along the great circle that leaves (`lat`, `lon`) on `bearing`. Inputs broadcast.
+
+    Args:
+        lat, lon (float | numpy.ndarray): starting point in decimal degrees
+        bearing (float | numpy.ndarray): initial bearing in degrees clockwise from north
+        dist (float | numpy.ndarray): distance travelled
+        units (str, optional): units of `dist`. "nm", "km", "mi" or "degrees". Defaults to "nm".
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: latitude and longitude (in [-180, 180)) of the destination
+    """
+    lat, lon, bearing = (np.radians(np.asarray(x, dtype=float)) for x in (lat, lon, bearing))
+    arc = np.radians(np.asarray(dist, dtype=float) / _degreeLength(units))
+    sin_lat2 = np.sin(lat) * np.cos(arc) + np.cos(lat) * np.sin(arc) * np.cos(bearing)
+    lat2 = np.arcsin(np.clip(sin_lat2, -1.0, 1.0))
+    lon2 = lon + np.arctan2(np.sin(bearing) * np.sin(arc) * np.cos(lat), np.cos(arc) - np.sin(lat) * sin_lat2)
+    lon2 = (np.degrees(lon2) + 180.0) % 360.0 - 180.0
+    return np.degrees(lat2), lon2
+
+
+def alongTrackDistance(lat, lon, units="nm", axis=-1):
+    """Cumulative distance travelled along one or more tracks. Segments that start or end at a missing (NaN) point
+    add nothing, so a gap in a track doesn't wipe out the rest of it. Missing points stay NaN.
+
+    Args:
+        lat, lon (numpy.ndarray): track positions in decimal degrees, e.g. (ensemble, step) arrays
+        units (str, optional): "nm", "km", "mi" or "degrees". Defaults to "nm".
+        axis (int, optional): Axis along which the tracks run. Defaults to -1.
+
+    Returns:
+        numpy.ndarray: same shape as `lat`. The first point of each track is 0.
+    """
+    lat = np.moveaxis(np.asarray(lat, dtype=float), axis, -1)
+    lon = np.moveaxis(np.asarray(lon, dtype=float), axis, -1)
+    total = np.zeros(lat.shape)
+    if lat.shape[-1] > 1:
+        segments = distance(lat[..., :-1], lon[..., :-1], lat[..., 1:], lon[..., 1:], units=units)
+        np.nancumsum(segments, axis=-1, out=total[..., 1:])
+    total[np.isnan(lat) | np.isnan(lon)] = np.nan
+    return np.moveaxis(total, -1, axis)
+
+
+def densifyTracks(lat, lon, max_spacing, units="nm", values=()):
+    """Add points along the segments of one or more tracks so that consecutive points are at most `max_spacing`
+    apart. Points are interpolated linearly in latitude and longitude (taking the short way across the dateline),
+    which is close to the great circle for the few hundred nm between the steps of a track. Segments that start or
+    end at a missing (NaN) point aren't filled in.
+
+    Args:
+        lat, lon (numpy.ndarray): (track, step) positions in decimal degrees
+        max_spacing (float): Maximum distance between consecutive points
+        units (str, optional): units of `max_spacing`. "nm", "km", "mi" or "degrees". Defaults to "nm".
+        values (tuple[numpy.ndarray], optional): other (track, step) arrays to interpolate, e.g. the forecast hour.
+            Defaults to ().
+
+    Returns:
+        tuple[numpy.ndarray]: track index, latitude, longitude and each of `values` for every point (the original
+            points first, then the added points)
+    """
+    lat, lon = np.atleast_2d(np.asarray(lat, dtype=float)), np.atleast_2d(np.asarray(lon, dtype=float))
+    values = [np.atleast_2d(np.asarray(v, dtype=float)) for v in values]
+    valid = ~np.isnan(lat) & ~np.isnan(lon)
+    tracks, steps = np.nonzero(valid)
+
+    segments = valid[:, :-1] & valid[:, 1:]
+    seg_tracks, seg_steps = np.nonzero(segments)
+    lat1, lat2 = lat[seg_tracks, seg_steps], lat[seg_tracks, seg_steps + 1]
+    lon1 = lon[seg_tracks, seg_steps]
+    dlon = (lon[seg_tracks, seg_steps + 1] - lon1 + 180.0) % 360.0 - 180.0
+    length = distance(lat1, lon1, lat2, lon1 + dlon, units=units)
+    pieces = np.maximum(np.ceil(length / max_spacing), 1).astype(int)
+
+    # points k = 1..pieces-1 of each segment
+    added = pieces - 1
+    seg = np.repeat(np.arange(len(pieces)), added)
+    k = np.arange(added.sum()) - np.repeat(np.cumsum(added) - added, added) + 1
+    fraction = k / pieces[seg]
+
+    out = [
+        np.concatenate([tracks, seg_tracks[seg]]),
+        np.concatenate([lat[tracks, steps], lat1[seg] + fraction * (lat2 - lat1)[seg]]),
+        np.concatenate([lon[tracks, steps], lon1[seg] + fraction * dlon[seg]]),
+    ]
+    for v in values:
+        v1, v2 = v[seg_tracks, seg_steps], v[seg_tracks, seg_steps + 1]
+        out.append(np.concatenate([v[tracks, steps], v1[seg] + fraction * (v2 - v1)[seg]]))
+    return tuple(out)
+
+
+def discCoverage(lat, lon, group, grid_lat, grid_lon, radius, units="nm"):
+    """Count, for every cell of a regular lat/lon grid, the groups (e.g. ensemble members) with at least one point
+    within `radius` of the cell. The disc around each point is rasterized exactly: for every grid row it crosses,
+    the spherical law of cosines gives the longitudes where the disc starts and ends, and each group's intervals are
+    merged with a difference array along the row.
+
+    Args:
+        lat, lon (numpy.ndarray): coordinates of the points in decimal degrees
+        group (numpy.ndarray): int group of each point
+        grid_lat, grid_lon (numpy.ndarray): evenly spaced, increasing cell centers. Longitudes may run past 180
+            (e.g. 100 to 200) for grids that cross the dateline.
+        radius (float)
+        units (str, optional): units of `radius`. "nm", "km", "mi" or "degrees". Defaults to "nm".
+
+    Returns:
+        numpy.ndarray: int array with shape (len(grid_lat), len(grid_lon))
+    """
+    grid_lat, grid_lon = np.asarray(grid_lat, dtype=float), np.asarray(grid_lon, dtype=float)
+    num_lat, num_lon = len(grid_lat), len(grid_lon)
+    dlat = grid_lat[1] - grid_lat[0] if num_lat > 1 else 1.0
+    dlon = grid_lon[1] - grid_lon[0] if num_lon > 1 else 1.0
+    arc = radius / _degreeLength(units)
+    lat = np.asarray(lat, dtype=float)
+    # move the points into the longitude range of the grid
+    lon = grid_lon[0] + (np.asarray(lon, dtype=float) - grid_lon[0]) % 360.0
+    group = np.asarray(group)
+
+    # every grid row the disc of each point can cross
+    first_row = np.ceil((lat - arc - grid_lat[0]) / dlat).astype(int)
+    rows = first_row[:, None] + np.arange(int(np.ceil(2 * arc / dlat)) + 1)
+    row_lat = grid_lat[0] + rows * dlat
+    keep = (rows >= 0) & (rows < num_lat) & (np.abs(row_lat - lat[:, None]) <= arc)
+
+    # half width (degrees of longitude) of the disc along each row
+    phi0, phi = np.radians(lat)[:, None], np.radians(row_lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_dlon = (np.cos(np.radians(arc)) - np.sin(phi) * np.sin(phi0)) / (np.cos(phi) * np.cos(phi0))
+    keep &= ~(cos_dlon > 1)
+    half = np.degrees(np.arccos(np.clip(np.nan_to_num(cos_dlon, nan=-1.0), -1.0, 1.0)))
+    point_group = np.broadcast_to(group[:, None], rows.shape)[keep]
+    rows, center, half = rows[keep], np.broadcast_to(lon[:, None], keep.shape)[keep], half[keep]
+    # discs that wrap past either end of the 360 degree range also cover the other end of a global grid (or the
+    # western edge of a regional one)
+    east = center + half - 360.0 >= grid_lon[0]
+    west = center - half < grid_lon[0]
+    point_group = np.concatenate([point_group, point_group[east], point_group[west]])
+    rows = np.concatenate([rows, rows[east], rows[west]])
+    center = np.concatenate([center, center[east] - 360.0, center[west] + 360.0])
+    half = np.concatenate([half, half[east], half[west]])
+
+    start = np.maximum(np.ceil((center - half - grid_lon[0]) / dlon), 0)
+    stop = np.minimum(np.floor((center + half - grid_lon[0]) / dlon), num_lon - 1)
+    keep = start <= stop
+    point_group, rows, start, stop = point_group[keep], rows[keep], start[keep].astype(int), stop[keep].astype(int)
+    coverage = np.zeros((num_lat, num_lon), dtype=int)
+    width = num_lon + 1
+    for g in np.unique(point_group):
+        sel = point_group == g
+        row_min, row_max = rows[sel].min(), rows[sel].max()
+        size = (row_max - row_min + 1) * width
+        offset = (rows[sel] - row_min) * width
+        diff = np.bincount(offset + start[sel], minlength=size) - np.bincount(offset + stop[sel] + 1, minlength=size)
+        covered = np.cumsum(diff.reshape(-1, width), axis=1)[:, :num_lon] > 0
+        coverage[row_min : row_max + 1] += covered
+    return coverage
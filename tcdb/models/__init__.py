@@ -7,3 +7,4 @@ from tcdb.models.steps import Step
 from tcdb.models.tracks import Track
 from tcdb.models.data_sources import DataSource
 from tcdb.models.invest import Invest
+from tcdb.models.tcvitals import TCVitals
@@ -0,0 +1,44 @@
+from sqlalchemy import UniqueConstraint
+from sqlalchemy import Column, Integer, Float, String, DateTime, TIMESTAMP, text
+
+from tcdb.models.base import Base, DefaultTable
+
+
+class TCVitals(Base, DefaultTable):
+    """TCVitals records in the units of the TCVitals format (km and m/s). `nhc_id` is derived from `system_id` so the
+    vitals can be joined with `storms.nhc_id` before the BDeck for the cycle is available.
+    """
+    __tablename__ = "tcvitals"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    org = Column(String(4), nullable=False)
+    system_id = Column(String(3), nullable=False)
+    nhc_id = Column(String(10))
+    storm_name = Column(String(9))
+    datetime_utc = Column(DateTime, nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    storm_direction_degrees = Column(Integer)
+    storm_speed_dms = Column(Integer)
+    mslp_mb = Column(Float)
+    env_press_mb = Column(Float)
+    roci_km = Column(Integer)
+    vmax_ms = Column(Float)
+    rmw_km = Column(Integer)
+    r34_ne_km = Column(Integer)
+    r34_se_km = Column(Integer)
+    r34_sw_km = Column(Integer)
+    r34_nw_km = Column(Integer)
+    storm_depth = Column(String(1))
+    r50_ne_km = Column(Integer)
+    r50_se_km = Column(Integer)
+    r50_sw_km = Column(Integer)
+    r50_nw_km = Column(Integer)
+    r64_ne_km = Column(Integer)
+    r64_se_km = Column(Integer)
+    r64_sw_km = Column(Integer)
+    r64_nw_km = Column(Integer)
+    run_id = Column(String(255), nullable=False)
+    last_update = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"))
+
+    __table_args__ = (UniqueConstraint("org", "system_id", "datetime_utc", name="tcvitals_index"),)
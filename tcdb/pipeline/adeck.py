@@ -44,7 +44,8 @@ def processAdeck(
     models=settings.atcf.adeck.models,
     staging_dir=None,
     date_time=None,
-    backfill=False
+    backfill=False,
+    changed=None,
 ):
     """Process the provided ADECK file and save the output in a file that contains a single model and datetime per file. If an output file already
     exists it will only be saved if the forecast initialization datetime is less than 48 hours old.
@@ -59,13 +60,11 @@ def processAdeck(
         staging_dir (pathlib.Path, optional): Path to temporarily store files to be added to the DB
         date_time (_type_, optional): Parse only the models that were initialized on `date_time`. If None, all initialization datetimes are processed. Defaults to None.
         backfill (bool, optional): If True, process the file regardless of `storm.status`. If False, only process the file if the  `storm.status` == "Active". Defaults to False.
+        changed (set[tuple[str, str]], optional): (YYYYMMDDHH, TECH) forecasts that were added or changed since the previous version of the ADECK file (see `atcf.changed_keys`). If provided, only these forecasts are processed. Defaults to None.
 
     Returns:
         (list[pathlib.Path]): List of paths to files in the staging directory 
     """
-    # parse the file into a pandas df
-    df = atcf.parse_aDeck(input_path)
-
     if backfill is False:
         hours_from_init = 48
         # dont wast time processing files for storms that are archived
@@ -85,30 +84,28 @@ def processAdeck(
         staging_dir = Path(settings.paths.staging_dir).joinpath(f'adeck')
         staging_dir.mkdir(exist_ok=True, parents=True)
 
+    # only process forecasts that are no more than 24 hours older than `date_time`
+    since = None if date_time is None else date_time - timedelta(hours=24)
+
     output_files = list()
-    if date_time is None: 
-        df = df.loc[df.TECH.isin(models)]
-        for DATETIME, dat in df.groupby('DATETIME'):
-            for TECH, d in dat.groupby('TECH'):
-                output_file = output_dir.joinpath(f"{region.lower()}-{storm.id}-{DATETIME.year}_{TECH}_{DATETIME.strftime('%Y%m%d%H')}.csv")
-                if output_file.exists():
-                    # only save the file if the forecast datetime is less than 48 hours old (will hopefully save processing time)
-                    if (NOW - DATETIME)  > timedelta(hours=hours_from_init):
-                        logger.debug(f"Forecast datetime ({DATETIME.isoformat()}) is older than 24 hours. skipping.......")
-                        continue
-                logger.trace(f"Saving output to: {output_file.as_posix()}")
-                d.to_csv(output_file, index=False)
-                output_files.append(output_file)
-    else:
-        # only process forecasts that are no more than 24 hours older than `date_time`
-        df = df.loc[(date_time - df.DATETIME) <= timedelta(hours=24)]
-        for DATETIME, dat in df.groupby('DATETIME'):
-            dat = dat.loc[dat.TECH.isin(models)]
-            for TECH, d in dat.groupby('TECH'):
-                output_file = output_dir.joinpath(f"{region.lower()}-{storm.id}-{DATETIME.year}_{TECH}_{DATETIME.strftime('%Y%m%d%H')}.csv")
-                logger.trace(f"Saving output to: {output_file.as_posix()}")
-                d.to_csv(output_file, index=False)
-                output_files.append(output_file)
+    # stream the file one model/initialization at a time
+    # when processing a single cycle the deck index lets us seek straight to the forecasts we need
+    for DATETIME, TECH, d in atcf.iter_aDeck_forecasts(
+        input_path,
+        models=models,
+        since=since,
+        keys=changed,
+        use_index=date_time is not None or changed is not None,
+    ):
+        output_file = output_dir.joinpath(f"{region.lower()}-{storm.id}-{DATETIME.year}_{TECH}_{DATETIME.strftime('%Y%m%d%H')}.csv")
+        if date_time is None and changed is None and output_file.exists():
+            # only save the file if the forecast datetime is less than 48 hours old (will hopefully save processing time)
+            if (NOW - DATETIME)  > timedelta(hours=hours_from_init):
+                logger.debug(f"Forecast datetime ({DATETIME.isoformat()}) is older than 24 hours. skipping.......")
+                continue
+        logger.trace(f"Saving output to: {output_file.as_posix()}")
+        d.to_csv(output_file, index=False)
+        output_files.append(output_file)
     
     # Copy the files to the staging directory to be processed
     logger.info(f"Adding {len(output_files)} track files for {storm.name} to staging directory")
@@ -165,10 +162,21 @@ def run(basin_config, season, date_time, backfill):
                         adeck_storm_path = adeck_dir.joinpath(f"{storm.annual_id:02d}")
                         adeck_storm_path.mkdir(parents=True, exist_ok=True)
                         
-                        processed_files = processAdeck(file_path, adeck_storm_path, storm, staging_dir=staging_dir, date_time=date_time, backfill=backfill)
+                        # the raw version of the file from the previous run is kept in the data lake so only the
+                        # forecasts that were appended or revised since then need to be processed
+                        previous_path = adeck_storm_path.joinpath(file_path.name)
+                        changed = None
+                        if not backfill and previous_path.exists():
+                            changed = atcf.changed_keys(file_path, previous_path)
+                            logger.debug(f"{len(changed)} new or updated forecasts in {file_path.name}")
+
+                        processed_files = processAdeck(file_path, adeck_storm_path, storm, staging_dir=staging_dir, date_time=date_time, backfill=backfill, changed=changed)
                         if len(processed_files) > 0:
                             logger.info(f"Processing {len(processed_files)} track files for {storm.name}")
                             atcf_forecasts.process_adecks(sorted(processed_files))
+                        # keep the raw file (and its index) to diff the next version against
+                        fs_utils.copyDeck(file_path, previous_path)
+                        atcf.deck_index(previous_path, save=True)
 
 
 if __name__ == "__main__":
@@ -11,6 +11,7 @@ from tempfile import TemporaryDirectory
 from tcdb.pipeline import utils
 from tcdb.pipeline import fs_utils
 from tcdb.config import settings
+from tcdb.etl import atcf
 
 from tcdb.etl.process_storms import processStorms
 from tcdb.etl.process_obs import processObservations
@@ -80,6 +81,8 @@ def run(basin_config, date_time, force, backfill=False):
             file_names = getFileNames(response, file_pattern)
 
             files_to_staging = 0
+            # observation datetimes that changed since the previous version of each file in the lake
+            changed_dates = dict()
             # download most recent version of bdeck files
             logger.info(f"Downloading {len(file_names)} files for {basin}")
             for file_name in file_names:
@@ -87,7 +90,7 @@ def run(basin_config, date_time, force, backfill=False):
                 tmp_path = download_path.joinpath(file_name)
                 if downloadLocally(file_url, tmp_path, verify=verify):
                     # check to see if the contents of the file have been updated
-                    if fs_utils.isContentsUnique(tmp_path, bdeck_dir.glob(f"{file_name.split('.')[0]}*")):
+                    if fs_utils.isContentsUnique(tmp_path, bdeck_dir.glob(f"{file_name.split('.')[0]}*.csv")):
                         # work-around for the bug where WP bdecks are randomly empty on the JTWC data site
                         if tmp_path.stat().st_size == 0:
                             logger.error(f'{tmp_path.as_posix()} is empty. Not replacing')
@@ -95,31 +98,45 @@ def run(basin_config, date_time, force, backfill=False):
                         logger.info(f"{file_name} has been updated")
                         final_path = bdeck_dir.joinpath(f"{file_name.split('.')[0]}_{timestamp}.csv")
                         staging_path = staging_dir.joinpath(f"{file_name.split('.')[0]}_{timestamp}.csv")
+                        previous_versions = sorted(bdeck_dir.glob(f"{file_name.split('.')[0]}*.csv"))
                         # move the file from the temporary dir to the data lake path
                         tmp_path.rename(final_path)
+                        # index the new version once so later steps can seek straight to a cycle
+                        atcf.deck_index(final_path, save=True)
+                        if len(previous_versions) > 0:
+                            # only the observations that were appended or revised need to be processed
+                            changed = atcf.changed_keys(final_path, previous_versions[-1])
+                            changed_dates[staging_path.name] = sorted(
+                                {datetime.strptime(date_str, "%Y%m%d%H") for date_str, _ in changed}
+                            )
+                            logger.debug(f"{len(changed_dates[staging_path.name])} new or updated observations in {file_name}")
                         # copy the file from the data lake to the staging direcory
                         logger.info(f"Copying {final_path.as_posix()} to staging directory for processing")
-                        staging_path.write_text(final_path.read_text())
+                        fs_utils.copyDeck(final_path, staging_path)
                         files_to_staging += 1
                     else:
                         if force:
                             # get the file with the oldest timestamp
-                            most_recent_file = list(sorted(bdeck_dir.glob(f"{file_name.split('.')[0]}*")))[-1]
+                            most_recent_file = list(sorted(bdeck_dir.glob(f"{file_name.split('.')[0]}*.csv")))[-1]
                             logger.info(f"`force` is True. Copying {most_recent_file.as_posix()} to staging directory")
                             staging_path = staging_dir.joinpath(f"{most_recent_file.name}")
                             # copy to staging directory
-                            staging_path.write_text(most_recent_file.read_text())
+                            fs_utils.copyDeck(most_recent_file, staging_path)
                             files_to_staging += 1
                     
             logger.info(f"Added {files_to_staging} updated bdeck files to staging directory from {basin}")
             if files_to_staging > 0: 
+                # parse each staged file once and share it between the storm and observation steps
+                decks = atcf.load_bDecks(staging_dir.glob(f"b{basin.lower()}*.csv"))
                 # process the updated bdeck files and update the storms table if necessary
-                processStorms(basin.upper(), datetime.now(), staging_dir=staging_dir)
+                processStorms(basin.upper(), datetime.now(), staging_dir=staging_dir, decks=decks)
                 # process the updated bdeck files and update the observations table if necessary
-                processObservations(basin.upper(), date_time=None, staging_dir=staging_dir)
+                processObservations(
+                    basin.upper(), date_time=None, staging_dir=staging_dir, changed_dates=changed_dates, decks=decks
+                )
 
                 # clean up
-                for f in staging_dir.glob('*.csv'):
+                for f in [*staging_dir.glob('*.csv'), *staging_dir.glob('*.csv.idx.json')]:
                     logger.trace(f"Removing {f.as_posix()}")
                     f.unlink()
 
@@ -232,6 +249,6 @@ if __name__ == "__main__":
     finally:
         logger.info(f"Removing any files remaining in the staging directory")
         staging_dir = Path(settings.paths.staging_dir).joinpath('bdeck')
-        for file_path in staging_dir.glob("b*.csv"):
+        for file_path in [*staging_dir.glob("b*.csv"), *staging_dir.glob("b*.csv.idx.json")]:
             file_path.unlink()
         logger.info(f"Finished running {__file__}")
@@ -5,6 +5,8 @@ import shutil
 from datetime import datetime
 from loguru import logger
 
+from tcdb.etl.atcf import deckIndexPath
+
 now = datetime.now()
 
 def isContentsUnique(file_path, cmp_files):
@@ -43,6 +45,7 @@ def removeDuplicateFiles(directory_path, glob_pattern):
                 if filecmp.cmp(diff_files[-1], file_path, shallow=False):
                     logger.trace(f"{file_path.name} is the same as {diff_files[-1].name}")
                     file_path.unlink()
+                    deckIndexPath(file_path).unlink(missing_ok=True)
                     removed_files += 1
                 else:
                     logger.trace(f"{file_path.name} is unique")
@@ -64,4 +67,14 @@ def extractGZip(in_path, out_dir, remove=False):
     if remove:
         logger.trace(f"Removing {in_path.as_posix()}")
         in_path.unlink()
-    return out_path
\ No newline at end of file
+    return out_path
+
+
+def copyDeck(src, dst):
+    """Copy an ATCF deck file along with its index sidecar if it has one.
+    The modification time is preserved so the sidecar stays valid for the copy.
+    """
+    shutil.copy2(src, dst)
+    if deckIndexPath(src).exists():
+        shutil.copy2(deckIndexPath(src), deckIndexPath(dst))
+    return dst
@@ -1,10 +1,13 @@
 import os
 import json
 import pendulum
+import pandas as pd
 from pathlib import Path
 from loguru import logger
+from itertools import groupby
 from collections import defaultdict
 
+from tcdb.etl import atcf
 from tcdb.pipeline import utils
 from tcdb.pipeline import fs_utils
 
@@ -14,62 +17,156 @@ now = pendulum.now("UTC")
 timestamp = now.strftime("%Y%m%dT%H%M")
 backfill = True
 
-def getUniqueID(lines):
-    basin = lines[0][0].upper()
-    start_date = pendulum.from_format(str(lines[0][2]), "YYYYMMDDHH", tz='UTC')
-    start_lat = lines[0][6]
-    if start_lat.endswith("N"):
-        start_lat = round(float(start_lat[:-1]) * 0.1, 1)
-    elif start_lat.endswith("S"):
-        start_lat = round(float(start_lat[:-1]) * -0.1, 1)
-    
+# ATCF fields saved for each observation (field name -> 0-indexed column in the bdeck)
+OB_FIELDS = {
+    'wind': 8,
+    'mslp': 9,
+    'radius': 11,
+    'ne': 13,
+    'se': 14,
+    'sw': 15,
+    'nw': 16,
+    'pouter': 17,
+    'router': 18,
+    'gusts': 19,
+}
+
+
+def getUniqueID(df):
+    first = df.iloc[0]
+    basin = first.BASIN.upper()
+    start_date = pendulum.from_format(first.DATETIME, "YYYYMMDDHH", tz='UTC')
+    start_lat = first.LAT
+
     #return f"{start_date.format('YYYYMMDDHH')}{basin}{int(start_lat):02d}"
     return f"{basin}{start_date.format('YYYYMMDDHH')}.{int(start_lat):02d}"
 
 
 def parse_obs(path):
     assert path.exists(), f"Bdeck file does not exist: {path.as_posix()}"
-    obs_dict = defaultdict(list)
-    with open(path, 'r') as t:
-        lines = t.readlines()
-    lines = [(l.strip().replace(" ", "")).split(",") for l in lines]
-    lines = [line for line in lines if len(line) >= 27]  # dont keep lines that dont at lest have storm name
-    uid = getUniqueID(lines) # {start_date}{basin}{start_lat}
-    for line in lines:
-        ob = {}
-        date_time = pendulum.from_format(line[2], "YYYYMMDDHH", tz="UTC")
-        ob['date_time'] = date_time.isoformat()
-        ob['basin'] = line[0].upper()
-        ob['nhc_num'] = int(line[1])
-        lat = line[6]
-        lon = line[7]
-        if lat.endswith("N"):
-            lat = round(float(lat[:-1]) * 0.1, 1)
-        elif lat.endswith("S"):
-            lat = round(float(lat[:-1]) * -0.1, 1)
-        if lon.endswith("W"):
-            lon = round(float(lon[:-1]) * -0.1, 1)
-        elif lon.endswith("E"):
-            lon = round(float(lon[:-1]) * 0.1, 1)
-        ob['lat'] = lat
-        ob['lon'] = lon
-        ob['wind'] = int(line[8])
-        ob['mslp'] = int(line[9])
-        ob['radius'] = int(line[11])
-        ob['ne'] = int(line[13])
-        ob['se'] = int(line[14])
-        ob['sw'] = int(line[15])
-        ob['nw'] = int(line[16])
-        ob['pouter'] = int(line[17])
-        ob['router'] = int(line[18])
-        ob['gusts'] = int(line[19])
-        ob['storm_name'] = line[27]
-
-        ob['nhc_id'] = f"{ob['basin'].upper()}{ob['nhc_num']:02d}{date_time.year}"
-        obs_dict[date_time.format("YYYYMMDDHH")].append(ob)
+    # dont keep lines that dont at least have storm name
+    df = atcf.read_deck(path, atcf.BDECK_COLUMNS, usecols=range(28), min_fields=28, dtype=str)
+    # spaces are removed from every field before decoding
+    df = df.apply(lambda col: atcf.mapUnique(col, lambda uniques: uniques.str.replace(" ", "")))
+    df = df[df.DATETIME.notna()]
+    df["LAT"] = atcf.decodeCoordinate(df.LAT, positive="N", negative="S")
+    df["LON"] = atcf.decodeCoordinate(df.LON, positive=None, negative="W")
+    uid = getUniqueID(df) # {start_date}{basin}{start_lat}
+
+    date_time = pd.to_datetime(df.DATETIME, format="%Y%m%d%H", utc=True)
+    obs = pd.DataFrame(
+        {
+            'date_time': date_time.dt.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            'basin': df.BASIN.str.upper(),
+            'nhc_num': df.SNUM.astype(int),
+            'lat': df.LAT,
+            'lon': df.LON,
+        }
+    )
+    for field, col in OB_FIELDS.items():
+        obs[field] = df[atcf.BDECK_COLUMNS[col]].astype(int)
+    obs['storm_name'] = df.STORMNAME.fillna("")
+    obs['nhc_id'] = obs.basin + obs.nhc_num.map("{:02d}".format) + date_time.dt.year.astype(str)
 
+    obs_dict = defaultdict(list)
+    for key, ob in zip(df.DATETIME, obs.to_dict("records")):
+        obs_dict[key].append(ob)
     return uid, obs_dict
-    
+
+
+def observationLogPath(obs_dir, uid):
+    return obs_dir.joinpath(f"{uid}.jsonl")
+
+
+def latestPath(log_path):
+    """Path of the sidecar holding the latest version of every observation in a log (`<uid>.latest.json`)"""
+    return log_path.with_suffix(".latest.json")
+
+
+def saveLatest(log_path, latest):
+    """Save the latest observations (see `readLatest`) for the current version (size and modification time) of the
+    log. The sidecar is replaced in one step so an interrupted write never leaves a partial file."""
+    stat = log_path.stat()
+    latest_path = latestPath(log_path)
+    tmp_path = latest_path.with_name(f".{latest_path.name}.{os.getpid()}")
+    tmp_path.write_text(json.dumps(dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns, latest=latest), sort_keys=True))
+    tmp_path.replace(latest_path)
+
+
+def readLatest(log_path):
+    """Read the most recent version of every observation in a storm's observation log. The result is kept in a
+    sidecar (see `latestPath`) so the log itself is only read when the sidecar is missing or out of date.
+
+    Args:
+        log_path (pathlib.Path): Path to the log written by `appendObservations`
+
+    Returns:
+        dict: {"YYYYMMDDHH": {"timestamp": ..., "date_time": ..., "obs": [...]}}
+    """
+    if not log_path.exists() or log_path.stat().st_size == 0:
+        return dict()
+    stat = log_path.stat()
+    latest_path = latestPath(log_path)
+    if latest_path.exists():
+        try:
+            sidecar = json.loads(latest_path.read_text())
+            if sidecar.get("size") == stat.st_size and sidecar.get("mtime_ns") == stat.st_mtime_ns:
+                return sidecar["latest"]
+            logger.debug(f"{latest_path.name} is out of date. Rebuilding")
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Unable to read {latest_path.as_posix()}: {e}")
+
+    log = pd.read_json(log_path, lines=True, dtype=False, convert_dates=False)
+    # the most recent bdeck version wins. Later lines win ties
+    log = log.sort_values("timestamp", kind="stable").drop_duplicates("date_time", keep="last")
+    latest = {entry["date_time"]: entry for entry in log.to_dict("records")}
+    saveLatest(log_path, latest)
+    return latest
+
+
+def appendObservations(log_path, obs_dict, timestamp):
+    """Append the observations from one version of a bdeck to the storm's observation log.
+    Observations that are the same as their latest logged version are not written again.
+
+    Args:
+        log_path (pathlib.Path): Path to the storm's observation log (JSON Lines)
+        obs_dict (dict): Observations keyed by "YYYYMMDDHH" (see `parse_obs`)
+        timestamp (str): Timestamp of the bdeck version the observations came from
+
+    Returns:
+        int: number of observations appended
+    """
+    latest = readLatest(log_path)
+    entries = list()
+    for date_time, obs in sorted(obs_dict.items()):
+        if date_time in latest and latest[date_time]["obs"] == obs:
+            continue
+        entries.append(dict(timestamp=timestamp, date_time=date_time, obs=obs))
+    if len(entries) > 0:
+        with open(log_path, 'a') as log:
+            log.write("\n".join(json.dumps(entry, sort_keys=True) for entry in entries) + "\n")
+        for entry in entries:
+            # same rule as `readLatest`: an older bdeck version never replaces a newer one
+            if entry["date_time"] not in latest or latest[entry["date_time"]]["timestamp"] <= timestamp:
+                latest[entry["date_time"]] = entry
+        saveLatest(log_path, latest)
+    return len(entries)
+
+
+def migrateObservationFiles(storm_dir, log_path):
+    """Move the one-json-file-per-observation layout (`{uid}_{date_time}_{timestamp}.json`) into the storm's observation log"""
+    files = sorted(storm_dir.glob("*.json"), key=lambda f: (f.stem.split('_')[-1], f.stem.split('_')[-2]))
+    for timestamp, group in groupby(files, key=lambda f: f.stem.split('_')[-1]):
+        obs_dict = dict()
+        for f in group:
+            obs_dict[f.stem.split('_')[-2]] = json.loads(f.read_text())
+        appendObservations(log_path, obs_dict, timestamp)
+    for f in files:
+        f.unlink()
+    logger.info(f"Moved {len(files)} observation files from {storm_dir.as_posix()} to {log_path.name}")
+    if not any(storm_dir.iterdir()):
+        storm_dir.rmdir()
+
 
 if __name__ == "__main__":
     # configure logger
@@ -94,12 +191,12 @@ if __name__ == "__main__":
         logger.info(f'Processing {bdeck_file.name}')
         timestamp = bdeck_file.name.split('.')[0].split('_')[-1]
         uid, obs_dict = parse_obs(bdeck_file)
+        log_path = observationLogPath(obs_dir, uid)
+        # storms saved with the old layout have a directory with one json file per observation
         storm_dir = obs_dir.joinpath(uid)
-        storm_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Saving {len(obs_dict)} observations for {uid}")
-        for date_time, ob in obs_dict.items():
-            file_name = f"{uid}_{date_time}_{timestamp}.json"
-            with open(storm_dir.joinpath(file_name), 'w') as j:
-                json.dump(ob, j, indent=2, sort_keys=True)
+        if storm_dir.is_dir():
+            migrateObservationFiles(storm_dir, log_path)
+        appended = appendObservations(log_path, obs_dict, timestamp)
+        logger.info(f"Saved {appended} of {len(obs_dict)} observations for {uid} to {log_path.name}")
         
         
@@ -0,0 +1,101 @@
+import argparse
+import filecmp
+import os
+import requests
+from collections import Counter
+import pendulum
+from pathlib import Path
+from loguru import logger
+from tempfile import TemporaryDirectory
+
+from tcdb.pipeline import utils
+from tcdb.config import settings
+from tcdb.etl import tcvitals
+
+NOW = pendulum.now("UTC")
+timestamp = NOW.strftime("%Y%m%dT%H%M")
+
+
+def downloadLocally(url, local_path):
+
+    try:
+        response = requests.get(url)
+        response.raise_for_status()
+        with open(local_path, 'wb') as f:
+            f.write(response.content)
+    except Exception as e:
+        logger.error(e)
+        return False
+    return True
+
+
+def run(url, output_dir):
+    """Download the current TCVitals file and, if it changed since the last download, load any records that aren't in
+    the DB yet (or changed since they were loaded) and keep the file in the data lake.
+
+    Args:
+        url (str): URL of the TCVitals file
+        output_dir (pathlib.Path): Directory in the data lake where the TCVitals files are kept
+
+    Returns:
+        collections.Counter: number of records added to and updated in the DB
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with TemporaryDirectory(dir=settings.paths.temporary_dir) as tmp_dir:
+        tmp_path = Path(tmp_dir).joinpath("tcvitals")
+        logger.info("Downloading tcvitals file to check for updates")
+        if not downloadLocally(url, tmp_path):
+            return Counter()
+        if tmp_path.stat().st_size == 0:
+            logger.error(f"{url} is empty")
+            return Counter()
+        # records are de-duplicated against the DB, so the file only needs to be compared with the latest version
+        previous_versions = sorted(output_dir.glob("tcvitals_*"))
+        if len(previous_versions) > 0 and filecmp.cmp(tmp_path, previous_versions[-1], shallow=False):
+            logger.info(f"No updates for tcvitals file. Same as {previous_versions[-1].name}")
+            return Counter()
+        # only archive the file once its records are loaded, so a failed load is retried on the next run
+        counts = tcvitals.process_tcvitals(tmp_path)
+        output_path = output_dir.joinpath(f"tcvitals_{timestamp}")
+        logger.info(f"Saving updated tcvitals file to {output_path.as_posix()}")
+        tmp_path.replace(output_path)
+
+    return counts
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Download the TCVitals file and load any new records"
+    )
+    parser.add_argument(
+        "-l",
+        "--loglevel",
+        type=str,
+        default="DEBUG",
+        choices=["INFO", "DEBUG", "TRACE"],
+        help="Level to set the logger to.",
+    )
+
+    args = parser.parse_args()
+    # configure logger
+    if os.environ.get('RUN_BY_CRON', 0):
+        log_name = f"{__file__.split('/')[-1].split('.')[0]}.log"
+        level = "INFO"
+        config = utils.get_logger_config(log_name, level) 
+        logger.configure(**config)
+        logger.info("Running logging with CRONTAB configuration")
+        logger.info(f"Log level has been set to: {level}")
+    else:
+        log_name = None
+        level = args.loglevel
+        config = utils.get_logger_config(log_name, level) 
+        logger.configure(**config)
+        logger.info(f"Log level has been set to: {level}")
+
+    logger.info(f"Starting {__file__}")
+    try:
+        output_dir = Path(settings.paths.data_lake).joinpath("atcf/tcvitals")
+        run(settings.atcf.tcvitals.url, output_dir)
+    finally:
+        logger.info(f"Finished running {__file__}")
@@ -1,6 +1,7 @@
 from loguru import logger
 import numpy as np
 import datetime
+from collections import namedtuple
 
 
 def validate_pressure(x, raise_on_fail=False):
@@ -88,6 +89,134 @@ def validate_forecast_step(x, raise_on_fail=False):
             return None
 
 
+# Output of the `validate_*_array` functions. `values` is a float copy of the input with the violations replaced,
+# `invalid` flags the violations and `report` summarizes them (None when every value passed)
+ArrayValidation = namedtuple("ArrayValidation", ["values", "invalid", "report"])
+
+
+def _validate_array(x, name, lower=None, upper=None, allowed=(), raise_on_fail=False, required=True, fill=np.nan, missing=np.nan):
+    """Vectorized range check shared by the `validate_*_array` functions. NaN marks a missing value. Missing values
+    are violations when `required` is True, otherwise they are replaced with `missing`.
+    """
+    values = np.array(x, dtype=float, copy=True).ravel()
+    is_missing = np.isnan(values)
+    valid = ~is_missing
+    if lower is not None:
+        valid &= values >= lower
+    if upper is not None:
+        valid &= values <= upper
+    for value in allowed:
+        valid |= values == value
+    invalid = ~valid if required else ~valid & ~is_missing
+
+    report = None
+    if invalid.any():
+        report = f"{np.count_nonzero(invalid)} unrealistic values identified for {name}: {values[invalid][:5].tolist()}"
+        if raise_on_fail:
+            logger.error(f"Unrealistic value of {values[invalid][0]} identified for {name}")
+            raise ValueError(f"Unrealistic value of {values[invalid][0]} identified for {name}")
+        logger.trace(report)
+    values[is_missing] = missing
+    values[invalid] = fill
+    return ArrayValidation(values, invalid, report)
+
+
+def validate_pressure_array(x, raise_on_fail=False):
+    """Array version of `validate_pressure`. Missing values and unrealistic values become 1000, 0 is kept for the
+    track-only ATCF models.
+
+    Args:
+        x (numpy.ndarray | pandas.Series)
+        raise_on_fail (bool, optional): Raise a ValueError for the first unrealistic value. Defaults to False.
+
+    Returns:
+        ArrayValidation
+    """
+    return _validate_array(
+        x, "pressure", 850, 1050, allowed=(0,), raise_on_fail=raise_on_fail, required=False, fill=1000, missing=1000
+    )
+
+
+def validate_velocity_array(x, raise_on_fail=False):
+    """Array version of `validate_velocity`. Unrealistic and missing values become NaN.
+
+    Args:
+        x (numpy.ndarray | pandas.Series)
+        raise_on_fail (bool, optional): Raise a ValueError for the first unrealistic value. Defaults to False.
+
+    Returns:
+        ArrayValidation
+    """
+    return _validate_array(x, "velocity", 0, 250, raise_on_fail=raise_on_fail)
+
+
+def validate_latitude_array(x, raise_on_fail=False):
+    """Array version of `validate_latitude`. Unrealistic and missing values become NaN.
+
+    Args:
+        x (numpy.ndarray | pandas.Series)
+        raise_on_fail (bool, optional): Raise a ValueError for the first unrealistic value. Defaults to False.
+
+    Returns:
+        ArrayValidation
+    """
+    return _validate_array(x, "latitude", -90, 90, raise_on_fail=raise_on_fail)
+
+
+def validate_longitude_array(x, raise_on_fail=False):
+    """Array version of `validate_longitude`. Unrealistic and missing values become NaN.
+
+    Args:
+        x (numpy.ndarray | pandas.Series)
+        raise_on_fail (bool, optional): Raise a ValueError for the first unrealistic value. Defaults to False.
+
+    Returns:
+        ArrayValidation
+    """
+    return _validate_array(x, "longitude", -180, 180, raise_on_fail=raise_on_fail)
+
+
+def validate_distance_array(x, raise_on_fail=False, required=False):
+    """Array version of `validate_distance`. Negative values become NaN and missing values are left as NaN.
+
+    Args:
+        x (numpy.ndarray | pandas.Series)
+        raise_on_fail (bool, optional): Raise a ValueError for the first unrealistic value. Defaults to False.
+        required (bool, optional): Treat missing values as unrealistic. Defaults to False.
+
+    Returns:
+        ArrayValidation
+    """
+    return _validate_array(x, "distance", 0, raise_on_fail=raise_on_fail, required=required)
+
+
+def validate_direction_array(x, raise_on_fail=False, required=False):
+    """Array version of `validate_direction`. Values outside of [0, 360] become NaN and missing values are left as NaN.
+
+    Args:
+        x (numpy.ndarray | pandas.Series)
+        raise_on_fail (bool, optional): Raise a ValueError for the first unrealistic value. Defaults to False.
+        required (bool, optional): Treat missing values as unrealistic. Defaults to False.
+
+    Returns:
+        ArrayValidation
+    """
+    return _validate_array(x, "direction", 0, 360, raise_on_fail=raise_on_fail, required=required)
+
+
+def validate_forecast_step_array(x, raise_on_fail=False):
+    """Array version of `validate_forecast_step`. Negative and missing values become NaN.
+
+    Args:
+        x (numpy.ndarray | pandas.Series)
+        raise_on_fail (bool, optional): Raise a ValueError for the first unrealistic value. Defaults to False.
+
+    Returns:
+        ArrayValidation
+    """
+    return _validate_array(x, "forecast step", 0, raise_on_fail=raise_on_fail)
+
+
 def ensure_int_none(x, key=""):
     if isinstance(x, int) or x is None:
         return x
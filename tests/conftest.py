@@ -0,0 +1,93 @@
+import gzip
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# settings.yml has one environment per user (picked with $USER). The tests use the model settings of this one
+# when the current user doesn't have an environment.
+SETTINGS_ENV = "jmiller"
+os.environ.setdefault("ENV_FOR_DYNACONF", SETTINGS_ENV)
+
+from tcdb.config import settings
+
+if settings.get("ECMWF") is None:
+    settings.setenv(SETTINGS_ENV)
+
+DATA_DIR = Path(__file__).parent.joinpath("data")
+
+
+def _copyDeck(name, tmp_path, compress=False):
+    """Copy a deck from tests/data so sidecars (indices, caches) are written to the temporary directory"""
+    source = DATA_DIR.joinpath(name)
+    if compress:
+        path = tmp_path.joinpath(f"{name}.gz")
+        with open(source, "rb") as src, gzip.open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    else:
+        path = tmp_path.joinpath(name)
+        shutil.copyfile(source, path)
+    return path
+
+
+@pytest.fixture
+def adeck_path(tmp_path):
+    return _copyDeck("aal092022.dat", tmp_path)
+
+
+@pytest.fixture
+def bdeck_path(tmp_path):
+    return _copyDeck("bal092022.dat", tmp_path)
+
+
+@pytest.fixture(params=[False, True], ids=["dat", "gz"])
+def adeck_paths(request, tmp_path):
+    """The ADeck as a plain and as a gzipped file"""
+    return _copyDeck("aal092022.dat", tmp_path, compress=request.param)
+
+
+@pytest.fixture(params=[False, True], ids=["dat", "gz"])
+def bdeck_paths(request, tmp_path):
+    """The BDeck as a plain and as a gzipped file"""
+    return _copyDeck("bal092022.dat", tmp_path, compress=request.param)
+
+
+INIT = datetime(2022, 9, 24, 0)
+
+
+def syntrackEnsemble(seed=0, num_ens=52, model="ECMWF", track_type="raw", storm_name="IAN", annual_id=9):
+    """Synthetic tracker output: one `Syntrack` per member, moving northwest from around 14N 73W. Members start at
+    hour 0 and end between hour 54 and 120. The deterministic run is the last member.
+
+    Returns:
+        dict[int, tcdb.etl.syntracks.Syntrack]: keyed by ensemble number
+    """
+    from tcdb.etl.syntracks import Syntrack
+
+    rng = np.random.default_rng(seed)
+    tracks = dict()
+    for ens_num in range(1, num_ens + 1):
+        hour = np.arange(0, 6 * rng.integers(10, 21), 6).astype(float)
+        lat = 14 + rng.normal(0, 0.2) + np.cumsum(rng.normal(0.12, 0.05, len(hour)))
+        lon = -73 + rng.normal(0, 0.2) - np.cumsum(rng.normal(0.25, 0.05, len(hour)))
+        wind = np.clip(30 + np.cumsum(rng.normal(1.5, 2, len(hour))), 15, None)
+        mslp = 1008 - (wind - 30) * 0.8
+        tracks[ens_num] = Syntrack(
+            init=np.datetime64(INIT),
+            storm_name=storm_name,
+            annual_id=annual_id,
+            ens_num=ens_num,
+            ens_name="HRES" if ens_num == num_ens else f"ENS{ens_num:02d}",
+            hour=hour,
+            valid=np.datetime64(INIT) + hour.astype("timedelta64[h]"),
+            lat=np.round(lat, 3),
+            lon=np.round(lon, 3),
+            mslp=np.round(mslp, 3),
+            wind=np.round(wind, 3),
+            model=model,
+            track_type=track_type,
+        )
+    return tracks
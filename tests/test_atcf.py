@@ -0,0 +1,196 @@
+import gzip
+from datetime import datetime
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tcdb.etl import atcf
+
+
+# Reference implementation of the row by row decoding the parsers used before they were vectorized
+def _unevenRows(text):
+    length = max(len(line.split(",")) for line in text.split("\n"))
+    lines = list()
+    for line in text.split("\n"):
+        fields = line.split(",")
+        if len(fields) < 18:
+            continue
+        fields.extend([""] * (length - len(fields)))
+        lines.append(",".join(fields))
+    return StringIO("\n".join(lines))
+
+
+def _readText(path):
+    if path.name.endswith(".gz"):
+        with gzip.open(path, "rb") as gz:
+            return "\n".join(line.decode("utf-8") for line in gz.read().splitlines())
+    return path.read_text()
+
+
+def _decodeRows(df, numeric_columns):
+    df["DATETIME"] = pd.to_datetime(df.DATETIME, format="%Y%m%d%H")
+    df["LAT"] = df.LAT.apply(lambda x: float(x[:-1]) / 10 if x.endswith("N") else -float(x[:-1]) / 10)
+    df["LON"] = df.LON.apply(lambda x: -float(x[:-1]) / 10 if x.endswith("W") else float(x[:-1]) / 10)
+    for var in numeric_columns:
+        if df[var].dtype == object:
+            df[var] = df[var].str.strip().apply(lambda x: np.nan if x == "" else x).astype(float)
+        else:
+            df[var] = df[var].astype(float)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].str.strip()
+    return df
+
+
+def baselineADeck(path):
+    source = _unevenRows(_readText(path)) if path.name.endswith(".gz") else path
+    df = pd.read_csv(
+        source,
+        names=atcf.ADECK_COLUMNS,
+        index_col=False,
+        na_values=atcf.NA_VALUES,
+        usecols=range(0, len(atcf.ADECK_COLUMNS)),
+    )
+    return _decodeRows(df, ["VMAX", "MSLP", "NE", "SE", "SW", "NW"])
+
+
+def baselineBDeck(path):
+    df = pd.read_csv(
+        _unevenRows(_readText(path)), names=atcf.BDECK_COLUMNS, index_col=False, na_values=atcf.NA_VALUES
+    )
+    df = _decodeRows(df, ["VMAX", "MSLP", "NE", "SE", "SW", "NW", "POUTER", "ROCI", "RMW"])
+    if not isinstance(df.STORMNAME.values[-1], str):
+        df.STORMNAME = df.STORMNAME.mode().values[0]
+    return df
+
+
+def test_parse_aDeck_matches_baseline(adeck_paths):
+    pd.testing.assert_frame_equal(atcf.parse_aDeck(adeck_paths), baselineADeck(adeck_paths))
+
+
+def test_parse_bDeck_matches_baseline(bdeck_paths):
+    pd.testing.assert_frame_equal(atcf.parse_bDeck(bdeck_paths), baselineBDeck(bdeck_paths))
+
+
+def test_parse_aDeck_short_lines(adeck_path, tmp_path):
+    df = atcf.parse_aDeck(adeck_path)
+    # the 11 field XTRP/BAMD lines are kept in plain decks and dropped from gzipped decks
+    assert {"XTRP", "BAMD"} <= set(df.TECH)
+    assert np.isnan(df.loc[df.TECH == "XTRP", "NE"]).all()
+
+    gz_path = tmp_path.joinpath("aal092022_short.dat.gz")
+    with gzip.open(gz_path, "wb") as gz:
+        gz.write(adeck_path.read_bytes())
+    assert not {"XTRP", "BAMD"} & set(atcf.parse_aDeck(gz_path).TECH)
+
+
+def test_parse_blank_fields(adeck_path, bdeck_path):
+    adeck = atcf.parse_aDeck(adeck_path)
+    blank = adeck.loc[(adeck.TECH == "AVNO") & (adeck.TAU == 48)]
+    assert len(blank) > 0 and blank.MSLP.isna().all()
+    assert adeck.loc[adeck.TECH != "AVNO", "MSLP"].notna().all()
+
+    bdeck = atcf.parse_bDeck(bdeck_path)
+    observation = bdeck.loc[bdeck.DATETIME == "2022-09-24 00:00"]
+    assert observation.ROCI.isna().all() and observation.RMW.isna().all()
+    # the short BEST line is dropped
+    assert len(bdeck) == 21
+
+
+def test_decodeCoordinate():
+    lat = pd.Series(["133N", " 52S", "0N", "133N"], dtype=object)
+    np.testing.assert_array_equal(atcf.decodeCoordinate(lat), [13.3, -5.2, 0.0, 13.3])
+    lon = pd.Series(["718W", "1795E", "718W"], dtype=object)
+    np.testing.assert_array_equal(atcf.decodeCoordinate(lon, positive=None, negative="W"), [-71.8, 179.5, -71.8])
+
+
+def test_decodeNumeric():
+    col = pd.Series([" 35", "   ", "1002", np.nan], dtype=object)
+    np.testing.assert_array_equal(atcf.decodeNumeric(col), [35.0, np.nan, 1002.0, np.nan])
+    np.testing.assert_array_equal(atcf.decodeNumeric(pd.Series([1, 2])), [1.0, 2.0])
+
+
+def test_parse_lines_shorter_than_columns(adeck_path, bdeck_path):
+    # every selected line is shorter than the deck columns
+    xtrp = atcf.parse_aDeck(adeck_path, models=["XTRP"])
+    assert list(xtrp.columns) == atcf.ADECK_COLUMNS
+    assert len(xtrp) == 33 and xtrp.RAD.isna().all()
+
+    bdeck = atcf.parse_bDeck(bdeck_path, date_time=datetime(2022, 9, 26, 6))
+    assert list(bdeck.columns) == atcf.BDECK_COLUMNS
+    assert len(bdeck) == 3 and bdeck.userdata.isna().all()
+
+
+def _assertEnginesMatch(c_df, arrow_df, columns):
+    assert len(c_df) == len(arrow_df)
+    for name in columns:
+        if c_df[name].dtype == object:
+            assert list(c_df[name]) == list(arrow_df[name].astype(object)), name
+        else:
+            np.testing.assert_array_equal(c_df[name].to_numpy(), arrow_df[name].to_numpy(dtype=c_df[name].dtype), err_msg=name)
+
+
+ENGINE_COLUMNS = ["BASIN", "DATETIME", "TECH", "LAT", "LON", "VMAX", "MSLP", "NE", "SE", "SW", "NW"]
+
+
+def test_arrow_engine_aDeck(adeck_paths):
+    pytest.importorskip("pyarrow")
+    _assertEnginesMatch(
+        atcf.parse_aDeck(adeck_paths), atcf.parse_aDeck(adeck_paths, engine="arrow"), ENGINE_COLUMNS + ["TAU"]
+    )
+
+
+def test_arrow_engine_bDeck(bdeck_paths):
+    pytest.importorskip("pyarrow")
+    _assertEnginesMatch(
+        atcf.parse_bDeck(bdeck_paths),
+        atcf.parse_bDeck(bdeck_paths, engine="arrow"),
+        ENGINE_COLUMNS + ["POUTER", "ROCI", "RMW", "STORMNAME"],
+    )
+
+
+def test_arrow_engine_free_form_fields(bdeck_path):
+    pytest.importorskip("pyarrow")
+    lines = bdeck_path.read_text().splitlines(keepends=True)
+    # text in the GUSTS, EYE and DIR fields
+    lines[-1] = lines[-1].replace(" 100,  15,", " N/A,  XX,").replace(" 291,", "  NW,")
+    bdeck_path.write_text("".join(lines))
+    c_df = atcf.parse_bDeck(bdeck_path)
+    arrow_df = atcf.parse_bDeck(bdeck_path, engine="arrow")
+    assert c_df.GUSTS.iloc[-1] == "N/A"
+    assert arrow_df[["GUSTS", "EYE", "DIR"]].iloc[-1].isna().all()
+    assert arrow_df.GUSTS.iloc[-2] == 100 and arrow_df.DIR.iloc[-2] == 291
+    _assertEnginesMatch(c_df, arrow_df, ["DATETIME", "LAT", "LON", "VMAX", "MSLP", "RMW", "STORMNAME"])
+
+
+@pytest.mark.parametrize("buffer_lines", [0, 10000])
+def test_iter_aDeck_forecasts_matches_parse_aDeck(adeck_paths, buffer_lines):
+    forecasts = list(atcf.iter_aDeck_forecasts(adeck_paths, buffer_lines=buffer_lines))
+    df = atcf.parse_aDeck(adeck_paths)
+    assert [(f.datetime, f.tech) for f in forecasts] == list(df[["DATETIME", "TECH"]].drop_duplicates().itertuples(index=False, name=None))
+    streamed = pd.concat([f.rows for f in forecasts], ignore_index=True)
+    pd.testing.assert_frame_equal(streamed, df, check_dtype=False)
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_iter_aDeck_forecasts_filters(adeck_paths, use_index):
+    kwargs = dict(models=["OFCL", "HWRF"], since=datetime(2022, 9, 24, 6), max_tau=48)
+    forecasts = list(atcf.iter_aDeck_forecasts(adeck_paths, use_index=use_index, **kwargs))
+    expected = atcf.parse_aDeck(adeck_paths, **kwargs)
+    pd.testing.assert_frame_equal(pd.concat([f.rows for f in forecasts], ignore_index=True), expected, check_dtype=False)
+
+    keys = {("2022092412", "OFCL")}
+    (forecast,) = atcf.iter_aDeck_forecasts(adeck_paths, keys=keys, use_index=use_index)
+    assert (forecast.datetime, forecast.tech) == (pd.Timestamp("2022-09-24 12:00"), "OFCL")
+
+
+def test_parse_aDeck_predicates(adeck_paths):
+    df = atcf.parse_aDeck(adeck_paths)
+    since, until = datetime(2022, 9, 24, 6), datetime(2022, 9, 24, 12)
+    filtered = atcf.parse_aDeck(adeck_paths, models=["AVNO", "CARQ"], since=since, until=until, max_tau=24)
+    expected = df[df.TECH.isin(["AVNO", "CARQ"]) & df.DATETIME.between(since, until) & (df.TAU <= 24)]
+    assert (filtered.TAU < 0).any()
+    pd.testing.assert_frame_equal(filtered, expected.reset_index(drop=True), check_dtype=False)
+    assert atcf.parse_aDeck(adeck_paths, models=["NONE"]).empty
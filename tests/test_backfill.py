@@ -0,0 +1,70 @@
+import json
+import shutil
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+from tcdb.etl import backfill_storms
+from conftest import DATA_DIR
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    """A season with two storms: AL09 with its ADeck and AL10 (a copy of AL09 starting a day later) without one"""
+    shutil.copyfile(DATA_DIR.joinpath("bal092022.dat"), tmp_path.joinpath("bal092022.dat"))
+    shutil.copyfile(DATA_DIR.joinpath("aal092022.dat"), tmp_path.joinpath("aal092022.dat"))
+    lines = DATA_DIR.joinpath("bal092022.dat").read_text().replace("AL, 09,", "AL, 10,").splitlines(keepends=True)
+    tmp_path.joinpath("bal102022.dat").write_text("".join(lines[6:]))
+    return tmp_path
+
+
+def test_parseArchiveStorm(archive_dir):
+    archive_storm = backfill_storms.parseArchiveStorm(
+        archive_dir.joinpath("bal092022.dat"), archive_dir.joinpath("aal092022.dat"), models=["OFCL", "AVNO"]
+    )
+    assert archive_storm.storm["nhc_id"] == "AL092022"
+    assert len(archive_storm.observations["datetime_utc"]) == 12
+    assert sorted({tech for _, tech in archive_storm.forecasts}) == ["AVNO", "OFCL"]
+    assert len(archive_storm.forecasts) == 6
+    assert archive_storm.steps["forecast"].max() == 5
+
+
+def test_parseArchiveStorm_bad_adeck(archive_dir):
+    adeck_path = archive_dir.joinpath("aal092022.dat")
+    lines = adeck_path.read_text().splitlines(keepends=True)
+    row = next(i for i, line in enumerate(lines) if "OFCL" in line)
+    lines[row] = lines[row].replace("2022092400", "20220924XX")
+    adeck_path.write_text("".join(lines))
+    archive_storm = backfill_storms.parseArchiveStorm(archive_dir.joinpath("bal092022.dat"), adeck_path, models=["OFCL"])
+    # the storm and its observations are kept without forecasts
+    assert archive_storm.storm["nhc_id"] == "AL092022"
+    assert archive_storm.forecasts == []
+    assert len(archive_storm.observations["datetime_utc"]) == 12
+
+
+def test_process_archive_data_commits_each_storm(archive_dir, monkeypatch):
+    loaded = list()
+
+    def loadArchiveSeason(session, archive_storms):
+        (archive_storm,) = archive_storms
+        if archive_storm.bdeck == "bal102022.dat":
+            raise RuntimeError("constraint error")
+        loaded.append(archive_storm.bdeck)
+        return Counter(observations=len(archive_storm.observations["datetime_utc"]))
+
+    monkeypatch.setattr(backfill_storms, "settings", SimpleNamespace(db=dict()))
+    monkeypatch.setattr(backfill_storms, "create_engine", lambda url: create_engine("sqlite://"))
+    monkeypatch.setattr(backfill_storms, "loadArchiveSeason", loadArchiveSeason)
+    state_path = archive_dir.joinpath(".backfill_state.json")
+    counts = backfill_storms.process_archive_data(archive_dir, models=["OFCL"], workers=1)
+
+    assert loaded == ["bal092022.dat"]
+    assert counts["observations"] == 12
+    # the storm that failed isn't recorded, so the next run retries it
+    assert json.loads(state_path.read_text())["completed"] == ["bal092022.dat"]
+
+    loaded.clear()
+    backfill_storms.process_archive_data(archive_dir, models=["OFCL"], workers=1)
+    assert loaded == []
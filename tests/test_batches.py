@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from tcdb.etl import atcf
+
+
+def _assertDictsEqual(dicts, expected):
+    assert len(dicts) == len(expected)
+    for d, e in zip(dicts, expected):
+        assert d.keys() == e.keys()
+        for key in e:
+            if isinstance(e[key], float) and np.isnan(e[key]):
+                assert d[key] is None or np.isnan(d[key]), key
+            else:
+                assert d[key] == e[key], key
+
+
+def test_observationBatch_matches_observationDictFromRecords(bdeck_paths):
+    records = atcf.BDeckRecords.from_deck(bdeck_paths)
+    expected = [atcf.observationDictFromRecords(ob, storm_id=7) for ob in records.observations()]
+    _assertDictsEqual(atcf.observationDictsFromRecords(records, storm_id=7), expected)
+    _assertDictsEqual(atcf.observationDictsFromRecords(atcf.parse_bDeck(bdeck_paths), storm_id=7), expected)
+
+
+def test_observationBatch_invalid(bdeck_path):
+    df = atcf.parse_bDeck(bdeck_path)
+    df.loc[df.DATETIME == "2022-09-24 12:00", "MSLP"] = 400
+    df.loc[df.DATETIME == "2022-09-24 18:00", "ROCI"] = -10
+    records = atcf.BDeckRecords.from_frame(df)
+    # unrealistic pressures are replaced and unrealistic distances dropped, like the scalar validators
+    dicts = atcf.observationDictsFromRecords(records)
+    _assertDictsEqual(dicts, [atcf.observationDictFromRecords(ob) for ob in records.observations()])
+    by_time = {str(d["datetime_utc"]): d for d in dicts}
+    assert by_time["2022-09-24 12:00:00"]["mslp_mb"] == 1000 and by_time["2022-09-24 18:00:00"]["router_nmi"] is None
+
+    df.loc[df.DATETIME == "2022-09-25 00:00", "LAT"] = 95
+    with pytest.raises(ValueError):
+        atcf.observationBatch(df)
+
+
+def test_stepBatch_matches_stepFromDataFrame(adeck_paths):
+    for forecast in atcf.iter_aDeck_forecasts(adeck_paths, models=["OFCL", "AVNO", "HWRF"]):
+        df = forecast.rows
+        expected = [atcf.stepFromDataFrame(df[df.TAU == hour], hour, 3) for hour in sorted(df.TAU.unique())]
+        _assertDictsEqual(atcf.stepDictsFromDataFrame(df, 3), expected)
+
+
+def test_stepBatch_invalid(adeck_path):
+    (forecast,) = atcf.iter_aDeck_forecasts(adeck_path, models=["OFCL"], keys={("2022092400", "OFCL")})
+    df = forecast.rows.copy()
+    df.loc[df.TAU == 24, "MSLP"] = 1200
+    steps = atcf.stepDictsFromDataFrame(df, 3)
+    assert [step["mslp_mb"] for step in steps if step["hour"] == 24] == [1000]
+    df.loc[df.TAU == 48, "VMAX"] = 500
+    with pytest.raises(ValueError):
+        atcf.stepBatch(df)
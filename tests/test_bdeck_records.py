@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tcdb.etl import atcf
+
+
+def _rewriteDeck(path, lines):
+    path.write_text("".join(lines))
+    return path
+
+
+def test_from_frame(bdeck_path):
+    df = atcf.parse_bDeck(bdeck_path)
+    records = atcf.BDeckRecords.from_frame(df)
+    assert len(records) == len(df)
+    for name in atcf.BDeckRecords.DTYPE.names:
+        expected = df[name].to_numpy()
+        if name in atcf.BDeckRecords.CATEGORICAL:
+            np.testing.assert_array_equal(records.column(name), expected)
+        else:
+            np.testing.assert_array_equal(records.column(name), expected.astype(records.data[name].dtype))
+
+
+def test_from_frame_missing_snum(bdeck_path):
+    df = atcf.parse_bDeck(bdeck_path)
+    df["SNUM"] = df.SNUM.astype(float)
+    df.loc[3, "SNUM"] = np.nan
+    with pytest.raises(ValueError):
+        atcf.BDeckRecords.from_frame(df)
+
+
+def test_observations_and_at(bdeck_path):
+    records = atcf.BDeckRecords.from_deck(bdeck_path)
+    observations = list(records.observations())
+    assert len(observations) == 12
+    assert [len(ob) for ob in observations[-3:]] == [3, 3, 3]
+    times = [pd.Timestamp(ob.data["DATETIME"][0]) for ob in observations]
+    assert times == sorted(times)
+
+    selected = records.at([pd.Timestamp("2022-09-26 00:00").to_pydatetime()])
+    assert len(selected) == 3 and set(selected.data["RAD"]) == {34, 50, 64}
+    assert selected.radialValues(64) == dict(NE=20, SE=0, SW=0, NW=0)
+
+
+def test_toStormDict(bdeck_path):
+    storm = atcf.toStormDict(bdeck_path)
+    assert storm["name"] == "HU-Ian"
+    assert storm["nhc_id"] == "AL092022"
+    assert storm["nhc_number"] == 9 and storm["season"] == 2022
+    assert storm["start_date"] == pd.Timestamp("2022-09-23 18:00")
+    assert storm["end_date"] == pd.Timestamp("2022-09-26 12:00")
+    assert (storm["start_lat"], storm["start_lon"]) == (13.6, -72.3)
+
+
+def test_toStormDict_blank_vmax(bdeck_path):
+    # only the tropical storm part of the track, with one blank VMAX
+    lines = bdeck_path.read_text().splitlines(keepends=True)[:6]
+    lines[2] = lines[2].replace(",  35, 1004,", ",    , 1004,")
+    assert atcf.toStormDict(_rewriteDeck(bdeck_path, lines))["name"] == "TS-Ian"
+
+    lines = [",".join(fields[:8] + ["    "] + fields[9:]) for fields in (line.split(",") for line in lines)]
+    with pytest.raises(ValueError):
+        atcf.toStormDict(_rewriteDeck(bdeck_path, lines))
+
+
+def test_load_bDeck(bdeck_path):
+    deck = atcf.load_bDeck(bdeck_path)
+    assert dict(deck.storm) == atcf.toStormDict(bdeck_path)
+    with pytest.raises(TypeError):
+        deck.storm["name"] = "TS-Ian"
+    with pytest.raises(ValueError):
+        deck.records.data["VMAX"][0] = 0
+    changed = deck.records.at([pd.Timestamp("2022-09-26 06:00").to_pydatetime()])
+    expected = atcf.BDeckRecords.from_frame(atcf.parse_bDeck(bdeck_path, date_time=pd.Timestamp("2022-09-26 06:00")))
+    for name in atcf.BDeckRecords.DTYPE.names:
+        np.testing.assert_array_equal(changed.column(name), expected.column(name))
+
+
+def test_load_bDecks_skips_bad_files(bdeck_path, tmp_path):
+    bad_path = tmp_path.joinpath("bal102022.dat")
+    bad_path.write_text("AL, 10, 2022092400,   , BEST,   0, bad,  bad,  35, 1005, TS,  34, NEQ,   0,   0,   0,   0, 1010,\n")
+    decks = atcf.load_bDecks([bad_path, bdeck_path])
+    assert list(decks) == [bdeck_path.name]
@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+
+from tcdb.etl import atcf
+
+
+def test_cached_parse_round_trip(bdeck_path, tmp_path):
+    cache_dir = tmp_path.joinpath("cache")
+    first = atcf.cached_parse(atcf.parse_bDeck, bdeck_path, cache_dir=cache_dir, max_size=100)
+    cache_path = atcf.deckCachePath(bdeck_path, atcf.parse_bDeck, cache_dir=cache_dir)
+    assert cache_path.exists()
+    pd.testing.assert_frame_equal(atcf.cached_parse(atcf.parse_bDeck, bdeck_path, cache_dir=cache_dir), first)
+
+
+def test_cached_parse_unwritable_cache(bdeck_path, tmp_path):
+    # a file where the cache directory should be
+    cache_dir = tmp_path.joinpath("cache")
+    cache_dir.write_text("")
+    df = atcf.cached_parse(atcf.parse_bDeck, bdeck_path, cache_dir=cache_dir, max_size=100)
+    pd.testing.assert_frame_equal(df, atcf.parse_bDeck(bdeck_path))
+
+
+def test_cached_parse_corrupt_entry(bdeck_path, tmp_path):
+    cache_dir = tmp_path.joinpath("cache")
+    cache_dir.mkdir()
+    atcf.deckCachePath(bdeck_path, atcf.parse_bDeck, cache_dir=cache_dir).write_bytes(b"not parquet")
+    df = atcf.cached_parse(atcf.parse_bDeck, bdeck_path, cache_dir=cache_dir, max_size=100)
+    pd.testing.assert_frame_equal(df, atcf.parse_bDeck(bdeck_path))
+    # the entry is rewritten
+    pd.testing.assert_frame_equal(atcf.cached_parse(atcf.parse_bDeck, bdeck_path, cache_dir=cache_dir), df)
+
+
+def test_cached_parse_failed_write(bdeck_path, tmp_path, monkeypatch):
+    cache_dir = tmp_path.joinpath("cache")
+
+    def failingWrite(self, path, **kwargs):
+        open(path, "wb").close()
+        raise TypeError("unsupported column")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", failingWrite)
+    df = atcf.cached_parse(atcf.parse_bDeck, bdeck_path, cache_dir=cache_dir, max_size=100)
+    pd.testing.assert_frame_equal(df, atcf.parse_bDeck(bdeck_path))
+    # the temporary file is removed
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_evictDeckCache(tmp_path):
+    for i in range(3):
+        entry = tmp_path.joinpath(f"{i}.parquet")
+        entry.write_bytes(b"0" * 1024**2)
+        os.utime(entry, ns=(i * 10**9, i * 10**9))
+    assert atcf.evictDeckCache(tmp_path, 2) == 1
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["1.parquet", "2.parquet"]
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pandas as pd
+
+from tcdb.etl import atcf
+
+
+def test_deckRanges(adeck_paths):
+    index = atcf.deck_index(adeck_paths)
+    ofcl = atcf.parse_aDeck(adeck_paths, models=["OFCL"])
+    lines = list(atcf.iterDeckLines(adeck_paths, atcf.deckRanges(index, techs=lambda tech: tech == "OFCL")))
+    assert len(lines) == len(ofcl) and all(line.split(",")[4].strip() == "OFCL" for line in lines)
+
+    lines = list(atcf.iterDeckLines(adeck_paths, atcf.deckRanges(index, keys={("2022092406", "OFCL")})))
+    assert len(lines) == (ofcl.DATETIME == "2022-09-24 06:00").sum()
+    assert {line.split(",")[2].strip() for line in lines} == {"2022092406"}
+
+    # ranged parsing gives the same rows as filtering the full parse
+    ranges = atcf.deckRanges(index, dates=lambda date_str: date_str >= "2022092406")
+    pd.testing.assert_frame_equal(
+        atcf.read_deck(adeck_paths, atcf.ADECK_COLUMNS, ranges=ranges),
+        atcf.read_deck(adeck_paths, atcf.ADECK_COLUMNS).query("DATETIME >= 2022092406").reset_index(drop=True),
+    )
+
+
+def test_deck_index_sidecar(bdeck_path):
+    index_path = atcf.deckIndexPath(bdeck_path)
+    index = atcf.deck_index(bdeck_path)
+    assert not index_path.exists()
+
+    assert atcf.contains_date(bdeck_path, datetime(2022, 9, 26, 6))
+    assert not atcf.contains_date(bdeck_path, "2022092618")
+    # the index is saved by the first lookup and reused
+    assert index_path.exists()
+    saved = index_path.stat().st_mtime_ns
+    assert atcf.contains_date(bdeck_path, "2022092318")
+    assert index_path.stat().st_mtime_ns == saved
+    pd.testing.assert_frame_equal(atcf.deck_index(bdeck_path), index, check_dtype=False)
+
+    # a stale sidecar is rebuilt
+    with open(bdeck_path, "a") as deck:
+        deck.write("AL, 09, 2022092618,   , BEST,   0, 255N,  830W, 100,  960, HU,  34, NEQ,  120,  100,   70,   90, 1008,\n")
+    assert atcf.contains_date(bdeck_path, "2022092618")
+
+
+def test_changed_keys(adeck_path, tmp_path):
+    previous_path = tmp_path.joinpath("previous.dat")
+    previous_path.write_bytes(adeck_path.read_bytes())
+    assert atcf.changed_keys(adeck_path, previous_path) == set()
+
+    lines = adeck_path.read_text().splitlines(keepends=True)
+    # a rewritten HWRF line and an appended BAMD forecast
+    row = next(i for i, line in enumerate(lines) if line.startswith("AL, 09, 2022092406, 03, HWRF,   0,"))
+    lines[row] = lines[row].replace(",  36, 1005,", ",  36, 1004,")
+    lines.append(lines[-1].replace("2022092412", "2022092418"))
+    adeck_path.write_text("".join(lines))
+    assert atcf.changed_keys(adeck_path, previous_path) == {("2022092406", "HWRF"), ("2022092418", "BAMD")}
+
+
+def test_incremental_parse(adeck_path, bdeck_path, tmp_path):
+    # the previous ADeck doesn't have the 12Z forecasts yet
+    previous_adeck = tmp_path.joinpath("previous_a.dat")
+    lines = adeck_path.read_text().splitlines(keepends=True)
+    previous_adeck.write_text("".join(line for line in lines if ", 2022092412," not in line))
+    changed = atcf.changed_keys(adeck_path, previous_adeck)
+    assert {date_str for date_str, _ in changed} == {"2022092412"}
+    forecasts = list(atcf.iter_aDeck_forecasts(adeck_path, keys=changed, use_index=True))
+    assert {(f.datetime.strftime("%Y%m%d%H"), f.tech) for f in forecasts} == changed
+    full = atcf.parse_aDeck(adeck_path)
+    assert sum(len(f.rows) for f in forecasts) == (full.DATETIME == "2022-09-24 12:00").sum()
+
+    # the previous BDeck ends a cycle earlier and had a different MSLP at 00Z on the 25th
+    previous_bdeck = tmp_path.joinpath("previous_b.dat")
+    lines = bdeck_path.read_text().splitlines(keepends=True)
+    lines = [line.replace(", 1000, TS,", ", 1001, TS,") if ", 2022092500," in line else line for line in lines]
+    previous_bdeck.write_text("".join(lines[:-3]))
+    changed = atcf.changed_keys(bdeck_path, previous_bdeck)
+    dates = sorted({datetime.strptime(date_str, "%Y%m%d%H") for date_str, _ in changed})
+    assert dates == [datetime(2022, 9, 25, 0), datetime(2022, 9, 26, 12)]
+    df = atcf.parse_bDeck(bdeck_path, date_time=dates)
+    full = atcf.parse_bDeck(bdeck_path)
+    # free-form columns like DIR are typed from the rows that were read, so only the decoded columns are compared
+    columns = ["DATETIME", "LAT", "LON", "VMAX", "MSLP", "RAD", "NE", "SE", "SW", "NW", "STORMNAME"]
+    expected = full.loc[full.DATETIME.isin(dates), columns].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df[columns], expected, check_dtype=False)
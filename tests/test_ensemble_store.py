@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+pytest.importorskip("zarr")
+
+from tcdb.datasets import EnsembleStore
+from tcdb.etl import syntracks
+from conftest import INIT, syntrackEnsemble
+
+
+def _run(seed, hours=0, **kwargs):
+    ensemble = syntracks.EnsembleTracks.from_syntracks(syntrackEnsemble(seed=seed, num_ens=52, **kwargs))
+    ensemble.init = INIT + timedelta(hours=hours)
+    return ensemble
+
+
+def _assertRunEqual(ds, ensemble):
+    run = ds.sel(init=np.datetime64(ensemble.init, "ns"))
+    for name in ["hour", "lat", "lon", "wind", "mslp"]:
+        np.testing.assert_array_equal(run[name].values, getattr(ensemble, name), err_msg=name)
+    assert run.annual_id.item() == ensemble.annual_id
+
+
+def test_append_and_open(tmp_path):
+    store = EnsembleStore(tmp_path)
+    runs = [_run(0, 12), _run(1, 0), _run(2, 6)]
+    for ensemble in runs:
+        store.append(ensemble, "al092022")
+    assert store.storms("ECMWF") == ["AL092022"]
+    assert store.storms("ECMWF", track_type="calibrated") == []
+
+    ds = store.open("ECMWF", "AL092022")
+    # runs added out of order come back sorted
+    assert list(ds.init.values) == [np.datetime64(INIT + timedelta(hours=h), "ns") for h in (0, 6, 12)]
+    assert ds.attrs["TrackType"] == "raw"
+    for ensemble in runs:
+        _assertRunEqual(ds, ensemble)
+
+    # a run that is already in the store is replaced
+    replacement = _run(3, 6)
+    store.append(replacement, "AL092022")
+    ds = store.open("ECMWF", "AL092022")
+    assert ds.sizes["init"] == 3
+    _assertRunEqual(ds, replacement)
+
+    # track types are kept apart
+    store.append(_run(4, 0, track_type="calibrated"), "AL092022")
+    assert store.open("ECMWF", "AL092022").sizes["init"] == 3
+    assert store.open("ECMWF", "AL092022", track_type="calibrated").sizes["init"] == 1
+
+
+def test_append_different_grid(tmp_path):
+    store = EnsembleStore(tmp_path)
+    store.append(_run(0), "AL092022")
+    ensemble = syntracks.EnsembleTracks.from_syntracks(syntrackEnsemble(num_ens=52), periods=10)
+    ensemble.init = INIT + timedelta(hours=6)
+    with pytest.raises(ValueError):
+        store.append(ensemble, "AL092022")
+    with pytest.raises(FileNotFoundError):
+        store.open("NCEP", "AL092022")
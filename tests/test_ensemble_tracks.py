@@ -0,0 +1,61 @@
+import numpy as np
+
+from tcdb.etl import syntracks
+from conftest import syntrackEnsemble
+
+FIELDS = ["hour", "valid", "lat", "lon", "wind", "mslp"]
+
+
+def _assertTracksEqual(track, expected):
+    for name in FIELDS:
+        np.testing.assert_array_equal(track[name], expected[name], err_msg=name)
+    for name in ["init", "storm_name", "annual_id", "ens_num", "ens_name", "model", "track_type"]:
+        assert track[name] == expected[name], name
+
+
+def test_syntracks_round_trip():
+    tracks = syntrackEnsemble(num_ens=52)
+    tracks[7] = syntracks.Syntrack(ens_num=7, ens_name="ENS07")
+    ensemble = syntracks.EnsembleTracks.from_syntracks(tracks)
+    assert ensemble.num_ens == 52 and ensemble.empty.tolist() == [ens_num == 7 for ens_num in range(1, 53)]
+    assert (ensemble.storm_name, ensemble.annual_id, ensemble.track_type) == ("IAN", 9, "raw")
+
+    members = ensemble.to_syntracks()
+    assert members[7].empty()
+    for ens_num, track in tracks.items():
+        if ens_num != 7:
+            _assertTracksEqual(members[ens_num], track)
+
+
+def test_xarray_round_trip():
+    tracks = syntrackEnsemble(num_ens=52, track_type="calibrated")
+    ensemble = syntracks.EnsembleTracks.from_syntracks(tracks)
+    ds = syntracks.to_xarray(tracks)
+    assert ds.attrs["TrackType"] == "calibrated"
+    restored = syntracks.EnsembleTracks.from_xarray(ds)
+    for ens_num, track in restored.to_syntracks().items():
+        _assertTracksEqual(track, tracks[ens_num])
+
+
+def test_to_xarray_places_steps_by_hour():
+    tracks = syntrackEnsemble(num_ens=52)
+    # a member with a gap at hours 12 and 18
+    track = tracks[3]
+    keep = (track.hour != 12) & (track.hour != 18)
+    for name in FIELDS:
+        setattr(track, name, track[name][keep])
+    ds = syntracks.to_xarray(tracks)
+    for ens_num, track in tracks.items():
+        row = ds.sel(ensemble=ens_num)
+        np.testing.assert_array_equal(row.lat.sel(step=track.hour).values, track.lat)
+        np.testing.assert_array_equal(row.valid_time.sel(step=track.hour).values, track.valid)
+        assert np.isnan(row.lat.values[len(track.hour) + (2 if ens_num == 3 else 0) :]).all()
+    assert np.isnan(ds.lat.sel(ensemble=3, step=[12, 18]).values).all()
+    assert list(ds.ensemble_name.values) == [tracks[ens_num].ens_name for ens_num in range(1, 53)]
+
+
+def test_from_syntracks_drops_off_grid_steps():
+    tracks = syntrackEnsemble(num_ens=52)
+    tracks[1].hour = tracks[1].hour + 3
+    ensemble = syntracks.EnsembleTracks.from_syntracks(tracks)
+    assert ensemble.empty[0] and not ensemble.empty[1:].any()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from tcdb import geo
+from tcdb.utils import greatCircleDistance
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    return rng.uniform(-60, 60, 200), rng.uniform(-180, 180, 200), rng.uniform(-60, 60, 200), rng.uniform(-180, 180, 200)
+
+
+@pytest.mark.parametrize("units", list(geo.DEGREE_LENGTH))
+def test_distance_matches_greatCircleDistance(points, units):
+    lat1, lon1, lat2, lon2 = points
+    np.testing.assert_allclose(
+        geo.distance(lat1, lon1, lat2, lon2, units=units), greatCircleDistance(lat1, lon1, lat2, lon2, units=units)
+    )
+    assert geo.distance(lat1[0], lon1[0], lat2[0], lon2[0], units=units) == pytest.approx(
+        greatCircleDistance(lat1[0], lon1[0], lat2[0], lon2[0], units=units)
+    )
+
+
+def test_distance_units():
+    with pytest.raises(ValueError):
+        geo.distance(0, 0, 1, 1, units="furlongs")
+
+
+def test_distanceMatrix(points):
+    lat1, lon1, lat2, lon2 = points
+    expected = geo.distance(lat1[:, None], lon1[:, None], lat2[None, :50], lon2[None, :50])
+    np.testing.assert_allclose(geo.distanceMatrix(lat1, lon1, lat2[:50], lon2[:50], block_size=128), expected)
+
+
+def test_destinationPoint_round_trip(points):
+    lat1, lon1, lat2, lon2 = points
+    lat, lon = geo.destinationPoint(
+        lat1, lon1, geo.initialBearing(lat1, lon1, lat2, lon2), geo.distance(lat1, lon1, lat2, lon2)
+    )
+    np.testing.assert_allclose(geo.distance(lat, lon, lat2, lon2), 0, atol=1e-6)
+
+
+def test_alongTrackDistance():
+    lat = np.array([[10.0, 11.0, np.nan, 12.0, 13.0]])
+    lon = np.array([[-60.0, -61.0, np.nan, -62.0, -63.0]])
+    total = geo.alongTrackDistance(lat, lon)
+    first = greatCircleDistance(10.0, -60.0, 11.0, -61.0)
+    last = greatCircleDistance(12.0, -62.0, 13.0, -63.0)
+    np.testing.assert_allclose(total[0, [0, 1, 3, 4]], [0, first, first, first + last])
+    assert np.isnan(total[0, 2])
+
+
+def test_discCoverage_matches_brute_force():
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(10, 30, 40), rng.uniform(170, 190, 40)
+    lon = (lon + 180) % 360 - 180
+    group = rng.integers(0, 5, 40)
+    grid_lat, grid_lon = np.arange(5, 35.1, 0.5), np.arange(160, 200.1, 0.5)
+    counts = geo.discCoverage(lat, lon, group, grid_lat, grid_lon, 120)
+
+    dist = geo.distance(lat[:, None, None], lon[:, None, None], grid_lat[None, :, None], grid_lon[None, None, :])
+    expected = sum((dist[group == g] <= 120).any(axis=0) for g in range(5))
+    # cells right on the edge of a disc can go either way
+    edge = np.abs(dist - 120).min(axis=0) < 1e-6
+    np.testing.assert_array_equal(counts[~edge], expected[~edge])
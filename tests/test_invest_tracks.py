@@ -0,0 +1,93 @@
+import copy
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from tcdb.etl import syntracks
+from tcdb.utils import greatCircleDistance
+from conftest import INIT, syntrackEnsemble
+
+Invest = namedtuple("Invest", ["name", "annual_id", "valid", "lat", "lon"])
+INVESTS = [
+    Invest("INVEST90", 90, np.datetime64(INIT), 14.0, -73.0),
+    Invest("INVEST91", 91, np.datetime64(INIT), 25.0, -60.0),
+]
+
+
+def _moved(track, annual_id, dlat=0.0, dlon=0.0, hours=None, delay=0):
+    track = copy.deepcopy(track)
+    track.annual_id = annual_id
+    track.lat, track.lon = track.lat + dlat, track.lon + dlon
+    if hours is not None:
+        for name in ["hour", "valid", "lat", "lon", "wind", "mslp"]:
+            setattr(track, name, track[name][:hours])
+    track.valid = track.valid + np.timedelta64(delay, "h")
+    return track
+
+
+def _modelRun():
+    ensemble = syntrackEnsemble(num_ens=52)
+    tracks = [_moved(track, 90) for track in ensemble.values()]
+    for ens_num in [3, 4]:
+        tracks[ens_num - 1].annual_id = 0
+    # member 5's only track is near INVEST91
+    tracks[4] = _moved(ensemble[5], 0, dlat=11, dlon=13)
+    tracks += [
+        # a second unassigned track for member 3, longer but far from both invests
+        _moved(ensemble[3], 0, dlat=20),
+        # a shorter unassigned track for member 4 that also passes
+        _moved(ensemble[4], 0, hours=3),
+        # a track for member 6 near INVEST91 that starts too late
+        _moved(ensemble[6], 0, dlat=11, dlon=13, delay=48),
+        # the tracker found INVEST91 in member 50
+        _moved(ensemble[50], 91, dlat=11, dlon=13),
+    ]
+    return tracks
+
+
+def _reference(tracks, invests, dist_threshold=310, time_threshold=1.5):
+    """Invests take turns claiming the longest passing unassigned track of every member they don't have"""
+    expected = dict()
+    for inv in invests:
+        have = {t.ens_num for t in tracks if t.annual_id == inv.annual_id}
+        expected[inv.annual_id] = dict()
+        for ens_num in sorted({t.ens_num for t in tracks} - have):
+            passing = [
+                t for t in tracks
+                if t.ens_num == ens_num and t.annual_id == 0
+                and t.valid[0] - inv.valid < pd.Timedelta(days=time_threshold).to_timedelta64()
+                and greatCircleDistance(t.lat[0], t.lon[0], inv.lat, inv.lon) <= dist_threshold
+            ]
+            if passing:
+                track = max(passing, key=lambda t: len(t.hour))
+                track.annual_id = inv.annual_id
+                expected[inv.annual_id][ens_num] = track
+    return expected
+
+
+def _summary(track):
+    return (track.ens_num, track.annual_id, len(track.hour), float(track.lat[0]), float(track.lon[0]))
+
+
+def test_parseInvestTracks_matches_sequential_matching():
+    tracks = _modelRun()
+    expected = _reference(copy.deepcopy(tracks), INVESTS)
+    assert sorted(expected[90]) == [3, 4] and sorted(expected[91]) == [5]
+
+    system_tracks = syntracks.parseInvestTracks(tracks, INVESTS, ens_mean=False)
+    for inv in INVESTS:
+        members = system_tracks[inv.annual_id]
+        assert sorted(members) == list(range(1, 53))
+        for ens_num, track in expected[inv.annual_id].items():
+            assert _summary(members[ens_num]) == _summary(track)
+            assert members[ens_num].storm_name == inv.name
+    # members without a track for the invest are empty but keep their name
+    assert system_tracks[91][6].empty() and system_tracks[91][6].ens_name == "ENS06"
+    assert not system_tracks[90][1].empty() and system_tracks[90][5].empty() and system_tracks[91][1].empty()
+
+
+def test_parseInvestTracks_without_tracks():
+    tracks = _modelRun()
+    (members,) = syntracks.parseInvestTracks(tracks, [Invest("INVEST92", 92, np.datetime64(INIT), 0, 0)]).values()
+    assert len(members) == 52 and all(track.empty() for track in members.values())
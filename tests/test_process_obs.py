@@ -0,0 +1,31 @@
+import pandas as pd
+
+from tcdb.pipeline import process_obs
+
+
+def _ob(wind):
+    return [dict(date_time="2022-09-24T00:00:00+00:00", wind=wind, mslp=1004)]
+
+
+def test_appendObservations_uses_latest_sidecar(tmp_path, monkeypatch):
+    log_path = process_obs.observationLogPath(tmp_path, "AL2022092318.13")
+    assert process_obs.appendObservations(log_path, {"2022092400": _ob(35), "2022092406": _ob(40)}, "20220924T0300") == 2
+    assert process_obs.appendObservations(log_path, {"2022092400": _ob(35), "2022092406": _ob(45)}, "20220924T0900") == 1
+    # an older bdeck version is logged but doesn't replace the newer observation
+    assert process_obs.appendObservations(log_path, {"2022092406": _ob(40)}, "20220924T0600") == 1
+    assert process_obs.latestPath(log_path).exists()
+
+    def readLog(*args, **kwargs):
+        raise AssertionError("the log was read")
+
+    with monkeypatch.context() as m:
+        m.setattr(pd, "read_json", readLog)
+        latest = process_obs.readLatest(log_path)
+    assert latest["2022092406"]["obs"] == _ob(45) and latest["2022092406"]["timestamp"] == "20220924T0900"
+
+    # rebuilt from the log when the sidecar is missing or out of date
+    process_obs.latestPath(log_path).unlink()
+    assert process_obs.readLatest(log_path) == latest
+    with open(log_path, "a") as log:
+        log.write('{"date_time": "2022092412", "obs": [], "timestamp": "20220924T1500"}\n')
+    assert set(process_obs.readLatest(log_path)) == {"2022092400", "2022092406", "2022092412"}
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from tcdb import geo
+from tcdb.etl import syntracks
+from conftest import syntrackEnsemble
+
+
+def test_stepBatch_matches_toStepDict():
+    tracks = syntrackEnsemble(num_ens=5)
+    batch = syntracks.stepBatch(tracks)
+    expected = [
+        syntracks.toStepDict(track, i, None) for track in tracks.values() for i in range(len(track.hour))
+    ]
+    assert len(batch["hour"]) == len(expected)
+    for name in ["hour", "latitude", "longitude", "intensity_kts", "mslp_mb"]:
+        np.testing.assert_allclose(batch[name], [step[name] for step in expected])
+    np.testing.assert_array_equal(
+        batch["ensemble_number"], np.concatenate([np.full(len(t.hour), t.ens_num) for t in tracks.values()])
+    )
+
+
+def test_stepBatch_drops_bad_members():
+    tracks = syntrackEnsemble(num_ens=5)
+    tracks[2].wind[3] = np.nan
+    tracks[4].lat[1] = 95
+    batch = syntracks.stepBatch(tracks)
+    assert set(batch["ensemble_number"].tolist()) == {1, 3, 5}
+    assert len(batch["hour"]) == sum(len(tracks[ens].hour) for ens in [1, 3, 5])
+
+
+def test_roundExact():
+    values = np.random.default_rng(1).integers(850000, 1050000, 10000) / 1000
+    values = np.append(values, [996.245, 1000.005, np.nan])
+    rounded = syntracks._roundExact(values, 2)
+    np.testing.assert_array_equal(rounded, [round(x, 2) for x in values.tolist()])
+
+
+def test_ensMean_excludes_only_the_deterministic_run():
+    tracks = syntrackEnsemble(num_ens=52)
+    mean = syntracks.ensMean(tracks)
+    assert mean.ens_num == 53 and mean.ens_name == "ENS_MEAN"
+    # members 1 to 51 (control and perturbed runs), not the deterministic run (52)
+    members = [track for ens_num, track in tracks.items() if ens_num < 52]
+    for i, hour in enumerate(np.arange(0, 54, 6)):
+        expected = np.mean([track.lat[track.hour == hour][0] for track in members])
+        assert mean.lat[i] == pytest.approx(np.round(expected, 3), abs=1e-9)
+
+    ensemble = syntracks.EnsembleTracks.from_syntracks(tracks)
+    stats = syntracks.ensembleStatistics(ensemble, cache=False)
+    assert stats.num_members == 51
+    np.testing.assert_array_equal(np.round(stats.mean["wind"], 3), mean.wind)
+
+
+def _bruteForceStrike(ensemble, lat, lon, radius, first, last):
+    """Fraction of the members with a densely interpolated point within `radius` of each grid cell, and the distance
+    from each cell to the nearest swath edge"""
+    hits = np.zeros((len(lat), len(lon)))
+    edge = np.full((len(lat), len(lon)), np.inf)
+    members = range(ensemble.num_ens - 1)
+    for row in members:
+        member, point_lat, point_lon, hour = geo.densifyTracks(
+            ensemble.lat[row], ensemble.lon[row], 1, values=(ensemble.hour[row],)
+        )
+        points = (hour >= first) & (hour <= last)
+        dist = geo.distance(point_lat[points], point_lon[points], lat[:, None, None], lon[None, :, None]).min(axis=-1)
+        hits += dist <= radius
+        edge = np.minimum(edge, np.abs(dist - radius))
+    return hits / len(members), edge
+
+
+def test_strikeProbability_matches_brute_force():
+    ensemble = syntracks.EnsembleTracks.from_syntracks(syntrackEnsemble(num_ens=52))
+    lat, lon = np.arange(8, 30.1, 0.5), np.arange(-95, -65.1, 0.5)
+    windows = [(0, 48), (48, 120)]
+    strike = syntracks.strikeProbability(ensemble, lat, lon, radius=60, windows=windows, cache=False)
+    assert strike.attrs["NumMembers"] == 51
+    for i, (first, last) in enumerate(windows):
+        expected, edge = _bruteForceStrike(ensemble, lat, lon, 60, first, last)
+        # cells right next to the edge of a swath depend on the spacing of the points
+        far = edge > 0.02 * 60
+        np.testing.assert_allclose(strike.values[i][far], expected[far], atol=1e-12)
+        assert expected.max() > 0.5
+
+
+def test_strikeProbability_cache():
+    syntracks.clearStrikeCache()
+    lat, lon = np.arange(8, 30.1, 1.0), np.arange(-95, -65.1, 1.0)
+    raw = syntracks.EnsembleTracks.from_syntracks(syntrackEnsemble(num_ens=52))
+    strike = syntracks.strikeProbability(raw, lat, lon)
+    assert syntracks.strikeProbability(raw, lat, lon) is strike
+    # same model, init and storm but another track type or other tracks
+    calibrated = syntracks.EnsembleTracks.from_syntracks(syntrackEnsemble(num_ens=52, track_type="calibrated"))
+    assert syntracks.strikeProbability(calibrated, lat, lon) is not strike
+    other = syntracks.EnsembleTracks.from_syntracks(syntrackEnsemble(seed=1, num_ens=52))
+    assert not np.array_equal(syntracks.strikeProbability(other, lat, lon).values, strike.values)
+    stats = syntracks.ensembleStatistics(raw)
+    assert syntracks.ensembleStatistics(raw) is stats and syntracks.ensembleStatistics(calibrated) is not stats
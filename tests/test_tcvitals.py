@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from tcdb.etl import tcvitals
+
+VITALS = b"""\
+NHC  09L IAN       20220925 1800 179N 0812W 315 046 0980 1009 0463 36 037 0222 0185 0130 0185 D 0074 0056 0037 0056 72 260N 0840W -999 -999 -999 -999
+NHC  09L IAN       20220926 0000 193N 0824W 315 046 0970 1009 0463 43 037 0222 0185 0130 0185 D 0074 0056 0037 0056 72 260N 0840W 0046 0037 0000 0028
+JTWC 20W TWENTY    20220926 0000 145S 1650E 270 031 1004 1008 0278 15 093 -999 -999 -999 -999 S
+"""
+
+
+def test_readVitals():
+    df = tcvitals.readVitals(VITALS)
+    assert list(df.nhc_id) == ["AL092022", "AL092022", "WP202022"]
+    assert list(df.date_time) == list(pd.to_datetime(["2022-09-25 18:00", "2022-09-26 00:00", "2022-09-26 00:00"]))
+    assert (df.latitude[1], df.longitude[1], df.vmax_ms[1]) == (19.3, -82.4, 43)
+    assert (df.latitude[2], df.longitude[2]) == (-14.5, 165.0)
+    # missing values and fields past the end of short records are NaN
+    assert np.isnan(df.r64_ne_km[0]) and np.isnan(df.r50_ne_km[2]) and df.storm_depth[2] == "S"
+
+
+def _existing(df, ids):
+    """Rows of the tcvitals table for `df`, with FLOAT columns rounded to single precision like MySQL"""
+    existing = df[["date_time"] + tcvitals.TABLE_COLUMNS].copy()
+    for name in ["latitude", "longitude", "mslp_mb", "vmax_ms"]:
+        existing[name] = existing[name].astype(np.float32).astype(float)
+    existing.insert(0, "id", ids)
+    return existing
+
+
+def test_changedVitals():
+    df = tcvitals.readVitals(VITALS)
+    new, updated = tcvitals.changedVitals(df, _existing(df, [1, 2, 3]))
+    assert new.empty and updated.empty
+
+    # the 00Z record of Ian was revised and the JTWC record isn't in the table yet
+    revised = tcvitals.readVitals(VITALS.replace(b"0970 1009 0463 43", b"0968 1009 0463 44"))
+    new, updated = tcvitals.changedVitals(revised, _existing(df.iloc[:2], [1, 2]))
+    assert list(new.system_id) == ["20W"]
+    assert list(updated.id) == [2] and (updated.mslp_mb.iloc[0], updated.vmax_ms.iloc[0]) == (968, 44)
+
+    mappings = tcvitals.vitalsMappings(updated, "TEST")
+    assert mappings[0]["id"] == 2 and mappings[0]["r64_ne_km"] == 46 and mappings[0]["run_id"] == "TEST"
+    assert tcvitals.vitalsMappings(new, "TEST")[0]["r50_ne_km"] is None
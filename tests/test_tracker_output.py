@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from scipy.io import loadmat, savemat
+
+from tcdb.etl import syntracks
+from conftest import INIT, syntrackEnsemble
+
+FIELDS = ["hour", "valid", "lat", "lon", "mslp", "wind"]
+
+
+@pytest.fixture
+def mat_path(tmp_path):
+    """Tracker output with one track per member (ens -1 is the deterministic run), an unassigned track without a
+    name and a single point track, plus fields and variables the loader doesn't use"""
+    tracks = syntrackEnsemble(num_ens=5)
+    single = dict(hour=6.0, lat=20.0, lon=-60.0, mslp=1008.0, wind=25.0)
+    records = [(track.ens_num - 1 if track.ens_num < 5 else -1, 9, "IAN", track) for track in tracks.values()]
+    records += [(2, 0, np.array([]), tracks[3]), (3, 0, np.array([]), single)]
+
+    struct = np.zeros(len(records), dtype=[(name, object) for name in syntracks.TRACKER_FIELDS + ("extra",)])
+    for i, (ens, annual_id, name, track) in enumerate(records):
+        points = [track[field] for field in syntracks.TRACK_POINTS]
+        struct[i] = (ens, annual_id, name, *points, np.ones((3, 3)))
+    path = tmp_path.joinpath("tracks.mat")
+    savemat(path, dict(tracks=struct, other=np.arange(3)))
+    return path
+
+
+def _assertTracksEqual(tracks, expected):
+    assert len(tracks) == len(expected)
+    for track, other in zip(tracks, expected):
+        for name in FIELDS:
+            np.testing.assert_array_equal(track[name], other[name], err_msg=name)
+        for name in ["storm_name", "annual_id", "ens_num", "ens_name", "model", "track_type"]:
+            assert track[name] == other[name], name
+
+
+def test_load_syntracks_matches_loadmat(mat_path):
+    struct = loadmat(mat_path, struct_as_record=False, squeeze_me=True)["tracks"]
+    expected = syntracks.toSyntrackObjects(struct, INIT, "ECMWF", "raw")
+    assert [t.ens_name for t in expected][:5] == ["CTRL", "ENS", "ENS", "ENS", "DET"] and expected[4].ens_num == 52
+
+    tracks = syntracks.load_syntracks(mat_path, INIT, "ECMWF", "raw", cache=False)
+    assert not syntracks.trackerSidecarPath(mat_path).exists()
+    _assertTracksEqual(tracks, expected)
+    assert tracks[-1].hour.shape == (1,) and tracks[-2].storm_name == ""
+
+
+def test_load_syntracks_sidecar(mat_path, monkeypatch):
+    expected = syntracks.load_syntracks(mat_path, INIT, "ECMWF", "raw")
+    assert syntracks.trackerSidecarPath(mat_path).exists()
+
+    def readTrackerOutput(*args, **kwargs):
+        raise AssertionError("the .mat file was read")
+
+    with monkeypatch.context() as m:
+        m.setattr(syntracks, "readTrackerOutput", readTrackerOutput)
+        _assertTracksEqual(syntracks.load_syntracks(mat_path, INIT, "ECMWF", "raw"), expected)
+
+    # a sidecar for another variable or a corrupt sidecar is replaced
+    assert syntracks.load_tracker_output(mat_path, variable="tracks")["ens"].tolist() == [0, 1, 2, 3, -1, 2, 3]
+    syntracks.trackerSidecarPath(mat_path).write_bytes(b"not npz")
+    _assertTracksEqual(syntracks.load_syntracks(mat_path, INIT, "ECMWF", "raw"), expected)
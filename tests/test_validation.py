@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from tcdb import validation as val
+
+VALUES = np.array([-400, -181, -90.5, -90, -1, 0, 0.5, 90, 91, 180, 181, 250, 251, 360, 361, 849, 850, 1050, 1051])
+
+VALIDATORS = [
+    (val.validate_pressure, val.validate_pressure_array),
+    (val.validate_velocity, val.validate_velocity_array),
+    (val.validate_latitude, val.validate_latitude_array),
+    (val.validate_longitude, val.validate_longitude_array),
+    (val.validate_distance, val.validate_distance_array),
+    (val.validate_direction, val.validate_direction_array),
+    (val.validate_forecast_step, val.validate_forecast_step_array),
+]
+
+
+@pytest.mark.parametrize("scalar, array", VALIDATORS, ids=[scalar.__name__ for scalar, _ in VALIDATORS])
+def test_array_matches_scalar(scalar, array):
+    result = array(VALUES)
+    expected = np.array([np.nan if (x := scalar(value)) is None else x for value in VALUES.tolist()], dtype=float)
+    np.testing.assert_array_equal(result.values, expected)
+    np.testing.assert_array_equal(result.invalid, result.values != VALUES)
+    assert (result.report is None) == (not result.invalid.any())
+    if result.invalid.any():
+        with pytest.raises(ValueError):
+            array(VALUES, raise_on_fail=True)
+
+
+def test_missing_values():
+    # missing pressures become 1000 without being flagged, 0 is kept for the track-only models
+    pressure = val.validate_pressure_array([np.nan, 0, 35])
+    np.testing.assert_array_equal(pressure.values, [1000, 0, 1000])
+    np.testing.assert_array_equal(pressure.invalid, [False, False, True])
+
+    missing = np.array([np.nan, 35.0])
+    assert not val.validate_distance_array(missing).invalid[0]
+    assert val.validate_distance_array(missing, required=True).invalid[0]
+    assert val.validate_latitude_array(missing).invalid[0]
+    with pytest.raises(ValueError):
+        val.validate_distance_array(missing, raise_on_fail=True, required=True)